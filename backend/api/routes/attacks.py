@@ -5,6 +5,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 from config.database import get_db
 from models.attack_log import AttackLog
+from services.attack_detector import attack_detector
 
 router = APIRouter()
 
@@ -192,6 +193,38 @@ def get_attack_logs(
         ]
     }
 
+@router.get("/detector/cache")
+def get_detector_cache_stats():
+    """Verdict cache counters dari attack detector (untuk tuning cache size)"""
+    return {
+        "enabled": attack_detector.verdict_cache is not None,
+        "cache": attack_detector.cache_stats()
+    }
+
+@router.get("/detector/rules")
+def get_detector_rules(
+    limit: int = Query(100, le=1000)
+):
+    """Active ruleset dan per-rule hits / cumulative match time (paling mahal dulu)"""
+    ruleset = attack_detector.ruleset
+    return {
+        "source": ruleset.source,
+        "version": ruleset.version,
+        "loaded_at": datetime.utcfromtimestamp(ruleset.loaded_at).isoformat(),
+        "total_rules": len(ruleset.rules),
+        "rules": ruleset.rule_stats()[:limit]
+    }
+
+@router.post("/detector/reload")
+def reload_detector_rules():
+    """Reload ruleset file sekarang (invalid file: old rules stay active)"""
+    reloaded = attack_detector.reload_rules()
+    return {
+        "success": reloaded,
+        "source": attack_detector.rules_path,
+        "total_rules": len(attack_detector.ruleset.rules)
+    }
+
 @router.post("/{attack_id}/resolve")
 def resolve_attack(
     attack_id: int,
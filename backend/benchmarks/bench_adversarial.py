@@ -0,0 +1,108 @@
+"""
+AttackDetector on adversarial input: time per crafted request (ms) for re and
+RE2 (google-re2), with and without MAX_SCAN_LENGTH, plus the rules flagged by
+RULE_TIME_BUDGET and requests/sec on normal traffic (per-rule accounting cost)
+
+Attacks padded past MAX_SCAN_LENGTH must still be reported by every path
+(capped ones included); exits non-zero on a miss.
+
+RE2 must return the same threats as re for the request mix and the attack
+corpus (ASCII); DETECTION_EDGE_CASES may differ (RE2's \\b / \\s are ASCII-only)
+and are only reported. Exits non-zero on any ASCII difference. The re2 paths
+are skipped when google-re2 isn't installed. Uncapped re takes seconds per
+request at the default size, hence --repeat 1.
+
+    python -m benchmarks.bench_adversarial [--size 8192] [--requests 20000] [--repeat 1]
+"""
+import argparse
+import sys
+
+from benchmarks.common import (
+    ATTACK_REQUESTS, BENIGN_REQUESTS, DETECTION_EDGE_CASES, adversarial_requests, padded_requests, request_mix,
+    timed, print_header
+)
+from benchmarks.bench_attack_detector import analyze_all
+from services.attack_detector import AttackDetector, MAX_SCAN_LENGTH
+from services.regex_engines import re2
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--size', type=int, default=8192, help="characters per crafted field")
+    arg_parser.add_argument('--requests', type=int, default=20000, help="normal traffic requests")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    engines = ['re', 're2'] if re2 is not None else ['re']
+    if re2 is None:
+        print("google-re2 not installed: re2 paths skipped")
+    
+    failed = False
+    if re2 is not None:
+        checked = request_mix(args.requests, 0.5) + BENIGN_REQUESTS + ATTACK_REQUESTS
+        print_header(f"Equivalence: {len(checked)} requests")
+        reference = AttackDetector(regex_engine='re', verdict_cache_size=None)
+        linear = AttackDetector(regex_engine='re2', verdict_cache_size=None)
+        mismatches = [request for request in checked
+                      if reference.analyze_http_request(*request) != linear.analyze_http_request(*request)]
+        print(f"re2 vs re mismatches: {len(mismatches)}")
+        for request in mismatches[:10]:
+            print(f"  MISMATCH {request!r}")
+        failed = bool(mismatches)
+        edge = [request for request in DETECTION_EDGE_CASES
+                if reference.analyze_http_request(*request) != linear.analyze_http_request(*request)]
+        print(f"re2 vs re edge case differences (non-ASCII, informational): {len(edge)}")
+    
+    configs = [
+        (f"{engine}{' capped' if cap else ''}",
+         AttackDetector(regex_engine=engine, max_scan_length=cap, verdict_cache_size=None))
+        for engine in engines for cap in (None, MAX_SCAN_LENGTH)
+    ]
+    padded = padded_requests(args.size)
+    print_header(f"Padded payloads: {len(padded)} requests, {args.size} chars of padding")
+    for label, detector in configs:
+        missed = []
+        for name, request, rule_ids in padded:
+            found = {threat['rule_id'] for threat in detector.analyze_http_request(*request)}
+            if not found & rule_ids:
+                missed.append(name)
+        print(f"missed ({label}): {', '.join(missed) or '-'}")
+        failed = failed or bool(missed)
+    
+    crafted = adversarial_requests(args.size)
+    print_header(f"Adversarial: {len(crafted)} requests, {args.size} chars per field, cap {MAX_SCAN_LENGTH}")
+    best = {}
+    for _ in range(args.repeat):
+        for name, request in crafted:
+            for label, detector in configs:
+                _, elapsed = timed(detector.analyze_http_request, *request)
+                best[name, label] = min(best.get((name, label), elapsed), elapsed)
+    print(f"{'ms':<14}" + ''.join(f"{label:>12}" for label, _ in configs))
+    for name, _ in crafted:
+        print(f"{name:<14}" + ''.join(f"{1000 * best[name, label]:>12.2f}" for label, _ in configs))
+    for label, detector in configs:
+        slow = [rule['id'] for rule in detector.slow_rules()]
+        print(f"over budget ({label}): {', '.join(slow) or '-'}")
+    
+    requests = request_mix(args.requests, 0.1)
+    print_header(f"Normal traffic (attack ratio 0.1): {len(requests)} requests")
+    paths = [('re', AttackDetector(regex_engine='re', rule_time_budget=None, verdict_cache_size=None))]
+    paths += [(f"{engine} budget", AttackDetector(regex_engine=engine, verdict_cache_size=None)) for engine in engines]
+    best = {}
+    for _ in range(max(args.repeat, 3)):
+        for name, detector in paths:
+            _, elapsed = timed(analyze_all, detector.analyze_http_request, requests)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<14}{'requests/sec':>14}{'speedup':>10}")
+    baseline = None
+    for name, _ in paths:
+        rate = len(requests) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.2f}x")
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+AttackDetector.analyze_http_request (requests/sec): the old per-pattern
+re.search loop vs one combined regex per category
+
+Both must return the same threats (same first pattern per category) for the
+benign corpus, the attack corpus and DETECTION_EDGE_CASES; exits non-zero on
+any difference.
+
+    python -m benchmarks.bench_attack_detector [--requests 50000] [--repeat 3]
+"""
+import argparse
+import re
+import sys
+
+from benchmarks.common import (
+    ATTACK_REQUESTS, BENIGN_REQUESTS, DETECTION_EDGE_CASES, request_mix, timed, print_header
+)
+from services.attack_detector import AttackDetector
+
+
+def analyze_per_pattern(detector, method, path, user_agent=None):
+    """The old analyze_http_request: every rule pattern through re.search, in ruleset order"""
+    ruleset = detector.ruleset
+    full_request = f"{method} {path}"
+    if user_agent:
+        full_request += f" {user_agent}"
+    texts = {'request': full_request, 'method': method, 'path': path, 'user_agent': user_agent or ''}
+    lowered = {field: text.lower() for field, text in texts.items()}
+    threats = []
+    for category in ruleset.categories:
+        threat = None
+        for rule in ruleset.category_rules[category.name]:
+            scanned = lowered if rule.lowercase else texts
+            for field in rule.fields:
+                if re.search(rule.pattern, scanned[field], rule.flags):
+                    threat = ruleset.threat(rule)
+                    break
+            if threat is not None:
+                threats.append(threat)
+                break
+    return threats
+
+
+def analyze_all(analyze, requests):
+    detected = 0
+    for method, path, user_agent in requests:
+        if analyze(method, path, user_agent):
+            detected += 1
+    return detected
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--requests', type=int, default=50000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    # Combined regex per category only: no prefilter, no per-rule timing, no verdict cache, plain re
+    detector = AttackDetector(prefilter=None, regex_engine='re', rule_time_budget=None, verdict_cache_size=None)
+    paths = [
+        ('per-pattern', lambda method, path, user_agent: analyze_per_pattern(detector, method, path, user_agent)),
+        ('combined', detector.analyze_http_request),
+    ]
+    
+    checked = request_mix(args.requests, 0.5) + BENIGN_REQUESTS + ATTACK_REQUESTS + DETECTION_EDGE_CASES
+    print_header(f"Equivalence: {len(checked)} requests")
+    mismatches = [
+        request for request in checked
+        if analyze_per_pattern(detector, *request) != detector.analyze_http_request(*request)
+    ]
+    print(f"combined vs per-pattern mismatches: {len(mismatches)}")
+    for request in mismatches[:10]:
+        print(f"  MISMATCH {request!r}")
+    if mismatches:
+        sys.exit(1)
+    
+    for label, ratio in (('benign', 0.0), ('malicious', 1.0)):
+        requests = request_mix(args.requests, ratio)
+        print_header(f"{label}: {len(requests)} requests")
+        best = {}
+        for _ in range(args.repeat):
+            for name, analyze in paths:
+                _, elapsed = timed(analyze_all, analyze, requests)
+                best[name] = min(best.get(name, elapsed), elapsed)
+        print(f"{'path':<14}{'requests/sec':>14}{'speedup':>10}")
+        baseline = None
+        for name, _ in paths:
+            rate = len(requests) / best[name] if best[name] else 0.0
+            baseline = baseline or rate
+            print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
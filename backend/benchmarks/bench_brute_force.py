@@ -0,0 +1,126 @@
+"""
+Streaming SSH brute force detection (BruteForceTracker): failed attempts/sec and
+peak memory (tracemalloc) for the bounded tracker, an unbounded one and a naive
+per-IP timestamp list (prune + len on every event), on a botnet spray of unique
+source IPs with a few brute forcing IPs mixed in
+
+The unbounded tracker must raise exactly the alerts of the naive reference
+(same event, same IP); exits non-zero otherwise. The bounded tracker's alerts
+are reported next to its evictions: a brute forcer is only missed when more
+than max_ips other IPs show up between its attempts. A high --attack-ratio
+(e.g. 0.9) shows the naive cost growing with the attempts per IP in the window.
+
+    python -m benchmarks.bench_brute_force [--events 500000] [--attackers 50] [--attack-ratio 0.05] [--max-ips 65536] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+
+from benchmarks.common import timed, print_header
+from services.attack_detector import attack_detector
+from services.brute_force import BruteForceTracker, BRUTE_FORCE_MAX_IPS
+
+
+def spray_events(count, attackers, attack_ratio=0.05, seed=42):
+    """
+    (ip, timestamp) per failed attempt, 20 per second: mostly one-off spray IPs
+    (random over 2^30 addresses), attack_ratio from attackers that pause longer
+    than the window now and then
+    """
+    rng = random.Random(seed)
+    attacker_ips = [f"203.0.113.{i % 256}" if i < 256 else f"198.51.{i // 256}.{i % 256}" for i in range(attackers)]
+    paused_until = {}
+    events = []
+    for i in range(count):
+        timestamp = 1_700_000_000 + i / 20
+        ip = rng.choice(attacker_ips) if rng.random() < attack_ratio else None
+        if ip is not None and paused_until.get(ip, 0) <= timestamp:
+            if rng.random() < 0.005:
+                paused_until[ip] = timestamp + 900
+        else:
+            n = rng.randrange(1 << 30)
+            ip = f"{10 + (n >> 24)}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+        events.append((ip, timestamp))
+    return events
+
+
+class NaiveTracker:
+    """Reference: semua timestamps per IP dalam window, pruned on every event"""
+    
+    def __init__(self, threshold, window):
+        self.threshold = threshold
+        self.window = window
+        self.attempts = {}
+    
+    def record(self, ip, timestamp):
+        attempts = self.attempts.setdefault(ip, [])
+        attempts[:] = [seen for seen in attempts if timestamp - seen <= self.window]
+        attempts.append(timestamp)
+        return len(attempts) == self.threshold
+
+
+def run(record, events):
+    """Indices of the events that raised an alert"""
+    return [index for index, (ip, timestamp) in enumerate(events) if record(ip, timestamp)]
+
+
+def peak_memory(factory, events):
+    """tracemalloc peak (bytes) untuk memproses events dengan tracker baru"""
+    tracemalloc.start()
+    tracker = factory()
+    run(tracker.record, events)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--events', type=int, default=500000, help="failed attempts")
+    arg_parser.add_argument('--attackers', type=int, default=50, help="brute forcing IPs")
+    arg_parser.add_argument('--attack-ratio', type=float, default=0.05, help="share of attempts from brute forcers")
+    arg_parser.add_argument('--max-ips', type=int, default=BRUTE_FORCE_MAX_IPS, help="bounded tracker size")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    threshold, window = attack_detector.brute_force_threshold, attack_detector.brute_force_window
+    events = spray_events(args.events, args.attackers, args.attack_ratio)
+    distinct = len({ip for ip, _ in events})
+    paths = [
+        ('naive', lambda: NaiveTracker(threshold, window)),
+        ('unbounded', lambda: BruteForceTracker(threshold, window, max_ips=distinct)),
+        (f"lru {args.max_ips}", lambda: BruteForceTracker(threshold, window, max_ips=args.max_ips)),
+    ]
+    
+    print_header(f"Alerts: {len(events)} events, {distinct} IPs, threshold {threshold} in {window}s")
+    reference = run(NaiveTracker(threshold, window).record, events)
+    unbounded = run(paths[1][1]().record, events)
+    bounded_tracker = paths[2][1]()
+    bounded = run(bounded_tracker.record, events)
+    missed = sorted(set(reference) - set(bounded))
+    print(f"naive alerts: {len(reference)}, unbounded: {len(unbounded)}, lru: {len(bounded)}")
+    print(f"unbounded vs naive mismatches: {len(set(reference) ^ set(unbounded))}")
+    print(f"lru missed alerts: {len(missed)}, evictions: {bounded_tracker.evictions}")
+    failed = unbounded != reference
+    
+    print_header("Throughput and peak memory")
+    best = {}
+    for _ in range(args.repeat):
+        for name, factory in paths:
+            _, elapsed = timed(run, factory().record, events)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<14}{'events/sec':>14}{'speedup':>10}{'peak MB':>10}")
+    baseline = None
+    for name, factory in paths:
+        rate = len(events) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        peak = peak_memory(factory, events) / (1 << 20)
+        print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.2f}x{peak:>10.1f}")
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
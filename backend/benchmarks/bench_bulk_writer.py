@@ -0,0 +1,76 @@
+"""
+Write throughput (rows/sec): per-line save_to_db vs ORM batch vs COPY
+
+Lines are parsed up front so only the database write path is measured.
+COPY needs PostgreSQL (set DATABASE_URL); on other databases it is skipped.
+
+    python -m benchmarks.bench_bulk_writer [--rows 5000] [--batch 500]
+"""
+import argparse
+
+from benchmarks.common import ACCESS_TEMPLATES, SSH_TEMPLATES, synthetic_lines, timed, print_header
+from config.database import init_db, SessionLocal, engine
+from services.bulk_writer import BulkWriter
+from parsers.nginx_parser import NginxAccessParser
+from parsers.ssh_parser import SSHParser
+
+
+def write_per_line(parser, parsed_list):
+    db = SessionLocal()
+    try:
+        return sum(1 for parsed in parsed_list if parser.save_to_db(parsed, db))
+    finally:
+        db.close()
+
+
+def write_batched(parser, parsed_list, batch_size, bulk_writer):
+    db = SessionLocal()
+    try:
+        written = 0
+        for start in range(0, len(parsed_list), batch_size):
+            chunk = parsed_list[start:start + batch_size]
+            written += bulk_writer.write(parser, chunk, db)
+            db.commit()
+        return written
+    finally:
+        db.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, default=5000)
+    arg_parser.add_argument('--batch', type=int, default=500)
+    args = arg_parser.parse_args()
+    
+    init_db()
+    is_postgres = engine.dialect.name == 'postgresql'
+    
+    print_header(f"Write throughput, {args.rows} rows ({engine.dialect.name})")
+    print(f"{'source':<14}{'path':<18}{'rows/sec':>12}{'speedup':>10}")
+    
+    for label, parser, templates in (
+        ('nginx_access', NginxAccessParser(), ACCESS_TEMPLATES),
+        ('ssh', SSHParser(), SSH_TEMPLATES),
+    ):
+        parsed_list = parser.parse_lines(synthetic_lines(templates, args.rows))
+        # Keep the threat console output out of the timing
+        parser.report = lambda parsed: None
+        
+        paths = [('save_to_db', lambda: write_per_line(parser, parsed_list))]
+        paths.append(('orm batch', lambda: write_batched(parser, parsed_list, args.batch, BulkWriter('orm'))))
+        if is_postgres:
+            paths.append(('copy batch', lambda: write_batched(parser, parsed_list, args.batch, BulkWriter('copy'))))
+        
+        baseline = None
+        for name, run in paths:
+            written, elapsed = timed(run)
+            rate = written / elapsed if elapsed else 0.0
+            baseline = baseline or rate
+            print(f"{label:<14}{name:<18}{rate:>12.0f}{rate / baseline:>9.1f}x")
+    
+    if not is_postgres:
+        print("\n(COPY path skipped: set DATABASE_URL to a PostgreSQL database)")
+
+
+if __name__ == '__main__':
+    main()
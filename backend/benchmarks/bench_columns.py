@@ -0,0 +1,145 @@
+"""
+Columnar batches vs a dict per row: allocations (tracemalloc) and throughput
+
+Every path parses + attack-detects the same access lines and builds what its
+writer consumes:
+  dicts + ORM   - parse_lines, one ORM object per row (ORM write path)
+  dicts + rows  - parse_lines, one build_row dict per row (dict COPY path)
+  columns       - parse_batch, one list per column (write_columns)
+The columns must hold exactly the rows the dict path builds; exits non-zero
+on any difference. On PostgreSQL the COPY writes are timed too (dict rows via
+BulkWriter.write vs BulkWriter.write_columns).
+
+    python -m benchmarks.bench_columns [--lines 50000] [--batch 1000] [--repeat 3]
+"""
+import argparse
+import sys
+import tracemalloc
+
+from benchmarks.common import ACCESS_TEMPLATES, synthetic_lines, timed, print_header
+from config.database import init_db, SessionLocal, engine
+from services.bulk_writer import BulkWriter
+from parsers.nginx_parser import NginxAccessParser
+
+
+# The dict paths keep parsed_list too: attack rows are built from it
+
+def dicts_orm(parser, lines, keys):
+    parsed_list = parser.parse_lines(lines, keys=keys)
+    return parsed_list, [parser.build_log_entry(parsed) for parsed in parsed_list]
+
+
+def dicts_rows(parser, lines, keys):
+    parsed_list = parser.parse_lines(lines, keys=keys)
+    return parsed_list, [parser.build_row(parsed) for parsed in parsed_list]
+
+
+def columns(parser, lines, keys):
+    return parser.parse_batch(lines, keys=keys)
+
+
+PATHS = [('dicts + ORM', dicts_orm), ('dicts + rows', dicts_rows), ('columns', columns)]
+
+
+def traced(prepare, *args):
+    """(live blocks held by the result, peak bytes while building it)"""
+    tracemalloc.start()
+    try:
+        result = prepare(*args)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    del result
+    return blocks, peak
+
+
+def mismatches(parser, lines, keys):
+    parsed_list = parser.parse_lines(lines, keys=keys)
+    batch = parser.parse_batch(lines, keys=keys)
+    expected = [
+        (parser.build_row(parsed), parsed['threats_detected'] or None)
+        for parsed in parsed_list
+    ]
+    actual = [
+        (parser.build_row(parsed), parsed.get('threats_detected'))
+        for parsed in batch.rows()
+    ]
+    return len(expected) != len(actual) or sum(1 for e, a in zip(expected, actual) if e != a)
+
+
+def write_all(write, parser, lines, keys, batch_size):
+    db = SessionLocal()
+    try:
+        written = 0
+        for start in range(0, len(lines), batch_size):
+            chunk_keys = (keys[0], keys[1], keys[2][start:start + batch_size])
+            written += write(parser, lines[start:start + batch_size], chunk_keys, db)
+            db.commit()
+        return written
+    finally:
+        db.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=50000)
+    arg_parser.add_argument('--batch', type=int, default=1000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    parser = NginxAccessParser()
+    lines = list(synthetic_lines(ACCESS_TEMPLATES, args.lines))
+    keys = ('bench', 1, list(range(len(lines))))
+    
+    print_header(f"Equivalence: {len(lines)} lines")
+    failed = mismatches(parser, lines, keys)
+    print(f"columns vs dict rows mismatches: {failed}")
+    if failed:
+        sys.exit(1)
+    
+    print_header(f"Parse + detect + build, {len(lines)} lines")
+    best = {}
+    for _ in range(args.repeat):
+        for name, prepare in PATHS:
+            _, elapsed = timed(prepare, parser, lines, keys)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<14}{'lines/sec':>12}{'speedup':>10}{'blocks':>12}{'peak MB':>10}")
+    baseline = None
+    for name, prepare in PATHS:
+        blocks, peak = traced(prepare, parser, lines, keys)
+        rate = len(lines) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<14}{rate:>12.0f}{rate / baseline:>9.2f}x{blocks:>12}{peak / 1048576:>10.1f}")
+    
+    init_db()
+    if engine.dialect.name != 'postgresql':
+        print("\n(COPY write paths skipped: set DATABASE_URL to a PostgreSQL database)")
+        return
+    
+    bulk_writer = BulkWriter('copy')
+    writes = [
+        ('dict COPY', lambda parser, chunk, chunk_keys, db: bulk_writer.write(
+            parser, parser.parse_lines(chunk, keys=chunk_keys), db)),
+        ('column COPY', lambda parser, chunk, chunk_keys, db: bulk_writer.write_columns(
+            parser, parser.parse_batch(chunk, keys=chunk_keys), db)),
+    ]
+    print_header(f"Parse + COPY write, {len(lines)} lines, batches of {args.batch}")
+    best = {}
+    for run in range(args.repeat):
+        for name, write in writes:
+            # Fresh source id per run: every row is new, nothing is skipped
+            run_keys = (f"bench-columns:{name}:{run}", keys[1], keys[2])
+            written, elapsed = timed(write_all, write, parser, lines, run_keys, args.batch)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<14}{'rows/sec':>12}{'speedup':>10}")
+    baseline = None
+    for name, _ in writes:
+        rate = written / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<14}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
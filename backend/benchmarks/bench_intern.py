@@ -0,0 +1,146 @@
+"""
+String interning in the parsers: retained memory (tracemalloc), lines/sec and
+group-by speed, interned vs a fresh string per field
+
+A corpus of access lines (realistic user agents: a few popular ones plus a
+long tail of browser builds) and auth.log lines is parsed into ColumnBatches,
+which are all kept, like an import holding its batches. "plain" replaces the
+parser's intern tables with an identity function (values as sliced). Both
+must return the same rows; exits non-zero on any difference.
+
+    python -m benchmarks.bench_intern [--lines 1000000] [--batch 5000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+from collections import Counter
+
+from benchmarks.common import AUTH_LOG_MIX, synthetic_lines, timed, print_header, weighted_templates
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.nginx_parser import NginxAccessParser
+from parsers.ssh_parser import SSHParser
+
+POPULAR_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'kube-probe/1.29',
+    'curl/8.4.0',
+]
+TAIL_AGENT = ('Mozilla/5.0 (Linux; Android {android}; SM-{model}) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/{major}.0.{build}.{patch} Mobile Safari/537.36')
+ACCESS_LINE = ('{ip} - - [23/Dec/2025:11:20:{s:02d} +0700] "{method} {path} HTTP/1.1" {status} {size} '
+               '"{referer}" "{agent}" 0.{ms:03d}')
+METHODS = ['GET'] * 8 + ['POST', 'HEAD']
+PATHS = ['/', '/index.html', '/api/items/{n}', '/static/app.{n}.js', '/login', '/wp-login.php']
+REFERERS = ['-', '-', 'https://example.com/', 'https://www.google.com/']
+
+
+def access_lines(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        if rng.random() < 0.8:
+            agent = rng.choice(POPULAR_AGENTS)
+        else:
+            # Long tail: ~3000 Android / Chrome builds, the low ones far more common
+            agent = TAIL_AGENT.format(
+                android=rng.randrange(9, 15), model=f"A{int(rng.paretovariate(1.2)) % 40}0",
+                major=rng.randrange(110, 121), build=rng.randrange(6000, 6100), patch=rng.randrange(100, 103)
+            )
+        yield ACCESS_LINE.format(
+            ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}", s=i % 60,
+            method=rng.choice(METHODS), path=rng.choice(PATHS).format(n=rng.randrange(1000)),
+            status=rng.choice([200, 200, 200, 304, 404]), size=rng.randrange(20000),
+            referer=rng.choice(REFERERS), agent=agent, ms=rng.randrange(1000)
+        )
+
+
+def plain(parser):
+    """Same parser with every intern table replaced by identity (no interning)"""
+    for name in list(vars(parser)):
+        if name.startswith('intern_'):
+            setattr(parser, name, lambda value: value)
+    return parser
+
+
+def parse_all(parser, lines, batch_size):
+    return [
+        parser.parse_batch(lines[i:i + batch_size], detect=False)
+        for i in range(0, len(lines), batch_size)
+    ]
+
+
+def retained(parser, lines, batch_size):
+    """Bytes still allocated by the parsed batches (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        batches = parse_all(parser, lines, batch_size)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del batches
+    return current
+
+
+def group_by(batches, column):
+    counts = Counter()
+    for batch in batches:
+        counts.update(batch.column(column))
+    return counts
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=1000000, help="lines per source")
+    arg_parser.add_argument('--batch', type=int, default=5000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    failed = False
+    sources = [
+        ('nginx_access', NginxAccessParser, lambda: list(access_lines(args.lines)), 'user_agent'),
+        ('ssh', SSHParser, lambda: list(synthetic_lines(weighted_templates(AUTH_LOG_MIX), args.lines)), 'username'),
+    ]
+    for label, parser_class, corpus, group_column in sources:
+        lines = corpus()
+        paths = [('plain', plain(parser_class())), ('interned', parser_class())]
+        
+        print_header(f"{label}: {len(lines)} lines, batches of {args.batch}")
+        sample = lines[:20000]
+        mismatches = sum(
+            1 for a, b in zip(paths[0][1].parse_batch(sample, detect=False).rows(),
+                              paths[1][1].parse_batch(sample, detect=False).rows())
+            if a != b
+        )
+        print(f"interned vs plain mismatches: {mismatches}")
+        failed = failed or bool(mismatches)
+        
+        best = {}
+        best_group = {}
+        for _ in range(args.repeat):
+            for name, parser in paths:
+                batches, elapsed = timed(parse_all, parser, lines, args.batch)
+                best[name] = min(best.get(name, elapsed), elapsed)
+                _, elapsed = timed(group_by, batches, group_column)
+                best_group[name] = min(best_group.get(name, elapsed), elapsed)
+                del batches
+        
+        print(f"{'path':<14}{'lines/sec':>12}{'speedup':>10}{'retained MB':>14}{'group-by ms':>14}")
+        baseline = None
+        for name, parser in paths:
+            memory = retained(parser, lines, args.batch)
+            rate = len(lines) / best[name] if best[name] else 0.0
+            baseline = baseline or rate
+            print(f"{name:<14}{rate:>12.0f}{rate / baseline:>9.2f}x{memory / 1048576:>14.1f}"
+                  f"{1000 * best_group[name]:>14.1f}")
+        del lines
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
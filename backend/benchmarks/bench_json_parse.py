@@ -0,0 +1,74 @@
+"""
+JSON access-log ingestion (lines/sec): NginxJsonAccessParser per backend vs the
+combined-format regex path on the same requests
+
+Records are rendered once as combined lines (regex, hand-written fast path) and
+once as escape=json lines (compiled log_format, json / orjson / msgspec). Every
+JSON backend must return exactly what the compiled log_format parser returns;
+exits non-zero on any difference. Backends that are not installed are skipped.
+
+    python -m benchmarks.bench_json_parse [--lines 100000] [--repeat 3]
+"""
+import argparse
+import sys
+
+from benchmarks.bench_log_format import FORMATS, records, render, parse_all
+from benchmarks.common import timed, print_header
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.nginx_json_parser import JSON_BACKENDS, NginxJsonAccessParser
+from parsers.nginx_parser import NginxAccessParser
+
+JSON_FORMAT = dict((name, log_format) for name, log_format, _ in FORMATS)['json']
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    sample = list(records(args.lines))
+    combined_lines = [render('timed_combined', record) for record in sample]
+    json_lines = [render(JSON_FORMAT, record) for record in sample]
+    
+    combined = NginxAccessParser()
+    compiled = NginxAccessParser(JSON_FORMAT)
+    paths = [
+        ('combined regex', combined.parse_regex, combined_lines),
+        ('combined fast', combined.parse, combined_lines),
+        ('json compiled', compiled.parse, json_lines),
+    ]
+    
+    print_header(f"Equivalence: {len(json_lines)} JSON lines")
+    failed = False
+    for backend in JSON_BACKENDS:
+        try:
+            parser = NginxJsonAccessParser(JSON_FORMAT, backend=backend)
+        except RuntimeError as e:
+            print(f"{backend:<10} skipped ({e})")
+            continue
+        mismatches = [line for line in json_lines if parser.parse(line) != compiled.parse(line)]
+        print(f"{backend:<10} mismatches {len(mismatches)}")
+        for line in mismatches[:5]:
+            print(f"  MISMATCH {line!r}")
+        failed = failed or bool(mismatches)
+        paths.append((f"json {backend}", parser.parse, json_lines))
+    if failed:
+        sys.exit(1)
+    
+    print_header(f"Throughput: {len(sample)} requests")
+    best = {}
+    for _ in range(args.repeat):
+        for name, parse, lines in paths:
+            _, elapsed = timed(parse_all, parse, lines)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<16}{'lines/sec':>12}{'speedup':>10}")
+    baseline = None
+    for name, _, _ in paths:
+        rate = len(sample) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<16}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Compiled log_format parsers vs the hand-written NginxAccessParser (lines/sec)
+
+Lines are rendered from each format with synthetic request records. For the
+formats the hand-written parser understands (combined, main, timed_combined)
+the compiled parser must return exactly the same dicts; exits non-zero on any
+difference. The other formats ($host prefix, escape=json) only have the
+compiled parser.
+
+    python -m benchmarks.bench_log_format [--lines 100000] [--repeat 3]
+"""
+import argparse
+import json
+import random
+import sys
+
+from benchmarks.common import timed, print_header
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.log_format import COMBINED, parse_directive, tokenize
+from parsers.nginx_parser import NginxAccessParser
+
+# (name, log_format, hand-written parser gives the same result)
+FORMATS = [
+    ('combined', 'combined', True),
+    ('main', 'main', True),
+    ('timed_combined', 'timed_combined', True),
+    ('vhost', '$host ' + COMBINED + ' $request_time $upstream_response_time', False),
+    ('json', 'escape=json {"time":"$time_iso8601","host":"$host","ip":"$remote_addr",'
+             '"request":"$request","status":$status,"bytes":$body_bytes_sent,'
+             '"referer":"$http_referer","ua":"$http_user_agent","rt":$request_time,'
+             '"urt":"$upstream_response_time"}', False),
+]
+
+PATHS = ['/', '/index.html', '/api/users?page={n}', '/static/app.{n}.js', '/login', '/admin.php',
+         '/search?q=1%27+union+select+password+from+users']
+AGENTS = ['Mozilla/5.0 (X11; Linux x86_64)', 'curl/7.68.0', 'sqlmap/1.7', 'kube-probe/1.29', '-']
+
+
+def records(count, seed=42):
+    """Synthetic request records: nginx variable -> value"""
+    rng = random.Random(seed)
+    for i in range(count):
+        second = i % 60
+        yield {
+            'remote_addr': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'remote_user': '-',
+            'time_local': f"23/Dec/2025:11:20:{second:02d} +0700",
+            'time_iso8601': f"2025-12-23T11:20:{second:02d}+07:00",
+            'request': f"{rng.choice(['GET', 'GET', 'POST', 'HEAD'])} "
+                       f"{rng.choice(PATHS).format(n=rng.randrange(100))} HTTP/1.1",
+            'status': str(rng.choice([200, 200, 200, 304, 404, 403, 502])),
+            'body_bytes_sent': str(rng.randrange(20000)),
+            'http_referer': rng.choice(['-', 'https://example.com/']),
+            'http_user_agent': rng.choice(AGENTS),
+            'http_x_forwarded_for': rng.choice(['-', '203.0.113.9']),
+            'request_time': f"{rng.random() / 10:.3f}",
+            'upstream_response_time': f"{rng.random() / 10:.3f}",
+            'host': rng.choice(['example.com', 'api.example.com', 'static.example.com']),
+        }
+
+
+def render(log_format, record):
+    fmt, escape = parse_directive(log_format)
+    quote = (lambda value: json.dumps(value)[1:-1]) if escape == 'json' else str
+    return ''.join(
+        text if kind == 'literal' else quote(record[text])
+        for kind, text in tokenize(fmt)
+    )
+
+
+def parse_all(parse, lines):
+    parsed = 0
+    for line in lines:
+        if parse(line):
+            parsed += 1
+    return parsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+
+    hand_written = NginxAccessParser()
+    sample = list(records(args.lines))
+    failed = False
+
+    for name, log_format, comparable in FORMATS:
+        compiled = NginxAccessParser(log_format)
+        lines = [render(log_format, record) for record in sample]
+
+        print_header(f"{name}: {len(lines)} lines")
+        unparsed = sum(1 for line in lines if compiled.parse(line) is None)
+        print(f"compiled parser rejected {unparsed}")
+        failed = failed or bool(unparsed)
+        paths = [('compiled', compiled.parse)]
+        if comparable:
+            mismatches = [line for line in lines if compiled.parse(line) != hand_written.parse(line)]
+            print(f"compiled vs hand-written mismatches: {len(mismatches)}")
+            for line in mismatches[:10]:
+                print(f"  MISMATCH {line!r}")
+            failed = failed or bool(mismatches)
+            paths = [('regex', hand_written.parse_regex), ('hand-written', hand_written.parse)] + paths
+
+        best = {}
+        for _ in range(args.repeat):
+            for path, parse in paths:
+                _, elapsed = timed(parse_all, parse, lines)
+                best[path] = min(best.get(path, elapsed), elapsed)
+        print(f"{'path':<14}{'lines/sec':>12}{'speedup':>10}")
+        baseline = None
+        for path, _ in paths:
+            rate = len(lines) / best[path] if best[path] else 0.0
+            baseline = baseline or rate
+            print(f"{path:<14}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
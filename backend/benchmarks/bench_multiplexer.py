@@ -0,0 +1,153 @@
+"""
+Tailing 500 files: one thread per file vs the single-thread multiplexer
+(threads: a LogMultiplexer per file, each with its own thread and inotify fd)
+
+Every mode runs in its own process. After startup it records threads, open fds
+and RSS, then one noisy file gets a large burst while each quiet file gets one
+line. It reports how long the quiet lines wait behind the noisy one (fairness)
+and how long the burst takes to drain. No database writes.
+
+    python -m benchmarks.bench_multiplexer [--files 500] [--noisy-lines 200000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import ACCESS_TEMPLATES, synthetic_lines, percentile, print_header
+
+MODES = ('threads', 'mux-unbounded', 'mux')
+
+QUIET_LINE = '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /quiet/{i} HTTP/1.1" 200 1 "-" "probe" 0.001\n'
+
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def run_mode(mode, files, noisy_lines):
+    # Imported here so the parent process stays small
+    from services.log_watcher import LogFilePoller
+    from services.log_multiplexer import LogMultiplexer, READ_QUANTUM
+    from parsers.nginx_parser import NginxAccessParser
+    
+    class RecordingParser(NginxAccessParser):
+        """Parses for real, records arrival instead of writing"""
+        
+        def __init__(self):
+            super().__init__()
+            self.lock = threading.Lock()
+            self.quiet_seen = {}
+            self.noisy = 0
+        
+        def process_batch(self, lines, db_session, bulk_writer=None, keys=None):
+            parsed_list = self.parse_lines(lines)
+            now = time.perf_counter()
+            with self.lock:
+                for parsed in parsed_list:
+                    if parsed['path'].startswith('/quiet/'):
+                        self.quiet_seen[int(parsed['path'][7:])] = now
+                    else:
+                        self.noisy += 1
+            return len(parsed_list)
+    
+    directory = tempfile.mkdtemp(prefix='soc-mux-')
+    paths = [os.path.join(directory, f"vhost{i:04d}.access.log") for i in range(files)]
+    for path in paths:
+        open(path, 'w').close()
+    
+    parser = RecordingParser()
+    pollers = [LogFilePoller(parser, path, f"vhost{i}") for i, path in enumerate(paths)]
+    
+    base = {'rss_kb': rss_kb(), 'threads': threading.active_count(), 'fds': open_fds()}
+    
+    if mode == 'threads':
+        multiplexers = [LogMultiplexer([poller], read_quantum=None) for poller in pollers]
+    else:
+        quantum = None if mode == 'mux-unbounded' else READ_QUANTUM
+        multiplexers = [LogMultiplexer(pollers, read_quantum=quantum)]
+    for multiplexer in multiplexers:
+        multiplexer.start()
+    
+    time.sleep(3)  # every file opened, watched and idle
+    result = {
+        'mode': mode,
+        'threads': threading.active_count() - base['threads'],
+        'fds': open_fds() - base['fds'],
+        'rss_kb': rss_kb() - base['rss_kb'],
+    }
+    
+    burst = ''.join(line + '\n' for line in synthetic_lines(ACCESS_TEMPLATES, noisy_lines))
+    started = time.perf_counter()
+    with open(paths[0], 'a') as f:
+        f.write(burst)
+    written = {}
+    for i in range(1, files):
+        with open(paths[i], 'a') as f:
+            f.write(QUIET_LINE.format(i=i))
+        written[i] = time.perf_counter()
+    
+    deadline = time.perf_counter() + 120
+    while time.perf_counter() < deadline:
+        with parser.lock:
+            if parser.noisy >= noisy_lines and len(parser.quiet_seen) >= files - 1:
+                break
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    
+    with parser.lock:
+        latencies = [(parser.quiet_seen[i] - written[i]) * 1000 for i in parser.quiet_seen]
+        result['quiet_seen'] = len(parser.quiet_seen)
+        result['noisy'] = parser.noisy
+    result['quiet_p50_ms'] = percentile(latencies, 50)
+    result['quiet_p95_ms'] = percentile(latencies, 95)
+    result['quiet_max_ms'] = max(latencies or [0])
+    result['drain_s'] = drained
+    
+    for multiplexer in multiplexers:
+        multiplexer.stop(timeout=1)
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--files', type=int, default=500)
+    arg_parser.add_argument('--noisy-lines', type=int, default=200000)
+    arg_parser.add_argument('--run', choices=MODES, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.files, args.noisy_lines)))
+        return
+    
+    print_header(f"{args.files} files, burst of {args.noisy_lines} lines on one of them")
+    print(f"{'mode':<15}{'threads':>8}{'fds':>6}{'RSS MB':>8}"
+          f"{'quiet p50':>11}{'p95':>9}{'max':>9}{'drain s':>9}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_multiplexer', '--run', mode,
+             '--files', str(args.files), '--noisy-lines', str(args.noisy_lines)],
+            capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<15}{result['threads']:>8}{result['fds']:>6}{result['rss_kb'] / 1024:>8.1f}"
+              f"{result['quiet_p50_ms']:>9.0f}ms{result['quiet_p95_ms']:>7.0f}ms"
+              f"{result['quiet_max_ms']:>7.0f}ms{result['drain_s']:>9.1f}")
+        if result['quiet_seen'] < args.files - 1:
+            print(f"  only {result['quiet_seen']}/{args.files - 1} quiet lines arrived")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Nginx access parsing (lines/sec): regex vs the split/partition fast path
+
+First checks that parse() (fast path + regex fallback) returns exactly what the
+regex returns on a corpus: synthetic lines, ACCESS_EDGE_CASES and random
+one-character mutations of both. Exits non-zero on any difference.
+
+    python -m benchmarks.bench_nginx_parse [--lines 200000] [--mutations 20000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.common import ACCESS_TEMPLATES, ACCESS_EDGE_CASES, synthetic_lines, timed, print_header
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.nginx_parser import NginxAccessParser
+
+MUTATION_CHARS = ' -"[]./:0123456789x\t'
+
+
+def outcome(parse, line):
+    """Parse result, or the exception type (the regex path raises on e.g. '1.2.3')"""
+    try:
+        return parse(line)
+    except ValueError as e:
+        return type(e)
+
+
+def mutations(lines, count, seed=7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        line = list(rng.choice(lines))
+        position = rng.randrange(len(line) + 1)
+        action = rng.randrange(3)
+        if action == 0 and position < len(line):
+            del line[position]
+        elif action == 1 and position < len(line):
+            line[position] = rng.choice(MUTATION_CHARS)
+        else:
+            line.insert(position, rng.choice(MUTATION_CHARS))
+        yield ''.join(line)
+
+
+def check_corpus(parser, corpus):
+    """Returns (fast path hits, mismatching lines)"""
+    hits = 0
+    mismatches = []
+    for line in corpus:
+        fast = outcome(parser.parse_fast, line)
+        if fast is not None:
+            hits += 1
+        if outcome(parser.parse, line) != outcome(parser.parse_regex, line):
+            mismatches.append(line)
+    return hits, mismatches
+
+
+def parse_all(parse, lines):
+    parsed = 0
+    for line in lines:
+        if parse(line):
+            parsed += 1
+    return parsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=200000)
+    arg_parser.add_argument('--mutations', type=int, default=20000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    parser = NginxAccessParser()
+    
+    base = list(synthetic_lines(ACCESS_TEMPLATES, 1000)) + ACCESS_EDGE_CASES
+    corpus = base + list(mutations([line for line in base if line], args.mutations))
+    hits, mismatches = check_corpus(parser, corpus)
+    
+    print_header(f"Equivalence: {len(corpus)} lines")
+    print(f"fast path took {hits}, regex fallback {len(corpus) - hits}, mismatches {len(mismatches)}")
+    for line in mismatches[:10]:
+        print(f"  MISMATCH {line!r}")
+    if mismatches:
+        sys.exit(1)
+    
+    lines = list(synthetic_lines(ACCESS_TEMPLATES, args.lines))
+    print_header(f"Throughput: {len(lines)} lines")
+    print(f"{'path':<14}{'lines/sec':>12}{'speedup':>10}")
+    paths = (('regex', parser.parse_regex), ('fast path', parser.parse))
+    best = {}
+    for _ in range(args.repeat):
+        for name, parse in paths:
+            _, elapsed = timed(parse_all, parse, lines)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    baseline = None
+    for name, _ in paths:
+        rate = len(lines) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<14}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Parse + detect scaling of the historical import worker pool
+
+Runs parse_range over a synthetic access log with 1..N worker processes
+(no database writes, so only the parallel part is measured).
+
+    python -m benchmarks.bench_parallel_import [--lines 200000] [--max-workers 8]
+"""
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import ACCESS_TEMPLATES, synthetic_lines, write_lines, timed, print_header
+from services.historical_import import split_ranges, parse_range
+
+
+def run_pool(path, ranges, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_range, 'nginx_access', path, start, end) for start, end in ranges]
+        return sum(future.result()[1] for future in futures)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=200000)
+    arg_parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = arg_parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(prefix='soc-import-'), 'access.log')
+    write_lines(path, synthetic_lines(ACCESS_TEMPLATES, args.lines))
+    ranges = split_ranges(path, 1024 * 1024)
+    
+    print_header(f"Parallel parse, {args.lines} lines in {len(ranges)} ranges ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>8}{'lines/sec':>14}{'speedup':>10}")
+    
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        lines, elapsed = timed(run_pool, path, ranges, workers)
+        rate = lines / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8}{rate:>14.0f}{rate / baseline:>9.1f}x")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Literal prefilter in AttackDetector.analyze_http_request (requests/sec at
+several attack ratios): per-pattern re.search loop, combined regex per
+category without prefilter, and the prefilter with the regex scan and the
+Aho-Corasick (pyahocorasick) backends
+
+Every path must return the same threats as the per-pattern loop for a mix,
+the benign and attack corpora and DETECTION_EDGE_CASES; exits non-zero on any
+difference. The ahocorasick path is skipped when pyahocorasick isn't installed.
+
+    python -m benchmarks.bench_prefilter [--requests 50000] [--ratios 0,0.01,0.1,0.5,1] [--repeat 3]
+"""
+import argparse
+import sys
+
+from benchmarks.bench_attack_detector import analyze_all, analyze_per_pattern
+from benchmarks.common import (
+    ATTACK_REQUESTS, BENIGN_REQUESTS, DETECTION_EDGE_CASES, request_mix, timed, print_header
+)
+from services.attack_detector import AttackDetector
+from services.literal_prefilter import ahocorasick
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--requests', type=int, default=50000)
+    arg_parser.add_argument('--ratios', default='0,0.01,0.1,0.5,1', help="attack ratios, comma separated")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    # Plain re without per-rule timing or verdict cache everywhere, so only the prefilter differs
+    options = {'regex_engine': 're', 'rule_time_budget': None, 'verdict_cache_size': None}
+    reference = AttackDetector(prefilter=None, **options)
+    paths = [
+        ('per-pattern', lambda method, path, user_agent: analyze_per_pattern(reference, method, path, user_agent)),
+        ('combined', reference.analyze_http_request),
+        ('regex', AttackDetector(prefilter='regex', **options).analyze_http_request),
+    ]
+    if ahocorasick is not None:
+        automaton = AttackDetector(prefilter='ahocorasick', **options)
+        paths.append(('ahocorasick', automaton.analyze_http_request))
+    else:
+        print("pyahocorasick not installed: ahocorasick path skipped")
+    
+    checked = request_mix(args.requests, 0.5) + BENIGN_REQUESTS + ATTACK_REQUESTS + DETECTION_EDGE_CASES
+    print_header(f"Equivalence: {len(checked)} requests")
+    failed = False
+    for name, analyze in paths[1:]:
+        mismatches = [request for request in checked if analyze_per_pattern(reference, *request) != analyze(*request)]
+        print(f"{name} vs per-pattern mismatches: {len(mismatches)}")
+        for request in mismatches[:10]:
+            print(f"  MISMATCH {request!r}")
+        failed = failed or bool(mismatches)
+    if failed:
+        sys.exit(1)
+    
+    for ratio in map(float, args.ratios.split(',')):
+        requests = request_mix(args.requests, ratio)
+        print_header(f"attack ratio {ratio:g}: {len(requests)} requests")
+        best = {}
+        for _ in range(args.repeat):
+            for name, analyze in paths:
+                _, elapsed = timed(analyze_all, analyze, requests)
+                best[name] = min(best.get(name, elapsed), elapsed)
+        print(f"{'path':<14}{'requests/sec':>14}{'speedup':>10}")
+        baseline = None
+        for name, _ in paths:
+            rate = len(requests) / best[name] if best[name] else 0.0
+            baseline = baseline or rate
+            print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
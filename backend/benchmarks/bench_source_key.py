@@ -0,0 +1,128 @@
+"""
+Insert cost of the (source_id, inode, offset) unique key
+
+Rows are parsed up front and written in batches to nginx_access_logs:
+  no key index  - plain insert, unique index dropped (the old schema)
+  key index     - plain insert, index maintained
+  upsert        - ON CONFLICT DO NOTHING (what the watcher does)
+  upsert dups   - the same rows again, everything is skipped (restart / replay)
+COPY paths run on PostgreSQL, the executemany paths on any database.
+
+    python -m benchmarks.bench_source_key [--rows 50000] [--batch 500]
+"""
+import argparse
+
+from sqlalchemy import insert
+
+from benchmarks.common import ACCESS_TEMPLATES, synthetic_lines, timed, print_header
+from config.database import init_db, SessionLocal, engine
+from services.bulk_writer import BulkWriter
+from parsers.nginx_parser import NginxAccessParser
+from models.nginx_log import NginxAccessLog
+
+KEY_INDEX = 'uq_nginx_access_source'
+
+
+def key_index():
+    return next(index for index in NginxAccessLog.__table__.indexes if index.name == KEY_INDEX)
+
+
+def reset(with_index: bool):
+    db = SessionLocal()
+    try:
+        db.query(NginxAccessLog).delete()
+        db.commit()
+    finally:
+        db.close()
+    index = key_index()
+    if with_index:
+        index.create(engine, checkfirst=True)
+    else:
+        index.drop(engine, checkfirst=True)
+
+
+def write_batches(write, parser, parsed_list, batch_size):
+    db = SessionLocal()
+    try:
+        written = 0
+        for start in range(0, len(parsed_list), batch_size):
+            written += write(db, parsed_list[start:start + batch_size])
+            db.commit()
+        return written
+    finally:
+        db.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--rows', type=int, default=50000)
+    arg_parser.add_argument('--batch', type=int, default=500)
+    args = arg_parser.parse_args()
+    
+    init_db()
+    is_postgres = engine.dialect.name == 'postgresql'
+    
+    parser = NginxAccessParser()
+    lines = list(synthetic_lines(ACCESS_TEMPLATES, args.rows))
+    offsets = list(range(0, 200 * len(lines), 200))
+    keyed = parser.parse_lines(lines, keys=('bench', 1, offsets))
+    plain = [
+        {name: value for name, value in parsed.items() if not name.startswith('source_')}
+        for parsed in keyed
+    ]
+    
+    writer = BulkWriter('copy')
+    
+    def copy_rows(db, chunk):
+        writer.copy_rows(db, NginxAccessLog, [parser.build_row(parsed) for parsed in chunk])
+        return len(chunk)
+    
+    def copy_upsert(db, chunk):
+        rows = [parser.build_row(parsed) for parsed in chunk]
+        return len(writer.copy_rows_ignore(db, NginxAccessLog, rows))
+    
+    def plain_insert(db, chunk):
+        db.execute(insert(NginxAccessLog.__table__), [parser.build_row(parsed) for parsed in chunk])
+        return len(chunk)
+    
+    def upsert(db, chunk):
+        # INSERT ... ON CONFLICT DO NOTHING executemany
+        return parser._stage(chunk, db)
+    
+    paths = []
+    if is_postgres:
+        paths += [
+            ('copy', 'no key index', False, copy_rows, plain),
+            ('copy', 'key index', True, copy_rows, keyed),
+            ('copy', 'upsert', True, copy_upsert, keyed),
+            ('copy', 'upsert dups', None, copy_upsert, keyed),
+        ]
+    paths += [
+        ('insert', 'no key index', False, plain_insert, plain),
+        ('insert', 'key index', True, plain_insert, keyed),
+        ('insert', 'upsert', True, upsert, keyed),
+        ('insert', 'upsert dups', None, upsert, keyed),
+    ]
+    
+    print_header(f"Source key cost, {len(keyed)} rows in batches of {args.batch} ({engine.dialect.name})")
+    print(f"{'path':<8}{'mode':<15}{'rows/sec':>12}{'written':>10}{'vs no index':>13}")
+    
+    try:
+        baseline = {}
+        for path, mode, with_index, write, rows in paths:
+            if with_index is not None:
+                # 'upsert dups' runs against the rows the previous mode left behind
+                reset(with_index)
+            written, elapsed = timed(write_batches, write, parser, rows, args.batch)
+            rate = len(rows) / elapsed if elapsed else 0.0
+            baseline.setdefault(path, rate)
+            print(f"{path:<8}{mode:<15}{rate:>12.0f}{written:>10}{rate / baseline[path]:>12.2f}x")
+    finally:
+        reset(True)
+    
+    if not is_postgres:
+        print("\n(COPY paths skipped: set DATABASE_URL to a PostgreSQL database)")
+
+
+if __name__ == '__main__':
+    main()
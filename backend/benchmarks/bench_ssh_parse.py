@@ -0,0 +1,109 @@
+"""
+SSH parsing (lines/sec) on a realistic auth.log mix: old search-all-patterns loop
+vs the first-word dispatch
+
+First checks that both return the same result for every line of the mix (plus
+SSH_TEMPLATES). Exits non-zero on any difference.
+
+    python -m benchmarks.bench_ssh_parse [--lines 200000] [--repeat 3]
+"""
+import argparse
+import sys
+from collections import Counter
+
+from benchmarks.common import (
+    AUTH_LOG_MIX, SSH_TEMPLATES, synthetic_lines, weighted_templates, timed, print_header
+)
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.ssh_parser import SSHParser
+
+
+def parse_search_all(parser, log_line):
+    """The old SSHParser.parse: every pattern searched over every message"""
+    if not log_line or len(log_line) < 10:
+        return None
+    parsed = {'raw_log': log_line, 'event_type': 'unknown', 'status': 'unknown', 'is_suspicious': False}
+    parts = log_line.split()
+    if len(parts) < 5:
+        return None
+    parsed['log_timestamp'] = parser.decode_timestamp(' '.join(parts[0:3]))
+    parsed['host'] = parts[3]
+    if '[' in parts[4]:
+        process_part = parts[4].split('[')
+        parsed['process'] = process_part[0].replace(':', '')
+        if len(process_part) > 1:
+            parsed['pid'] = int(process_part[1].replace(']:', ''))
+    message = ' '.join(parts[5:])
+    for event_type, pattern in parser.patterns.items():
+        match = pattern.search(message)
+        if match:
+            parsed['event_type'] = event_type
+            data = match.groupdict()
+            parsed['username'] = data.get('user')
+            parsed['ip_address'] = data.get('ip')
+            parsed['auth_method'] = data.get('method')
+            if data.get('port'):
+                parsed['port'] = int(data['port'])
+            if event_type == 'accepted':
+                parsed['status'] = 'success'
+            elif event_type in ['failed', 'invalid_user']:
+                parsed['status'] = 'failed'
+                parsed['is_suspicious'] = True
+            elif event_type in ['session_opened', 'session_closed']:
+                parsed['status'] = 'session'
+            else:
+                parsed['status'] = 'closed'
+            break
+    if parsed.get('ip_address'):
+        if parser.is_suspicious_ip(parsed['ip_address']):
+            parsed['is_suspicious'] = True
+    return parsed
+
+
+def parse_all(parse, lines):
+    parsed = 0
+    for line in lines:
+        if parse(line):
+            parsed += 1
+    return parsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=200000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    parser = SSHParser()
+    old_parse = lambda line: parse_search_all(parser, line)
+    lines = list(synthetic_lines(weighted_templates(AUTH_LOG_MIX), args.lines))
+    
+    corpus = lines[:5000] + list(synthetic_lines(SSH_TEMPLATES, 1000))
+    mismatches = [line for line in corpus if parser.parse(line) != old_parse(line)]
+    events = Counter(parsed['event_type'] for parsed in map(parser.parse, lines) if parsed)
+    
+    print_header(f"Equivalence: {len(corpus)} lines")
+    print(f"mismatches {len(mismatches)}")
+    for line in mismatches[:10]:
+        print(f"  MISMATCH {line!r}")
+    print("events: " + ", ".join(f"{name} {100.0 * count / len(lines):.0f}%" for name, count in events.most_common()))
+    if mismatches:
+        sys.exit(1)
+    
+    print_header(f"Throughput: {len(lines)} auth.log lines")
+    print(f"{'path':<14}{'lines/sec':>12}{'speedup':>10}")
+    paths = (('search all', old_parse), ('dispatch', parser.parse))
+    best = {}
+    for _ in range(args.repeat):
+        for name, parse in paths:
+            _, elapsed = timed(parse_all, parse, lines)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    baseline = None
+    for name, _ in paths:
+        rate = len(lines) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        print(f"{name:<14}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
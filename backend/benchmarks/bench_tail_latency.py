@@ -0,0 +1,81 @@
+"""
+Line-to-row latency: inotify watch mode vs 2s polling
+
+Appends SSH lines one at a time with random gaps and measures the time until
+each line has been parsed and committed to the database.
+
+    python -m benchmarks.bench_tail_latency [--lines 30]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.common import SSH_TEMPLATES, synthetic_lines, percentile, print_header
+from config.database import init_db
+from services.log_multiplexer import LogMultiplexer
+from services.log_watcher import LogFilePoller
+from parsers.ssh_parser import SSHParser
+
+
+class TimingSSHParser(SSHParser):
+    """SSHParser that records when each line has been saved"""
+
+    def __init__(self):
+        super().__init__()
+        self.saved = threading.Semaphore(0)
+
+    def process_batch(self, lines, db_session, bulk_writer=None, keys=None):
+        result = super().process_batch(lines, db_session, bulk_writer, keys)
+        for _ in lines:
+            self.saved.release()
+        return result
+
+
+def measure(mode, lines, interval):
+    path = os.path.join(tempfile.mkdtemp(prefix='soc-tail-'), 'auth.log')
+    open(path, 'w').close()
+
+    parser = TimingSSHParser()
+    poller = LogFilePoller(parser, path, f"bench-{mode}")
+    multiplexer = LogMultiplexer([poller], watch_mode=mode, interval=interval)
+    multiplexer.start()
+    time.sleep(0.5)  # let the watch get established
+
+    rng = random.Random(7)
+    latencies = []
+    for line in lines:
+        time.sleep(rng.uniform(0.05, 0.3))
+        start = time.perf_counter()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        if not parser.saved.acquire(timeout=interval * 3):
+            print(f"  [{mode}] line not ingested within {interval * 3}s")
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    multiplexer.stop(timeout=interval + 1)
+    return latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=30)
+    arg_parser.add_argument('--interval', type=float, default=2.0)
+    args = arg_parser.parse_args()
+
+    init_db()
+    lines = list(synthetic_lines(SSH_TEMPLATES[:3], args.lines))
+
+    print_header("Line-to-row latency (ms)")
+    print(f"{'mode':<10}{'n':>6}{'p50':>10}{'p95':>10}{'max':>10}")
+    for mode in ('poll', 'inotify'):
+        latencies = [l * 1000 for l in measure(mode, lines, args.interval)]
+        print(f"{mode:<10}{len(latencies):>6}{percentile(latencies, 50):>10.1f}"
+              f"{percentile(latencies, 95):>10.1f}{max(latencies or [0]):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
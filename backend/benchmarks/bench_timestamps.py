@@ -0,0 +1,137 @@
+"""
+Timestamp decoding per parser: strptime loop vs fixed-position vs memoized
+
+Every fixed-position parser is first checked against strptime on
+TIMESTAMP_EDGE_CASES, then per parser on its synthetic timestamps as well
+(syslog results are compared without the year, which strptime leaves at 1900).
+Then:
+  timestamps/sec - strptime loop (old), fixed-position, fixed + memo cache
+  lines/sec      - whole parse() with the old strptime loop vs the decoder
+
+    python -m benchmarks.bench_timestamps [--lines 100000]
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from benchmarks.common import (
+    ACCESS_TEMPLATES, ERROR_TEMPLATES, SSH_TEMPLATES, synthetic_lines, timed, print_header
+)
+import services  # noqa: F401  (parsers import services.attack_detector)
+from parsers.nginx_parser import NginxAccessParser, NginxErrorParser
+from parsers.ssh_parser import SSHParser
+from parsers.timestamps import FIXED_PARSERS, TimestampDecoder
+
+TIMESTAMP_EDGE_CASES = [
+    '01/Jan/2026:00:00:00 -0530', '23/Dec/2025:11:20:00 +0000', '29/Feb/2024:12:00:00 +0100',
+    '29/Feb/2025:12:00:00 +0100', '31/Apr/2025:12:00:00 +0100', '23/dec/2025:11:20:00 +0700',
+    '23/Dec/2025:11:20:00 +07:00', '23/Dec/2025:11:20:00 +0760', '23/Dec/2025:24:00:00 +0700',
+    '23/Dec/2025:11:60:00 +0700', '23/Dec/2025:11:20:60 +0700', '3/Dec/2025:11:20:00 +0700',
+    '2025/12/23 11:20:00', '2025/02/30 11:20:00', '2025/13/01 11:20:00', '2025/1/01 11:20:00',
+    '2025/12/23 11:20:0x', '0000/01/01 00:00:00',
+    'Dec 23 14:30:45', 'Dec 3 14:30:45', 'Feb 29 10:00:00', 'Feb 30 10:00:00', 'DEC 23 14:30:45',
+    'Dec 23 24:30:45', 'Dec 23 1:30:45', 'Foo 23 14:30:45', '2024-12-23 14:30:45',
+    '2024-12-23T14:30:45', '2025-12-23T11:20:00+07:00', '2025-12-23T11:20:00-05:30',
+    '2025-12-23T11:20:00+0700', '2025-12-23T11:20:00Z', '2025-12-23T11:20:00+07:60',
+    '2025-12-23T11:20:00+24:00', '2025-02-30T11:20:00+07:00', '', 'garbage',
+]
+
+
+def strptime_loop(value, formats):
+    """The old BaseParser.parse_timestamp: try each format, exceptions on every miss"""
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def check(formats, values):
+    """Fixed-position result must equal strptime (syslog: ignoring the year)"""
+    decoder = TimestampDecoder(formats, cache_size=0)
+    mismatches = []
+    for value in values:
+        expected = strptime_loop(value, formats)
+        result = decoder.decode(value)
+        if expected is not None and expected.year == 1900 and result is not None:
+            result = result.replace(year=1900)
+        if result != expected:
+            mismatches.append((value, expected, result))
+    return mismatches
+
+
+def decode_all(decode, values):
+    for value in values:
+        decode(value)
+    return len(values)
+
+
+def parse_all(parser, lines):
+    return sum(1 for line in lines if parser.parse(line))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=100000)
+    args = arg_parser.parse_args()
+    
+    sources = (
+        ('nginx_access', NginxAccessParser(), ACCESS_TEMPLATES, lambda p: p['raw_log'].split('[', 1)[1][:26]),
+        ('nginx_error', NginxErrorParser(), ERROR_TEMPLATES, lambda p: p['raw_log'][:19]),
+        ('ssh', SSHParser(), SSH_TEMPLATES, lambda p: ' '.join(p['raw_log'].split()[:3])),
+    )
+    
+    failed = False
+    for fmt in FIXED_PARSERS:
+        mismatches = check([fmt], TIMESTAMP_EDGE_CASES)
+        for value, expected, result in mismatches:
+            print(f"  MISMATCH {fmt!r} {value!r}: strptime {expected}, fixed {result}")
+        failed = failed or bool(mismatches)
+    
+    for label, parser, templates, timestamp_of in sources:
+        formats = list(parser.decode_timestamp.formats)
+        lines = list(synthetic_lines(templates, args.lines))
+        values = [timestamp_of(parsed) for parsed in map(parser.parse, lines) if parsed]
+        
+        mismatches = check(formats, set(values) | set(TIMESTAMP_EDGE_CASES))
+        print_header(f"{label}: {len(values)} timestamps, {len(set(values))} distinct")
+        print(f"fixed-position vs strptime mismatches: {len(mismatches)}")
+        for value, expected, result in mismatches[:10]:
+            print(f"  MISMATCH {value!r}: strptime {expected}, fixed {result}")
+        failed = failed or bool(mismatches)
+        
+        uncached = TimestampDecoder(formats, cache_size=0)
+        cached = TimestampDecoder(formats)
+        print(f"{'decode':<16}{'per sec':>12}{'speedup':>10}")
+        baseline = None
+        for name, decode in (
+            ('strptime loop', lambda value: strptime_loop(value, formats)),
+            ('fixed', uncached),
+            ('fixed + memo', cached),
+        ):
+            count, elapsed = timed(decode_all, decode, values)
+            rate = count / elapsed if elapsed else 0.0
+            baseline = baseline or rate
+            print(f"{name:<16}{rate:>12.0f}{rate / baseline:>9.1f}x")
+        print(f"  memo hit rate {100.0 * cached.hits / max(1, cached.hits + cached.misses):.1f}%")
+        
+        decoder = parser.decode_timestamp
+        baseline = None
+        for name, decode in (
+            ('parse, strptime', lambda value: strptime_loop(value, formats)),
+            ('parse, decoder', decoder),
+        ):
+            parser.decode_timestamp = decode
+            count, elapsed = timed(parse_all, parser, lines)
+            rate = len(lines) / elapsed if elapsed else 0.0
+            baseline = baseline or rate
+            print(f"{name:<16}{rate:>12.0f}{rate / baseline:>9.1f}x  lines/sec")
+        parser.decode_timestamp = decoder
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
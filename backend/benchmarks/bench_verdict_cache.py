@@ -0,0 +1,99 @@
+"""
+Verdict cache in AttackDetector.analyze_http_request: requests/sec without
+cache vs LRU caches of several sizes on repetitive traffic, with hit / miss /
+eviction counters
+
+Traffic draws from a pool of distinct requests with a heavy-tailed popularity
+(health checks, crawlers and assets repeat, the tail is seen once or twice).
+Cached verdicts must equal uncached ones, and swapping in a changed ruleset
+must invalidate them; exits non-zero otherwise.
+
+    python -m benchmarks.bench_verdict_cache [--requests 100000] [--distinct 20000] [--sizes 1024,4096,16384] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.bench_attack_detector import analyze_all
+from benchmarks.common import request_mix, timed, print_header
+from services.attack_detector import AttackDetector
+from services.rule_engine import read_ruleset
+from services.verdict_cache import VerdictCache
+
+
+def repetitive_traffic(count, distinct, seed=42):
+    """count requests dari pool of distinct requests: 80% Pareto-popular, 20% uniform tail"""
+    rng = random.Random(seed)
+    pool = [
+        (method, f"{path}&v={i}" if '?' in path else f"{path}?v={i}", user_agent)
+        for i, (method, path, user_agent) in enumerate(request_mix(distinct, 0.05, seed))
+    ]
+    return [
+        pool[int(rng.paretovariate(1.0)) % distinct if rng.random() < 0.8 else rng.randrange(distinct)]
+        for _ in range(count)
+    ]
+
+
+def check_invalidation() -> bool:
+    """A new rule must show up for a signature that was cached as benign"""
+    detector = AttackDetector(reload_interval=None)
+    request = ('GET', '/healthz', 'kube-probe/1.29')
+    before = detector.analyze_http_request(*request)
+    detector.analyze_http_request(*request)
+    data = read_ruleset(detector.rules_path)
+    data['rules'].append({
+        'id': 'path-healthz', 'category': 'suspicious_path', 'severity': 'LOW', 'fields': ['path'], 'pattern': r"/healthz"
+    })
+    detector.use_ruleset(detector.compile_rules(data))
+    after = detector.analyze_http_request(*request)
+    return not before and [threat['rule_id'] for threat in after] == ['path-healthz']
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--requests', type=int, default=100000)
+    arg_parser.add_argument('--distinct', type=int, default=20000, help="distinct requests in the pool")
+    arg_parser.add_argument('--sizes', default='1024,4096,16384', help="cache sizes, comma separated")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="best of N, paths interleaved")
+    args = arg_parser.parse_args()
+    
+    requests = repetitive_traffic(args.requests, args.distinct)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    uncached = AttackDetector(verdict_cache_size=None)
+    paths = [('no cache', uncached)] + [(f"lru {size}", AttackDetector(verdict_cache_size=size)) for size in sizes]
+    
+    print_header(f"Equivalence: {len(requests)} requests, {len(set(requests))} distinct")
+    mismatches = 0
+    for name, detector in paths[1:]:
+        mismatches += sum(
+            1 for request in requests
+            if detector.analyze_http_request(*request) != uncached.analyze_http_request(*request)
+        )
+    print(f"cached vs uncached mismatches: {mismatches}")
+    invalidated = check_invalidation()
+    print(f"rule change invalidates cached verdicts: {invalidated}")
+    if mismatches or not invalidated:
+        sys.exit(1)
+    
+    print_header("Throughput")
+    best = {}
+    for _ in range(args.repeat):
+        for name, detector in paths:
+            if detector.verdict_cache is not None:
+                detector.verdict_cache = VerdictCache(detector.verdict_cache.max_size)  # cold, fresh counters
+            _, elapsed = timed(analyze_all, detector.analyze_http_request, requests)
+            best[name] = min(best.get(name, elapsed), elapsed)
+    print(f"{'path':<14}{'requests/sec':>14}{'speedup':>10}{'hit ratio':>11}{'evictions':>11}")
+    baseline = None
+    for name, detector in paths:
+        rate = len(requests) / best[name] if best[name] else 0.0
+        baseline = baseline or rate
+        stats = detector.cache_stats()
+        # Counters of the last run
+        hit_ratio = f"{stats['hit_ratio']:.2f}" if stats else '-'
+        evictions = str(stats['evictions']) if stats else '-'
+        print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.2f}x{hit_ratio:>11}{evictions:>11}")
+
+
+if __name__ == '__main__':
+    main()
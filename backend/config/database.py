@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError, InterfaceError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -12,6 +13,15 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=10, max_overf
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Database down / connection lost (not a bad row). Raw DBAPI errors are included
+# because COPY goes through the driver cursor directly
+DB_UNAVAILABLE_ERRORS = (
+    OperationalError,
+    InterfaceError,
+    engine.dialect.loaded_dbapi.OperationalError,
+    engine.dialect.loaded_dbapi.InterfaceError,
+)
+
 def get_db():
     """Database dependency untuk FastAPI"""
     db = SessionLocal()
@@ -23,4 +33,23 @@ def get_db():
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
-    print("✓ Database tables created successfully")
\ No newline at end of file
+    migrate_db()
+    print("✓ Database tables created successfully")
+
+def migrate_db():
+    """
+    Add columns dan indexes yang ditambahkan setelah table dibuat
+    (create_all hanya membuat table yang belum ada)
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                print(f"✓ Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
\ No newline at end of file
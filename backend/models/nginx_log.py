@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, Text, Index
 from datetime import datetime
 from config.database import Base
 
@@ -21,9 +21,15 @@ class NginxAccessLog(Base):
     raw_log = Column(Text)
     country = Column(String(100), nullable=True)
     
+    # Source position (log source, inode, byte offset of the line) - re-reads are no-ops
+    source_id = Column(String(255), nullable=True)
+    source_inode = Column(BigInteger, nullable=True)
+    source_offset = Column(BigInteger, nullable=True)
+    
     __table_args__ = (
         Index('idx_nginx_timestamp_status', 'timestamp', 'status_code'),
         Index('idx_nginx_ip_method', 'ip_address', 'method'),
+        Index('uq_nginx_access_source', 'source_id', 'source_inode', 'source_offset', unique=True),
     )
     
     def __repr__(self):
@@ -45,8 +51,14 @@ class NginxErrorLog(Base):
     message = Column(Text)
     raw_log = Column(Text)
     
+    # Source position (log source, inode, byte offset of the line) - re-reads are no-ops
+    source_id = Column(String(255), nullable=True)
+    source_inode = Column(BigInteger, nullable=True)
+    source_offset = Column(BigInteger, nullable=True)
+    
     __table_args__ = (
         Index('idx_nginx_error_timestamp_level', 'timestamp', 'level'),
+        Index('uq_nginx_error_source', 'source_id', 'source_inode', 'source_offset', unique=True),
     )
     
     def __repr__(self):
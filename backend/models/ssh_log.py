@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, Index
 from datetime import datetime
 from config.database import Base
 
@@ -22,11 +22,17 @@ class SSHLog(Base):
     is_suspicious = Column(Boolean, default=False, index=True)
     country = Column(String(100), nullable=True)
     
+    # Source position (log source, inode, byte offset of the line) - re-reads are no-ops
+    source_id = Column(String(255), nullable=True)
+    source_inode = Column(BigInteger, nullable=True)
+    source_offset = Column(BigInteger, nullable=True)
+    
     # Indexes untuk query performance
     __table_args__ = (
         Index('idx_ssh_timestamp_status', 'timestamp', 'status'),
         Index('idx_ssh_ip_status', 'ip_address', 'status'),
         Index('idx_ssh_user_ip', 'username', 'ip_address'),
+        Index('uq_ssh_source', 'source_id', 'source_inode', 'source_offset', unique=True),
     )
     
     def __repr__(self):
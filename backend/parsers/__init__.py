@@ -1,8 +1,41 @@
 from .base_parser import BaseParser
 from .ssh_parser import SSHParser
 from .nginx_parser import NginxAccessParser, NginxErrorParser
+from .nginx_json_parser import NginxJsonAccessParser
+from .log_format import is_json_format
 
-__all__ = ['BaseParser', 'SSHParser', 'NginxAccessParser', 'NginxErrorParser']
+# Parser class per log type (used by the import CLI and worker processes)
+PARSER_TYPES = {
+    'ssh': SSHParser,
+    'nginx_access': NginxAccessParser,
+    'nginx_error': NginxErrorParser,
+    'nginx_json': NginxJsonAccessParser,
+}
+
+# Log types whose parser takes a nginx log_format
+LOG_FORMAT_TYPES = ('nginx_access', 'nginx_json')
+
+
+def create_access_parser(log_format: str = None) -> NginxAccessParser:
+    """nginx access parser untuk log_format: JSON lines (escape=json) atau compiled/combined"""
+    if is_json_format(log_format):
+        return NginxJsonAccessParser(log_format)
+    return NginxAccessParser(log_format)
+
+
+def create_parser(log_type: str, log_format: str = None) -> BaseParser:
+    """Parser untuk log_type, dengan optional log_format (nginx access types saja)"""
+    if log_format:
+        if log_type not in LOG_FORMAT_TYPES:
+            raise ValueError(f"{log_type} does not take a log_format")
+        if log_type == 'nginx_access':
+            return create_access_parser(log_format)
+        return PARSER_TYPES[log_type](log_format=log_format)
+    return PARSER_TYPES[log_type]()
+
+
+__all__ = ['BaseParser', 'SSHParser', 'NginxAccessParser', 'NginxErrorParser', 'NginxJsonAccessParser',
+           'PARSER_TYPES', 'LOG_FORMAT_TYPES', 'create_access_parser', 'create_parser']
 
 
 
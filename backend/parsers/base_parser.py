@@ -1,10 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Iterable, Iterator, List, Sequence, Tuple
 from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config.database import DB_UNAVAILABLE_ERRORS
+from parsers.columns import ColumnBatch
+from parsers.timestamps import decoder
+from models.attack_log import AttackLog
+
+# Rows are identified by where they were read: (source_id, inode, byte offset of the line)
+SOURCE_KEY = ('source_id', 'source_inode', 'source_offset')
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+INSERT_IGNORE = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert,
+}
 
 class BaseParser(ABC):
     """Base class untuk semua log parsers"""
     
+    # ORM model (table) yang diisi oleh parser ini
+    model = None
+    
     def __init__(self):
         self.name = self.__class__.__name__
     
@@ -17,12 +36,107 @@ class BaseParser(ABC):
         pass
     
     @abstractmethod
+    def build_row(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Map parsed data ke column values dari self.model
+        """
+        pass
+    
+    def build_attack_rows(self, parsed_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Column values untuk AttackLog rows (tanpa related_log_id)
+        """
+        return []
+    
+    def build_log_entry(self, parsed_data: Dict[str, Any]):
+        """Build ORM object untuk parsed data (belum di-add ke session)"""
+        return self.model(**self.build_row(parsed_data))
+    
+    def build_attack_logs(self, parsed_data: Dict[str, Any], log_entry) -> List[AttackLog]:
+        """Build AttackLog objects related to log_entry (log_entry.id sudah terisi)"""
+        return [
+            AttackLog(related_log_id=log_entry.id, **row)
+            for row in self.build_attack_rows(parsed_data)
+        ]
+    
+    def detect(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Attack detection untuk parsed data (separate stage, setelah parse)
+        Returns: parsed_data, ditambah hasil detection jika ada
+        """
+        return parsed_data
+    
+    def has_attacks(self, parsed_data: Dict[str, Any]) -> bool:
+        """True jika parsed data butuh AttackLog rows (perlu flush untuk id)"""
+        return False
+    
+    def report(self, parsed_data: Dict[str, Any]):
+        """Hook setelah data tersimpan (logging, alerts)"""
+        pass
+    
+    def _stage(self, parsed_list: List[Dict[str, Any]], db_session) -> int:
+        """
+        Add entries (and related attack logs) to session without committing
+        Returns: jumlah rows baru (rows dengan source key yang sudah ada di-skip)
+        """
+        insert_ignore = INSERT_IGNORE.get(db_session.get_bind().dialect.name)
+        if insert_ignore is not None and parsed_list[0].get('source_offset') is not None:
+            return self._stage_keyed(parsed_list, db_session, insert_ignore)
+        
+        entries = [self.build_log_entry(parsed) for parsed in parsed_list]
+        db_session.add_all(entries)
+        
+        # Only pay for a flush when some row needs its generated id
+        attack_indexes = [i for i, parsed in enumerate(parsed_list) if self.has_attacks(parsed)]
+        if attack_indexes:
+            db_session.flush()
+            for i in attack_indexes:
+                db_session.add_all(self.build_attack_logs(parsed_list[i], entries[i]))
+        return len(entries)
+    
+    def _stage_keyed(self, parsed_list: List[Dict[str, Any]], db_session, insert_ignore) -> int:
+        """
+        INSERT ... ON CONFLICT (source key) DO NOTHING, so re-reading lines
+        (restart without checkpoint, spool replay) doesn't duplicate them.
+        Attack logs are only added for rows that were actually inserted
+        """
+        table = self.model.__table__
+        key_columns = [table.c[name] for name in SOURCE_KEY]
+        stmt = insert_ignore(table).on_conflict_do_nothing(index_elements=key_columns)
+        rows = [self.build_row(parsed) for parsed in parsed_list]
+        
+        if not any(self.has_attacks(parsed) for parsed in parsed_list):
+            return db_session.execute(stmt, rows).rowcount
+        
+        result = db_session.execute(stmt.returning(table.c.id, *key_columns), rows)
+        inserted = {tuple(row[1:]): row[0] for row in result}
+        attack_rows = []
+        for parsed in parsed_list:
+            row_id = inserted.get(tuple(parsed.get(name) for name in SOURCE_KEY))
+            if row_id is None or not self.has_attacks(parsed):
+                continue
+            for attack_row in self.build_attack_rows(parsed):
+                attack_row['related_log_id'] = row_id
+                attack_rows.append(attack_row)
+        if attack_rows:
+            db_session.execute(insert(AttackLog), attack_rows)
+        return len(inserted)
+    
     def save_to_db(self, parsed_data: Dict[str, Any], db_session) -> bool:
         """
         Save parsed data ke database
         Returns: True jika sukses, False jika gagal
         """
-        pass
+        try:
+            self._stage([parsed_data], db_session)
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            print(f"[{self.name}] Error saving to DB: {e}")
+            return False
+        
+        self.report(parsed_data)
+        return True
     
     def process_log_line(self, log_line: str, db_session) -> bool:
         """
@@ -31,21 +145,160 @@ class BaseParser(ABC):
         try:
             parsed = self.parse(log_line.strip())
             if parsed:
-                return self.save_to_db(parsed, db_session)
+                return self.save_to_db(self.detect(parsed), db_session)
             return False
         except Exception as e:
             print(f"[{self.name}] Error processing log: {e}")
             return False
     
-    @staticmethod
-    def parse_timestamp(timestamp_str: str, formats: list) -> Optional[datetime]:
-        """Helper untuk parse berbagai format timestamp"""
-        for fmt in formats:
+    def _parse_keyed(self, lines: Iterable[str],
+                     keys: Optional[Tuple[str, int, Sequence[int]]]) -> Iterator[Dict[str, Any]]:
+        """Parsed dicts (dengan source key jika ada), skipping blanks and lines that don't parse"""
+        if keys is not None:
+            source_id, inode, offsets = keys
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
             try:
-                return datetime.strptime(timestamp_str, fmt)
-            except ValueError:
+                parsed = self.parse(line)
+            except Exception as e:
+                print(f"[{self.name}] Error parsing log: {e}")
                 continue
-        return None
+            if parsed:
+                if keys is not None:
+                    parsed['source_id'] = source_id
+                    parsed['source_inode'] = inode
+                    parsed['source_offset'] = offsets[i]
+                yield parsed
+    
+    def parse_lines(self, lines: Iterable[str], detect: bool = True,
+                    keys: Optional[Tuple[str, int, Sequence[int]]] = None) -> List[Dict[str, Any]]:
+        """
+        Parse lines, skipping blanks and lines that don't parse
+        detect: run attack detection too (off when detection is its own stage)
+        keys: (source_id, inode, byte offset per line) - stored on each row
+              so writes can skip lines that were already saved
+        """
+        parsed_iter = self._parse_keyed(lines, keys)
+        if detect:
+            return [self.detect(parsed) for parsed in parsed_iter]
+        return list(parsed_iter)
+    
+    def column_names(self) -> Tuple[str, ...]:
+        """Column names dari build_row (ColumnBatch order)"""
+        names = getattr(self, '_column_names', None)
+        if names is None:
+            names = self._column_names = tuple(self.build_row({}))
+        return names
+    
+    def parse_batch(self, lines: Iterable[str], detect: bool = True,
+                    keys: Optional[Tuple[str, int, Sequence[int]]] = None) -> ColumnBatch:
+        """
+        Parse lines ke ColumnBatch: build_row values per column, tanpa
+        parsed dict per row yang disimpan (lihat parse_lines untuk detect/keys)
+        """
+        build_row = self.build_row
+        batch = ColumnBatch.from_rows(
+            self.column_names(),
+            [tuple(build_row(parsed).values()) for parsed in self._parse_keyed(lines, keys)]
+        )
+        return self.detect_batch(batch) if detect else batch
+    
+    def detect_batch(self, batch: ColumnBatch) -> ColumnBatch:
+        """
+        detect() untuk ColumnBatch; hasil detection (non-empty keys selain columns)
+        masuk batch.extras - has_attacks/report are only asked for rows that have extras
+        Default: detect() on a dict per row; override to read the columns directly
+        """
+        if type(self).detect is BaseParser.detect:
+            return batch
+        names = set(batch.names)
+        for index, parsed in enumerate(batch.rows()):
+            extra = {key: value for key, value in self.detect(parsed).items() if key not in names and value}
+            if extra:
+                batch.extras[index] = extra
+        return batch
+    
+    def report_batch(self, batch: ColumnBatch):
+        """report() untuk rows dengan detection results"""
+        for index in sorted(batch.extras):
+            self.report(batch.row(index))
+    
+    def save_batch(self, parsed_list: List[Dict[str, Any]], db_session, bulk_writer=None,
+                   report: bool = True) -> int:
+        """
+        Save parsed data dalam satu transaction
+        bulk_writer: optional BulkWriter (COPY); default ORM add()
+        report: call report() per row (off for bulk imports)
+        Jika batch gagal, retry per row supaya satu row rusak tidak menghilangkan batch
+        Raises DB_UNAVAILABLE_ERRORS jika database tidak bisa dihubungi
+        Returns: jumlah rows yang tersimpan (tanpa rows yang sudah ada)
+        """
+        if not parsed_list:
+            return 0
+        
+        if bulk_writer is not None:
+            write = lambda: bulk_writer.write(self, parsed_list, db_session)
+        else:
+            write = lambda: self._stage(parsed_list, db_session)
+        saved, batched = self._commit(write, db_session, len(parsed_list), lambda: parsed_list)
+        
+        if report and batched:
+            for parsed in parsed_list:
+                self.report(parsed)
+        return saved
+    
+    def save_columns(self, batch: ColumnBatch, db_session, bulk_writer=None,
+                     report: bool = True) -> int:
+        """
+        save_batch untuk ColumnBatch: COPY langsung dari columns jika
+        bulk_writer pakai COPY, selain itu lewat parsed dicts (ORM path)
+        """
+        if not len(batch):
+            return 0
+        if bulk_writer is None or not bulk_writer.uses_copy(db_session):
+            return self.save_batch(batch.to_parsed(), db_session, bulk_writer, report)
+        
+        write = lambda: bulk_writer.write_columns(self, batch, db_session)
+        saved, batched = self._commit(write, db_session, len(batch), batch.to_parsed)
+        
+        if report and batched:
+            self.report_batch(batch)
+        return saved
+    
+    def _commit(self, write: Callable[[], int], db_session, size: int,
+                parsed_rows: Callable[[], List[Dict[str, Any]]]) -> Tuple[int, bool]:
+        """
+        Run write() dan commit; jika gagal, retry per row (save_to_db)
+        Returns: (rows saved, False jika per-row retry - rows sudah di-report)
+        """
+        try:
+            saved = write()
+            db_session.commit()
+        except DB_UNAVAILABLE_ERRORS:
+            # Not a bad row - per-row retry would only fail again, let caller spool / retry
+            db_session.rollback()
+            raise
+        except Exception as e:
+            db_session.rollback()
+            print(f"[{self.name}] Batch of {size} failed ({e}), retrying per line")
+            return sum(1 for parsed in parsed_rows() if self.save_to_db(parsed, db_session)), False
+        return saved, True
+    
+    def process_batch(self, lines: Iterable[str], db_session, bulk_writer=None,
+                      keys: Optional[Tuple[str, int, Sequence[int]]] = None) -> int:
+        """
+        Parse dan save banyak lines dalam satu transaction
+        keys: lihat parse_lines
+        Returns: jumlah lines yang tersimpan
+        """
+        return self.save_batch(self.parse_lines(lines, keys=keys), db_session, bulk_writer)
+    
+    @staticmethod
+    def parse_timestamp(timestamp_str: str, formats: list) -> Optional[datetime]:
+        """Helper untuk parse berbagai format timestamp (memoized, lihat parsers.timestamps)"""
+        return decoder(formats)(timestamp_str)
     
     def is_suspicious_ip(self, ip: str) -> bool:
         """Basic check untuk suspicious IP (bisa dikembangkan)"""
@@ -0,0 +1,62 @@
+"""
+Columnar batches
+Parsed lines of one batch as one list per column (build_row keys), so the
+bulk writer and aggregates read whole columns instead of a dict per row.
+Per-row data that is not a column (detection results) lives in extras
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+class ColumnBatch:
+    """Column name -> values, plus extras {row index: extra parsed fields}"""
+    
+    __slots__ = ('names', 'columns', 'extras')
+    
+    def __init__(self, names: Sequence[str], columns: List[list] = None,
+                 extras: Dict[int, Dict[str, Any]] = None):
+        self.names = tuple(names)
+        self.columns = columns if columns is not None else [[] for _ in self.names]
+        self.extras = extras if extras is not None else {}
+    
+    @classmethod
+    def from_rows(cls, names: Sequence[str], rows: Iterable[Tuple]) -> 'ColumnBatch':
+        """Row tuples (values in names order) -> columns, transposed in one pass"""
+        columns = [list(column) for column in zip(*rows)]
+        return cls(names, columns or None)
+    
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+    
+    def column(self, name: str) -> list:
+        return self.columns[self.names.index(name)]
+    
+    def as_dict(self) -> Dict[str, list]:
+        return dict(zip(self.names, self.columns))
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """Satu row sebagai parsed dict (columns + extras)"""
+        parsed = {name: column[index] for name, column in zip(self.names, self.columns)}
+        extra = self.extras.get(index)
+        if extra:
+            parsed.update(extra)
+        return parsed
+    
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Parsed dicts untuk dict-based paths (ORM writes, spool, per-line retry)"""
+        extras = self.extras
+        for index, values in enumerate(zip(*self.columns)):
+            parsed = dict(zip(self.names, values))
+            if index in extras:
+                parsed.update(extras[index])
+            yield parsed
+    
+    def to_parsed(self) -> List[Dict[str, Any]]:
+        return list(self.rows())
+    
+    def slice(self, start: int, stop: int) -> 'ColumnBatch':
+        """Rows [start, stop) sebagai batch baru (extras re-indexed)"""
+        return ColumnBatch(
+            self.names,
+            [column[start:stop] for column in self.columns],
+            {index - start: extra for index, extra in self.extras.items() if start <= index < stop}
+        )
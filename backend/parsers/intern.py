@@ -0,0 +1,73 @@
+"""
+Intern tables untuk string fields yang sangat repetitive (method, protocol,
+host, process, user agents, ...)
+Parsers slice a fresh string per line; an intern table returns one shared
+instance per distinct value instead, so a batch keeps one copy of "GET" or
+"Mozilla/5.0 ..." and equality checks hit the identity fast path
+"""
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Dict, Optional
+
+# Distinct values kept by a low-cardinality table; later newcomers are not interned
+TABLE_SIZE = 1024
+
+# Distinct values kept by an LRU table (user agents, referers, usernames)
+LRU_SIZE = 8192
+
+
+class InternTable:
+    """
+    Bounded intern table untuk low-cardinality fields
+    Once full, new values pass through un-interned, so junk from hostile
+    input can't grow it (or evict the common values)
+    """
+    
+    __slots__ = ('max_size', '_values')
+    
+    def __init__(self, max_size: int = TABLE_SIZE):
+        self.max_size = max_size
+        self._values: Dict[str, str] = {}
+    
+    def __call__(self, value: Optional[str]) -> Optional[str]:
+        values = self._values
+        try:
+            return values[value]
+        except KeyError:
+            if len(values) < self.max_size:
+                values[value] = value
+            return value
+    
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def lru_intern_table(max_size: int = LRU_SIZE) -> Callable[[Optional[str]], Optional[str]]:
+    """
+    Intern table untuk fields dengan long tail (user agents): least recently
+    used values are evicted, so the popular ones stay shared.
+    lru_cache on the identity function returns the first instance seen (C, thread-safe)
+    """
+    return lru_cache(maxsize=max_size)(_identity)
+
+
+def _identity(value):
+    return value
+
+
+# Fields yang memakai lru_intern_table (long tail); lainnya InternTable
+LRU_FIELDS = ('user_agent', 'referer', 'username')
+
+_tables: Dict[str, Callable[[Optional[str]], Optional[str]]] = {}
+_tables_lock = Lock()
+
+
+def intern_table(field: str) -> Callable[[Optional[str]], Optional[str]]:
+    """Shared intern table untuk field (satu per field, dipakai semua parsers)"""
+    table = _tables.get(field)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(field)
+            if table is None:
+                table = _tables[field] = lru_intern_table() if field in LRU_FIELDS else InternTable()
+    return table
@@ -0,0 +1,224 @@
+"""
+Compiler untuk nginx log_format directives
+A log_format string is turned into Python source once (literal delimiters ->
+str.find + slicing, one typed converter per known variable) and exec'd into
+a plain function: parse(line) -> parsed dict atau None
+"""
+import json
+import re
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from parsers.intern import intern_table
+from parsers.timestamps import decoder
+
+# Named formats (nginx built-in 'combined' + the common variants)
+COMBINED = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent "$http_referer" "$http_user_agent"'
+LOG_FORMATS = {
+    'combined': COMBINED,
+    # nginx.conf default 'main'
+    'main': COMBINED + ' "$http_x_forwarded_for"',
+    'timed_combined': COMBINED + ' $request_time $upstream_response_time',
+    # JSON lines keyed by variable name (parsed by NginxJsonAccessParser)
+    'json': 'escape=json {' + ','.join(
+        f'"{name}":"${name}"' for name in (
+            'time_iso8601', 'remote_addr', 'remote_user', 'request', 'status', 'body_bytes_sent',
+            'http_referer', 'http_user_agent', 'request_time', 'upstream_response_time'
+        )
+    ) + '}',
+}
+
+# nginx variable -> (parsed key, converter); other variables are sliced and dropped
+VARIABLES = {
+    'remote_addr': ('ip_address', 'str'),
+    'time_local': ('log_timestamp', 'time_local'),
+    'time_iso8601': ('log_timestamp', 'time_iso8601'),
+    'msec': ('log_timestamp', 'msec'),
+    'request': (None, 'request'),
+    'request_method': ('method', 'str'),
+    'request_uri': ('path', 'str'),
+    'uri': ('path', 'str'),
+    'server_protocol': ('protocol', 'str'),
+    'status': ('status_code', 'int'),
+    'body_bytes_sent': ('response_size', 'size'),
+    'bytes_sent': ('response_size', 'size'),
+    'http_referer': ('referer', 'dash'),
+    'http_user_agent': ('user_agent', 'dash'),
+    'request_time': ('request_time', 'float'),
+    'upstream_response_time': ('upstream_time', 'upstream_time'),
+}
+
+ESCAPES = ('default', 'json', 'none')
+
+# Parsed keys that go through a shared intern table (parsers.intern)
+INTERNED = ('method', 'protocol', 'referer', 'user_agent')
+
+_VARIABLE = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+
+
+def tokenize(log_format: str) -> List[Tuple[str, str]]:
+    """[('literal', text) / ('variable', name), ...]"""
+    tokens = []
+    position = 0
+    for match in _VARIABLE.finditer(log_format):
+        if match.start() > position:
+            tokens.append(('literal', log_format[position:match.start()]))
+        tokens.append(('variable', match.group(1) or match.group(2)))
+        position = match.end()
+    if position < len(log_format):
+        tokens.append(('literal', log_format[position:]))
+    return tokens
+
+
+def upstream_time(value: str) -> Optional[float]:
+    """'0.004, 0.010 : 0.002' (one per upstream tried) -> total; None jika tidak ada angka"""
+    times = [float(part) for part in re.split(r'[,:]', value) if part.strip() not in ('', '-')]
+    return sum(times) if times else None
+
+
+def unescape_json(value: str) -> str:
+    """escape=json values (\\" \\\\ \\u00XX ...)"""
+    return json.loads('"' + value + '"') if '\\' in value else value
+
+
+def msec_time(value: str) -> datetime:
+    """$msec: '1766463600.123' (epoch seconds) -> aware datetime, ValueError jika out of range"""
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except (OverflowError, OSError):
+        # inf, 1e300, -1e20: outside the platform's time_t
+        raise ValueError(f"$msec out of range: {value!r}") from None
+
+
+def _interned(key: str, value: str) -> str:
+    return f"intern_{key}({value})" if key in INTERNED else value
+
+
+def _converter_code(name: str, value: str, key: Optional[str], converter: str) -> Tuple[List[str], List[str]]:
+    """(dict literal items, statements) untuk satu variable"""
+    if converter == 'str':
+        return [f"'{key}': {_interned(key, value)}"], []
+    if converter == 'dash':
+        return [f"'{key}': {_interned(key, value)} if {value} != '-' else None"], []
+    if converter == 'int':
+        return [f"'{key}': int({value})"], [f"if not {value}.isdecimal(): return None"]
+    if converter == 'request':
+        return (
+            ["'method': intern_method(request[0])", "'path': request[1]",
+             "'protocol': intern_protocol(request[2])"],
+            [f"request = {value}.split(' ')",
+             "if len(request) != 3 or not all(request): return None"],
+        )
+    # Optional values: set after the dict is built
+    if converter == 'size':
+        return [], [f"if {value} != '-':",
+                    f"    if not {value}.isdecimal(): return None",
+                    f"    parsed['{key}'] = int({value})"]
+    if converter == 'float':
+        return [], [f"if {value} != '-': parsed['{key}'] = float({value})"]
+    if converter == 'upstream_time':
+        return [], [f"if {value} != '-':",
+                    f"    parsed['{key}'] = float({value}) if ',' not in {value} and ':' not in {value} "
+                    f"else upstream_time({value})"]
+    if converter in ('time_local', 'time_iso8601'):
+        return [], [f"log_timestamp = decode_{converter}({value})",
+                    f"if log_timestamp is not None: parsed['{key}'] = log_timestamp"]
+    if converter == 'msec':
+        return [], [f"parsed['{key}'] = msec_time({value})"]
+    raise ValueError(f"Unknown converter {converter!r} for ${name}")
+
+
+def generate_source(log_format: str, escape: str = 'default') -> str:
+    """Python source untuk parser function dari log_format"""
+    if escape not in ESCAPES:
+        raise ValueError(f"Unknown escape {escape!r}, expected one of {ESCAPES}")
+    tokens = tokenize(log_format)
+    names = [name for kind, name in tokens if kind == 'variable']
+    if 'request' not in names and not ('request_method' in names and ({'request_uri', 'uri'} & set(names))):
+        raise ValueError(f"log_format needs $request (or $request_method + $request_uri): {log_format!r}")
+    
+    body = ["pos = 0"]
+    items = ["'raw_log': line"]
+    statements = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind == 'literal':
+            if index == 0:
+                body.append(f"if not line.startswith({text!r}): return None")
+                body.append(f"pos = {len(text)}")
+            continue
+        
+        value = f"v{index}"
+        following = tokens[index + 1] if index + 1 < len(tokens) else None
+        if following is None:
+            body.append(f"{value} = line[pos:]")
+        elif following[0] == 'variable':
+            raise ValueError(f"${text} and ${following[1]} have no literal between them: {log_format!r}")
+        elif index + 2 == len(tokens):
+            # Last delimiter anchors at the end of the line
+            literal = following[1]
+            body.append(f"if not line.endswith({literal!r}) or len(line) - {len(literal)} < pos: return None")
+            body.append(f"{value} = line[pos:len(line) - {len(literal)}]")
+        else:
+            literal = following[1]
+            body.append(f"end = line.find({literal!r}, pos)")
+            body.append("if end < 0: return None")
+            body.append(f"{value} = line[pos:end]")
+            body.append(f"pos = end + {len(literal)}")
+        
+        key, converter = VARIABLES.get(text, (None, None))
+        if converter is None:
+            continue
+        if escape == 'json' and converter in ('str', 'dash', 'request'):
+            body.append(f"{value} = unescape_json({value})")
+        dict_items, converter_statements = _converter_code(text, value, key, converter)
+        items.extend(dict_items)
+        (body if dict_items else statements).extend(converter_statements)
+    
+    # Converters raise ValueError on e.g. '1.2.3' (OverflowError on huge numbers);
+    # that line just doesn't parse
+    lines = ["def parse(line):", "    try:"]
+    lines += [f"        {statement}" for statement in body]
+    lines.append("        parsed = {" + ", ".join(items) + "}")
+    lines += [f"        {statement}" for statement in statements]
+    lines += ["    except (ValueError, OverflowError):", "        return None", "    return parsed"]
+    return "\n".join(lines) + "\n"
+
+
+def parse_directive(log_format: str) -> Tuple[str, str]:
+    """Named format atau "[escape=json] <format>" -> (format, escape)"""
+    log_format = LOG_FORMATS.get(log_format, log_format)
+    escape = 'default'
+    if log_format.startswith('escape='):
+        option, _, log_format = log_format.partition(' ')
+        escape = option[len('escape='):]
+    return log_format, escape
+
+
+def is_json_format(log_format: Optional[str]) -> bool:
+    """True untuk escape=json formats (JSON lines)"""
+    if not log_format:
+        return False
+    fmt, escape = parse_directive(log_format)
+    return escape == 'json' or fmt.lstrip().startswith('{')
+
+
+def compile_log_format(log_format: str) -> Callable[[str], Optional[Dict]]:
+    """
+    Compile log_format (named, atau string dengan optional "escape=json " prefix)
+    Raises ValueError untuk formats yang tidak bisa di-parse
+    """
+    fmt, escape = parse_directive(log_format)
+    source = generate_source(fmt, escape)
+    namespace = {
+        'decode_time_local': decoder(['%d/%b/%Y:%H:%M:%S %z']),
+        'decode_time_iso8601': decoder(['%Y-%m-%dT%H:%M:%S%z']),
+        'msec_time': msec_time,
+        'upstream_time': upstream_time,
+        'unescape_json': unescape_json,
+    }
+    namespace.update((f"intern_{key}", intern_table(key)) for key in INTERNED)
+    exec(compile(source, f"<log_format {fmt[:40]!r}>", 'exec'), namespace)
+    parse = namespace['parse']
+    parse.log_format = fmt
+    parse.source = source
+    return parse
@@ -0,0 +1,174 @@
+"""
+Parser untuk nginx access logs dengan escape=json log_format (JSON lines)
+Lines are decoded by the fastest available backend: msgspec (typed struct, no
+intermediate dict), orjson, or the stdlib json module, then mapped straight
+to the NginxAccessLog column set
+"""
+import json
+import re
+from typing import Any, Dict, Optional, Sequence, Union
+
+from parsers.log_format import msec_time, parse_directive, upstream_time
+from parsers.nginx_parser import NginxAccessParser
+from parsers.timestamps import decoder
+
+try:
+    import msgspec
+except ImportError:  # optional dependency, faster typed decoding
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKENDS = ('msgspec', 'orjson', 'json')
+
+# nginx variables read from a record, in the order _from_values unpacks them
+FIELDS = (
+    'remote_addr', 'request', 'request_method', 'request_uri', 'server_protocol',
+    'status', 'body_bytes_sent', 'http_referer', 'http_user_agent',
+    'request_time', 'upstream_response_time', 'time_local', 'time_iso8601', 'msec',
+)
+
+# Typed struct fields (msgspec, strict=False: "200" -> 200)
+FIELD_TYPES = {
+    'status': Optional[int],
+    'body_bytes_sent': Optional[int],
+    'request_time': Optional[float],
+    'upstream_response_time': Union[str, float, None],
+    'msec': Optional[float],
+}
+
+# Variables stored in the same field
+ALIASES = {'uri': 'request_uri', 'bytes_sent': 'body_bytes_sent'}
+
+# "key": "$variable" / "key": $variable in a JSON log_format
+_JSON_FIELD = re.compile(r'"([^"]+)"\s*:\s*("?)\$\{?(\w+)\}?\2\s*[,}]')
+
+
+def available_backend() -> str:
+    if msgspec is not None:
+        return 'msgspec'
+    if orjson is not None:
+        return 'orjson'
+    return 'json'
+
+
+def json_keys(log_format: Optional[str]) -> Dict[str, str]:
+    """
+    nginx variable -> JSON key dari log_format
+    Tanpa log_format the keys are the variable names ({"remote_addr": "$remote_addr", ...})
+    """
+    keys = {field: field for field in FIELDS}
+    if log_format:
+        fmt, _ = parse_directive(log_format)
+        for key, _, variable in _JSON_FIELD.findall(fmt):
+            variable = ALIASES.get(variable, variable)
+            if variable in keys:
+                keys[variable] = key
+    return keys
+
+
+class NginxJsonAccessParser(NginxAccessParser):
+    """Parser untuk nginx JSON access logs (same table, detection and rows as NginxAccessParser)"""
+    
+    def __init__(self, log_format: Optional[str] = None, backend: Optional[str] = None):
+        """
+        log_format: the escape=json log_format (only used to map JSON keys to variables)
+        backend: 'msgspec', 'orjson' atau 'json' (default: fastest installed)
+        """
+        super().__init__()
+        
+        self.log_format = log_format
+        self.keys = json_keys(log_format)
+        self.backend = backend or available_backend()
+        if self.backend not in JSON_BACKENDS:
+            raise ValueError(f"Unknown JSON backend {self.backend!r}, expected one of {JSON_BACKENDS}")
+        
+        self.decode_time_local = decoder(['%d/%b/%Y:%H:%M:%S %z'])
+        self.decode_time_iso8601 = decoder(['%Y-%m-%dT%H:%M:%S%z'])
+        
+        if self.backend == 'msgspec':
+            if msgspec is None:
+                raise RuntimeError("msgspec package required for the msgspec JSON backend")
+            record = msgspec.defstruct(
+                'NginxJsonRecord',
+                [(field, FIELD_TYPES.get(field, Optional[str]), None) for field in FIELDS],
+                rename=self.keys
+            )
+            self._decode_struct = msgspec.json.Decoder(record, strict=False).decode
+            self._astuple = msgspec.structs.astuple
+            self._decode_errors = (msgspec.MsgspecError,)
+        elif self.backend == 'orjson':
+            if orjson is None:
+                raise RuntimeError("orjson package required for the orjson JSON backend")
+            self._loads = orjson.loads
+            self._decode_errors = (orjson.JSONDecodeError,)
+        else:
+            self._loads = json.loads
+            self._decode_errors = (ValueError,)
+        self._key_list = [self.keys[field] for field in FIELDS]
+    
+    def parse(self, log_line: str) -> Optional[Dict[str, Any]]:
+        """Parse satu JSON line"""
+        try:
+            if self.backend == 'msgspec':
+                values = self._astuple(self._decode_struct(log_line))
+            else:
+                data = self._loads(log_line)
+                if not isinstance(data, dict):
+                    return None
+                values = list(map(data.get, self._key_list))
+        except self._decode_errors:
+            return None
+        return self._from_values(log_line, values)
+    
+    def _from_values(self, log_line: str, values: Sequence[Any]) -> Optional[Dict[str, Any]]:
+        """Decoded values (FIELDS order) -> parsed dict dengan NginxAccessLog keys"""
+        (remote_addr, request, method, path, protocol, status, size, referer, user_agent,
+         request_time, upstream, time_local, time_iso8601, msec) = values
+        
+        try:
+            if request is not None:
+                parts = request.split(' ')
+                if len(parts) != 3 or not all(parts):
+                    return None
+                method, path, protocol = parts
+            if not method or not path:
+                return None  # detection needs both
+            
+            parsed = {
+                'raw_log': log_line,
+                'ip_address': remote_addr,
+                'method': self.intern_method(method),
+                'path': path,
+                'protocol': self.intern_protocol(protocol),
+                'status_code': int(status) if status is not None else None,
+                'referer': self.intern_referer(referer) if referer != '-' else None,
+                'user_agent': self.intern_user_agent(user_agent) if user_agent != '-' else None,
+            }
+            if size is not None and size != '-':
+                parsed['response_size'] = int(size)
+            if request_time is not None and request_time != '-':
+                parsed['request_time'] = float(request_time)
+            if upstream is not None and upstream != '-':
+                if isinstance(upstream, str) and (',' in upstream or ':' in upstream):
+                    upstream = upstream_time(upstream)
+                if upstream is not None:
+                    parsed['upstream_time'] = float(upstream)
+            
+            if time_local is not None:
+                log_timestamp = self.decode_time_local(time_local)
+            elif time_iso8601 is not None:
+                log_timestamp = self.decode_time_iso8601(time_iso8601)
+            elif msec is not None:
+                log_timestamp = msec_time(msec)
+            else:
+                log_timestamp = None
+            if log_timestamp is not None:
+                parsed['log_timestamp'] = log_timestamp
+        except (ValueError, TypeError, AttributeError, OverflowError):
+            return None
+        
+        return parsed
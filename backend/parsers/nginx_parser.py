@@ -1,17 +1,31 @@
 import re
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional, List
 from parsers.base_parser import BaseParser
+from parsers.columns import ColumnBatch
+from parsers.intern import intern_table
+from parsers.timestamps import decoder
+from parsers.log_format import compile_log_format
 from models.nginx_log import NginxAccessLog, NginxErrorLog
-from models.attack_log import AttackLog
 from services.attack_detector import attack_detector
 
+NUMBER_CHARS = '0123456789.'
+
+
 class NginxAccessParser(BaseParser):
     """Parser untuk Nginx access logs dengan attack detection"""
     
-    def __init__(self):
+    model = NginxAccessLog
+    
+    def __init__(self, log_format: Optional[str] = None):
+        """
+        log_format: nginx log_format (atau nama: combined, main, timed_combined)
+        untuk source ini; None = combined dengan optional forwarded/times (fast path + regex)
+        """
         super().__init__()
         
+        self.log_format = log_format
+        self.parse_compiled = compile_log_format(log_format) if log_format else None
+        
         # Nginx combined log format
         self.pattern = re.compile(
             r'(?P<ip>[\d\.]+) - (?P<remote_user>\S+) \[(?P<timestamp>[^\]]+)\] '
@@ -23,9 +37,109 @@ class NginxAccessParser(BaseParser):
         )
         
         self.timestamp_format = '%d/%b/%Y:%H:%M:%S %z'
+        self.decode_timestamp = decoder([self.timestamp_format])
+        
+        # Shared intern tables: one instance per distinct value across batches
+        self.intern_method = intern_table('method')
+        self.intern_protocol = intern_table('protocol')
+        self.intern_referer = intern_table('referer')
+        self.intern_user_agent = intern_table('user_agent')
     
     def parse(self, log_line: str) -> Optional[Dict[str, Any]]:
-        """Parse Nginx access log line"""
+        """Parse Nginx access log line (compiled log_format, atau fast path + regex)"""
+        if self.parse_compiled is not None:
+            return self.parse_compiled(log_line)
+        parsed = self.parse_fast(log_line)
+        if parsed is None:
+            parsed = self.parse_regex(log_line)
+        return parsed
+    
+    def parse_fast(self, log_line: str) -> Optional[Dict[str, Any]]:
+        """
+        Standard combined format (+ request_time/upstream_time) dengan str.split.
+        Hanya menerima lines yang regex parse dengan hasil yang sama; returns
+        None untuk yang lain (parse() lalu memakai regex)
+        """
+        # Quoted fields may not contain quotes, so this is one C-level split:
+        # head "request" status size "referer" "user_agent"[ "forwarded"] times
+        quoted = log_line.split('"')
+        if len(quoted) == 9:
+            if quoted[6] != ' ':
+                return None
+            rest = quoted[8]  # after $http_x_forwarded_for
+        elif len(quoted) == 7:
+            rest = quoted[6]
+        else:
+            return None
+        if quoted[4] != ' ':
+            return None
+        
+        # 'ip - user [time] '
+        head = quoted[0]
+        if head[-2:] != '] ':
+            return None
+        head, _, timestamp = head[:-2].partition(' [')
+        head = head.split(' ')
+        if len(head) != 3 or head[1] != '-' or not head[0] or head[0].strip(NUMBER_CHARS):
+            return None
+        ip = head[0]
+        # A time that decodes has no ']' in it; anything odd is left to the regex
+        log_timestamp = self.decode_timestamp(timestamp)
+        if log_timestamp is None:
+            return None
+        
+        # \S+ fields: ' ' is the only whitespace allowed in user + request
+        if not head[2] or not (head[2] + quoted[1]).isprintable():
+            return None
+        request = quoted[1].split(' ')
+        if len(request) != 3 or not all(request):
+            return None
+        method, path, protocol = request
+        
+        response = quoted[2].split(' ')
+        if len(response) != 4 or response[0] or response[3]:
+            return None
+        status, size = response[1], response[2]
+        if not status.isdecimal() or not (size == '-' or size.isdecimal()):
+            return None
+        referer = quoted[3]
+        user_agent = quoted[5]
+        
+        if rest and rest[0] != ' ':
+            return None
+        times = rest.split()
+        for value in times:
+            if value != '-' and value.strip(NUMBER_CHARS):
+                return None
+        
+        parsed = {
+            'raw_log': log_line,
+            'ip_address': ip,
+            'method': self.intern_method(method),
+            'path': path,
+            'protocol': self.intern_protocol(protocol),
+            'status_code': int(status),
+            'referer': self.intern_referer(referer) if referer != '-' else None,
+            'user_agent': self.intern_user_agent(user_agent) if user_agent != '-' else None,
+            'log_timestamp': log_timestamp,
+        }
+        
+        if size != '-':
+            parsed['response_size'] = int(size)
+        
+        # '-' ends the numbers, like the regex does
+        try:
+            if times and times[0] != '-':
+                parsed['request_time'] = float(times[0])
+                if len(times) > 1 and times[1] != '-':
+                    parsed['upstream_time'] = float(times[1])
+        except ValueError:
+            return None  # e.g. '1.2.3' - let the regex path report it
+        
+        return parsed
+    
+    def parse_regex(self, log_line: str) -> Optional[Dict[str, Any]]:
+        """Parse Nginx access log line dengan regex (any position, optional fields)"""
         match = self.pattern.search(log_line)
         if not match:
             return None
@@ -35,22 +149,18 @@ class NginxAccessParser(BaseParser):
         parsed = {
             'raw_log': log_line,
             'ip_address': data['ip'],
-            'method': data['method'],
+            'method': self.intern_method(data['method']),
             'path': data['path'],
-            'protocol': data['protocol'],
+            'protocol': self.intern_protocol(data['protocol']),
             'status_code': int(data['status']),
-            'referer': data['referer'] if data['referer'] != '-' else None,
-            'user_agent': data['user_agent'] if data['user_agent'] != '-' else None,
+            'referer': self.intern_referer(data['referer']) if data['referer'] != '-' else None,
+            'user_agent': self.intern_user_agent(data['user_agent']) if data['user_agent'] != '-' else None,
         }
         
         # Parse timestamp
-        try:
-            parsed['log_timestamp'] = datetime.strptime(
-                data['timestamp'], 
-                self.timestamp_format
-            )
-        except ValueError:
-            pass
+        log_timestamp = self.decode_timestamp(data['timestamp'])
+        if log_timestamp is not None:
+            parsed['log_timestamp'] = log_timestamp
         
         # Parse response size
         if data['size'] != '-':
@@ -63,76 +173,82 @@ class NginxAccessParser(BaseParser):
         if data.get('upstream_time') and data['upstream_time'] != '-':
             parsed['upstream_time'] = float(data['upstream_time'])
         
-        # Attack Detection
-        threats = attack_detector.analyze_http_request(
-            method=data['method'],
-            path=data['path'],
-            user_agent=data.get('user_agent')
-        )
-        
-        parsed['threats_detected'] = threats
-        
         return parsed
     
-    def save_to_db(self, parsed_data: Dict[str, Any], db_session) -> bool:
-        """Save ke database termasuk attack logs"""
-        try:
-            # Save nginx access log
-            log_entry = NginxAccessLog(
-                log_timestamp=parsed_data.get('log_timestamp'),
-                ip_address=parsed_data.get('ip_address'),
-                method=parsed_data.get('method'),
-                path=parsed_data.get('path'),
-                protocol=parsed_data.get('protocol'),
-                status_code=parsed_data.get('status_code'),
-                response_size=parsed_data.get('response_size'),
-                referer=parsed_data.get('referer'),
-                user_agent=parsed_data.get('user_agent'),
-                request_time=parsed_data.get('request_time'),
-                upstream_time=parsed_data.get('upstream_time'),
-                raw_log=parsed_data.get('raw_log')
-            )
-            
-            db_session.add(log_entry)
-            db_session.flush()  # Get log_entry.id
-            
-            # Save attack logs if threats detected
-            threats = parsed_data.get('threats_detected', [])
-            for threat in threats:
-                attack_log = AttackLog(
-                    attack_type=threat['attack_type'],
-                    severity=threat['severity'],
-                    description=threat['description'],
-                    source_ip=parsed_data.get('ip_address'),
-                    target_path=parsed_data.get('path'),
-                    http_method=parsed_data.get('method'),
-                    user_agent=parsed_data.get('user_agent'),
-                    pattern_matched=threat.get('pattern'),
-                    raw_request=parsed_data.get('raw_log'),
-                    related_log_type='nginx',
-                    related_log_id=log_entry.id
-                )
-                db_session.add(attack_log)
-            
-            db_session.commit()
-            
-            # Log if threats detected
+    def detect(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Attack detection untuk parsed request"""
+        parsed_data['threats_detected'] = attack_detector.analyze_http_request(
+            method=parsed_data['method'],
+            path=parsed_data['path'],
+            user_agent=parsed_data.get('user_agent')
+        )
+        return parsed_data
+    
+    def detect_batch(self, batch: ColumnBatch) -> ColumnBatch:
+        """detect() per row, reading the method/path/user_agent columns"""
+        analyze = attack_detector.analyze_http_request
+        requests = zip(batch.column('method'), batch.column('path'), batch.column('user_agent'))
+        for index, (method, path, user_agent) in enumerate(requests):
+            threats = analyze(method=method, path=path, user_agent=user_agent)
             if threats:
-                print(f"[NginxParser] ⚠️  {len(threats)} threat(s) detected from {parsed_data.get('ip_address')}")
-                for threat in threats:
-                    print(f"  - {threat['attack_type']}: {threat['description']}")
-            
-            return True
-            
-        except Exception as e:
-            db_session.rollback()
-            print(f"[NginxAccessParser] Error saving to DB: {e}")
-            return False
+                batch.extras[index] = {'threats_detected': threats}
+        return batch
+    
+    def build_row(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values untuk nginx_access_logs"""
+        return {
+            'log_timestamp': parsed_data.get('log_timestamp'),
+            'ip_address': parsed_data.get('ip_address'),
+            'method': parsed_data.get('method'),
+            'path': parsed_data.get('path'),
+            'protocol': parsed_data.get('protocol'),
+            'status_code': parsed_data.get('status_code'),
+            'response_size': parsed_data.get('response_size'),
+            'referer': parsed_data.get('referer'),
+            'user_agent': parsed_data.get('user_agent'),
+            'request_time': parsed_data.get('request_time'),
+            'upstream_time': parsed_data.get('upstream_time'),
+            'raw_log': parsed_data.get('raw_log'),
+            'source_id': parsed_data.get('source_id'),
+            'source_inode': parsed_data.get('source_inode'),
+            'source_offset': parsed_data.get('source_offset')
+        }
+    
+    def has_attacks(self, parsed_data: Dict[str, Any]) -> bool:
+        return bool(parsed_data.get('threats_detected'))
+    
+    def build_attack_rows(self, parsed_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Attack log rows untuk threats yang terdeteksi"""
+        return [
+            {
+                'attack_type': threat['attack_type'],
+                'severity': threat['severity'],
+                'description': threat['description'],
+                'source_ip': parsed_data.get('ip_address'),
+                'target_path': parsed_data.get('path'),
+                'http_method': parsed_data.get('method'),
+                'user_agent': parsed_data.get('user_agent'),
+                'pattern_matched': threat.get('pattern'),
+                'raw_request': parsed_data.get('raw_log'),
+                'related_log_type': 'nginx'
+            }
+            for threat in parsed_data.get('threats_detected', [])
+        ]
+    
+    def report(self, parsed_data: Dict[str, Any]):
+        """Log if threats detected"""
+        threats = parsed_data.get('threats_detected', [])
+        if threats:
+            print(f"[NginxParser] ⚠️  {len(threats)} threat(s) detected from {parsed_data.get('ip_address')}")
+            for threat in threats:
+                print(f"  - {threat['attack_type']}: {threat['description']}")
 
 
 class NginxErrorParser(BaseParser):
     """Parser untuk Nginx error logs"""
     
+    model = NginxErrorLog
+    
     def __init__(self):
         super().__init__()
         
@@ -148,6 +264,9 @@ class NginxErrorParser(BaseParser):
         )
         
         self.timestamp_format = '%Y/%m/%d %H:%M:%S'
+        self.decode_timestamp = decoder([self.timestamp_format])
+        self.intern_level = intern_table('level')
+        self.intern_server = intern_table('server')
     
     def parse(self, log_line: str) -> Optional[Dict[str, Any]]:
         """Parse Nginx error log line"""
@@ -159,46 +278,35 @@ class NginxErrorParser(BaseParser):
         
         parsed = {
             'raw_log': log_line,
-            'level': data['level'],
+            'level': self.intern_level(data['level']),
             'pid': int(data['pid']) if data['pid'] else None,
             'tid': int(data['tid']) if data['tid'] else None,
             'message': data['message'],
             'client_ip': data.get('client'),
-            'server': data.get('server'),
+            'server': self.intern_server(data['server']),
             'request': data.get('request')
         }
         
         # Parse timestamp
-        try:
-            parsed['log_timestamp'] = datetime.strptime(
-                data['timestamp'], 
-                self.timestamp_format
-            )
-        except ValueError:
-            pass
+        log_timestamp = self.decode_timestamp(data['timestamp'])
+        if log_timestamp is not None:
+            parsed['log_timestamp'] = log_timestamp
         
         return parsed
     
-    def save_to_db(self, parsed_data: Dict[str, Any], db_session) -> bool:
-        """Save ke database"""
-        try:
-            log_entry = NginxErrorLog(
-                log_timestamp=parsed_data.get('log_timestamp'),
-                level=parsed_data.get('level'),
-                pid=parsed_data.get('pid'),
-                tid=parsed_data.get('tid'),
-                client_ip=parsed_data.get('client_ip'),
-                server=parsed_data.get('server'),
-                request=parsed_data.get('request'),
-                message=parsed_data.get('message'),
-                raw_log=parsed_data.get('raw_log')
-            )
-            
-            db_session.add(log_entry)
-            db_session.commit()
-            return True
-            
-        except Exception as e:
-            db_session.rollback()
-            print(f"[NginxErrorParser] Error saving to DB: {e}")
-            return False
\ No newline at end of file
+    def build_row(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values untuk nginx_error_logs"""
+        return {
+            'log_timestamp': parsed_data.get('log_timestamp'),
+            'level': parsed_data.get('level'),
+            'pid': parsed_data.get('pid'),
+            'tid': parsed_data.get('tid'),
+            'client_ip': parsed_data.get('client_ip'),
+            'server': parsed_data.get('server'),
+            'request': parsed_data.get('request'),
+            'message': parsed_data.get('message'),
+            'raw_log': parsed_data.get('raw_log'),
+            'source_id': parsed_data.get('source_id'),
+            'source_inode': parsed_data.get('source_inode'),
+            'source_offset': parsed_data.get('source_offset')
+        }
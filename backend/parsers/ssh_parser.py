@@ -1,16 +1,27 @@
 import re
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional, List
 from parsers.base_parser import BaseParser
+from parsers.columns import ColumnBatch
+from parsers.intern import intern_table
+from parsers.timestamps import decoder
 from models.ssh_log import SSHLog
+from services.attack_detector import attack_detector
+
+# rsyslog collapses duplicates into "message repeated N times: [ <message>]"
+REPEATED_PREFIX = 'message repeated '
+
+# Event types yang dihitung sebagai failed login attempts (brute force detection)
+FAILED_EVENTS = ('failed', 'invalid_user')
 
 class SSHParser(BaseParser):
     """Parser untuk SSH logs (auth.log, secure log)"""
     
+    model = SSHLog
+    
     def __init__(self):
         super().__init__()
         
-        # Regex patterns untuk berbagai event SSH
+        # Regex patterns untuk berbagai event SSH (matched at the start of the message)
         self.patterns = {
             'accepted': re.compile(
                 r'Accepted (?P<method>\w+) for (?P<user>\S+) from (?P<ip>[\d\.]+) port (?P<port>\d+)'
@@ -35,11 +46,29 @@ class SSHParser(BaseParser):
             ),
         }
         
+        # First word of the message -> event type ('session': opened/closed from the 3rd word)
+        self.dispatch = {
+            'Accepted': 'accepted',
+            'Failed': 'failed',
+            'Invalid': 'invalid_user',
+            'Disconnected': 'disconnected',
+            'Connection': 'connection_closed',
+            'pam_unix(sshd:session):': 'session',
+        }
+        
         # Timestamp formats untuk Linux logs
         self.timestamp_formats = [
             '%b %d %H:%M:%S',  # Dec 23 14:30:45
             '%Y-%m-%d %H:%M:%S',  # 2024-12-23 14:30:45
         ]
+        self.decode_timestamp = decoder(self.timestamp_formats)
+        
+        # Shared intern tables: one instance per distinct value across batches
+        self.intern_host = intern_table('host')
+        self.intern_process = intern_table('process')
+        self.intern_event_type = intern_table('event_type')
+        self.intern_auth_method = intern_table('auth_method')
+        self.intern_username = intern_table('username')
     
     def parse(self, log_line: str) -> Optional[Dict[str, Any]]:
         """Parse SSH log line"""
@@ -53,57 +82,62 @@ class SSHParser(BaseParser):
             'is_suspicious': False
         }
         
-        # Extract timestamp, host, process
-        parts = log_line.split()
+        # Extract timestamp, host, process; sisanya adalah message
+        parts = log_line.split(None, 5)
         if len(parts) < 5:
             return None
         
         # Parse timestamp (biasanya 3 bagian pertama)
         timestamp_str = ' '.join(parts[0:3])
-        parsed['log_timestamp'] = self.parse_timestamp(
-            timestamp_str, 
-            self.timestamp_formats
-        )
+        parsed['log_timestamp'] = self.decode_timestamp(timestamp_str)
         
         # Parse hostname dan process info
-        parsed['host'] = parts[3]
+        parsed['host'] = self.intern_host(parts[3])
         
         # Extract process name dan PID
         if '[' in parts[4]:
             process_part = parts[4].split('[')
-            parsed['process'] = process_part[0].replace(':', '')
+            parsed['process'] = self.intern_process(process_part[0].replace(':', ''))
             if len(process_part) > 1:
                 parsed['pid'] = int(process_part[1].replace(']:', ''))
         
-        # Gabungkan message parts
-        message = ' '.join(parts[5:])
+        # Hanya sshd (sshd, sshd-session, sshd-auth) punya SSH events
+        if len(parts) < 6 or not parts[4].startswith('sshd'):
+            return parsed
         
-        # Match dengan patterns
-        for event_type, pattern in self.patterns.items():
-            match = pattern.search(message)
-            if match:
-                parsed['event_type'] = event_type
-                data = match.groupdict()
-                
-                parsed['username'] = data.get('user')
-                parsed['ip_address'] = data.get('ip')
-                parsed['auth_method'] = data.get('method')
-                
-                if data.get('port'):
-                    parsed['port'] = int(data['port'])
-                
-                # Set status
-                if event_type == 'accepted':
-                    parsed['status'] = 'success'
-                elif event_type in ['failed', 'invalid_user']:
-                    parsed['status'] = 'failed'
-                    parsed['is_suspicious'] = True
-                elif event_type in ['session_opened', 'session_closed']:
-                    parsed['status'] = 'session'
-                else:
-                    parsed['status'] = 'closed'
-                
-                break
+        message = parts[5]
+        if message.startswith(REPEATED_PREFIX):
+            # rsyslog: "message repeated 3 times: [ Failed password for ...]"
+            message = message.partition('[ ')[2]
+        
+        # Dispatch on the first word to at most one anchored pattern
+        first, _, rest = message.partition(' ')
+        event_type = self.dispatch.get(first)
+        if event_type == 'session':
+            event_type = self.intern_event_type('session_' + rest.partition(' ')[2].partition(' ')[0])
+        pattern = self.patterns.get(event_type)
+        match = pattern.match(message) if pattern is not None else None
+        if match:
+            parsed['event_type'] = event_type
+            data = match.groupdict()
+            
+            parsed['username'] = self.intern_username(data.get('user'))
+            parsed['ip_address'] = data.get('ip')
+            parsed['auth_method'] = self.intern_auth_method(data.get('method'))
+            
+            if data.get('port'):
+                parsed['port'] = int(data['port'])
+            
+            # Set status
+            if event_type == 'accepted':
+                parsed['status'] = 'success'
+            elif event_type in ['failed', 'invalid_user']:
+                parsed['status'] = 'failed'
+                parsed['is_suspicious'] = True
+            elif event_type in ['session_opened', 'session_closed']:
+                parsed['status'] = 'session'
+            else:
+                parsed['status'] = 'closed'
         
         # Check suspicious activity
         if parsed.get('ip_address'):
@@ -112,29 +146,66 @@ class SSHParser(BaseParser):
         
         return parsed
     
-    def save_to_db(self, parsed_data: Dict[str, Any], db_session) -> bool:
-        """Save ke database"""
-        try:
-            log_entry = SSHLog(
-                log_timestamp=parsed_data.get('log_timestamp'),
-                host=parsed_data.get('host'),
-                process=parsed_data.get('process'),
-                pid=parsed_data.get('pid'),
-                event_type=parsed_data.get('event_type'),
-                username=parsed_data.get('username'),
-                ip_address=parsed_data.get('ip_address'),
-                port=parsed_data.get('port'),
-                auth_method=parsed_data.get('auth_method'),
-                status=parsed_data.get('status'),
-                raw_log=parsed_data.get('raw_log'),
-                is_suspicious=parsed_data.get('is_suspicious', False)
-            )
-            
-            db_session.add(log_entry)
-            db_session.commit()
-            return True
-            
-        except Exception as e:
-            db_session.rollback()
-            print(f"[SSHParser] Error saving to DB: {e}")
-            return False
\ No newline at end of file
+    def build_row(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values untuk ssh_logs"""
+        return {
+            'log_timestamp': parsed_data.get('log_timestamp'),
+            'host': parsed_data.get('host'),
+            'process': parsed_data.get('process'),
+            'pid': parsed_data.get('pid'),
+            'event_type': parsed_data.get('event_type'),
+            'username': parsed_data.get('username'),
+            'ip_address': parsed_data.get('ip_address'),
+            'port': parsed_data.get('port'),
+            'auth_method': parsed_data.get('auth_method'),
+            'status': parsed_data.get('status'),
+            'raw_log': parsed_data.get('raw_log'),
+            'is_suspicious': parsed_data.get('is_suspicious', False),
+            'source_id': parsed_data.get('source_id'),
+            'source_inode': parsed_data.get('source_inode'),
+            'source_offset': parsed_data.get('source_offset')
+        }
+    
+    def detect(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Streaming brute force detection untuk failed login attempts"""
+        if parsed_data.get('event_type') in FAILED_EVENTS:
+            ip = parsed_data.get('ip_address')
+            timestamp = parsed_data.get('log_timestamp')
+            if ip and timestamp is not None:
+                parsed_data['brute_force'] = attack_detector.track_ssh_failure(ip, timestamp)
+        return parsed_data
+    
+    def detect_batch(self, batch: ColumnBatch) -> ColumnBatch:
+        """detect() per row, reading the event_type/ip_address/log_timestamp columns"""
+        track = attack_detector.track_ssh_failure
+        events = zip(batch.column('event_type'), batch.column('ip_address'), batch.column('log_timestamp'))
+        for index, (event_type, ip, timestamp) in enumerate(events):
+            if event_type in FAILED_EVENTS and ip and timestamp is not None:
+                threat = track(ip, timestamp)
+                if threat:
+                    batch.extras[index] = {'brute_force': threat}
+        return batch
+    
+    def has_attacks(self, parsed_data: Dict[str, Any]) -> bool:
+        return bool(parsed_data.get('brute_force'))
+    
+    def build_attack_rows(self, parsed_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Attack log row untuk brute force threshold crossing"""
+        threat = parsed_data.get('brute_force')
+        if not threat:
+            return []
+        return [{
+            'attack_type': threat['attack_type'],
+            'severity': threat['severity'],
+            'description': threat['description'],
+            'source_ip': parsed_data.get('ip_address'),
+            'pattern_matched': f"{parsed_data.get('event_type')} user={parsed_data.get('username')}",
+            'raw_request': parsed_data.get('raw_log'),
+            'related_log_type': 'ssh'
+        }]
+    
+    def report(self, parsed_data: Dict[str, Any]):
+        """Log if brute force detected"""
+        threat = parsed_data.get('brute_force')
+        if threat:
+            print(f"[SSHParser] ⚠️  {threat['attack_type']} from {parsed_data.get('ip_address')}: {threat['description']}")
@@ -0,0 +1,205 @@
+"""
+Timestamp decoding untuk semua parsers
+Known formats are parsed by fixed position (no strptime), everything else falls
+back to strptime. Results are memoized per raw string: within a second every
+line carries the same timestamp
+"""
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Callable, Dict, Optional, Sequence
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+# Distinct raw strings kept per decoder (the cache is dropped when full)
+CACHE_SIZE = 4096
+
+# How far in the future a yearless timestamp may be before it is taken as last year's
+ONE_DAY = timedelta(days=1)
+
+
+def _digits(value: str) -> bool:
+    return value.isdigit() and value.isascii()
+
+
+def parse_time_local(value: str) -> Optional[datetime]:
+    """'23/Dec/2025:11:20:00 +0700' (nginx $time_local, '%d/%b/%Y:%H:%M:%S %z')"""
+    if (len(value) != 26 or value[2] != '/' or value[6] != '/' or value[11] != ':'
+            or value[14] != ':' or value[17] != ':' or value[20] != ' '):
+        return None
+    month = MONTHS.get(value[3:6])
+    sign = value[21]
+    if (month is None or sign not in '+-' or value[24] not in '012345'
+            or not _digits(value[0:2] + value[7:11] + value[12:14] + value[15:17]
+                           + value[18:20] + value[22:26])):
+        return None
+    offset = timedelta(hours=int(value[22:24]), minutes=int(value[24:26]))
+    try:
+        return datetime(
+            int(value[7:11]), month, int(value[0:2]),
+            int(value[12:14]), int(value[15:17]), int(value[18:20]),
+            tzinfo=timezone(-offset if sign == '-' else offset)
+        )
+    except ValueError:
+        return None
+
+
+def _parse_date_time(value: str, separator: str) -> Optional[datetime]:
+    """'2025/12/23 11:20:00' / '2025-12-23 11:20:00'"""
+    if (len(value) != 19 or value[4] != separator or value[7] != separator
+            or value[10] != ' ' or value[13] != ':' or value[16] != ':'):
+        return None
+    if not _digits(value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]):
+        return None
+    try:
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19])
+        )
+    except ValueError:
+        return None
+
+
+def parse_error_time(value: str) -> Optional[datetime]:
+    """'2025/12/23 11:20:00' (nginx error log, '%Y/%m/%d %H:%M:%S')"""
+    return _parse_date_time(value, '/')
+
+
+def parse_iso_time(value: str) -> Optional[datetime]:
+    """'2025-12-23 11:20:00' ('%Y-%m-%d %H:%M:%S')"""
+    return _parse_date_time(value, '-')
+
+
+def parse_iso8601(value: str) -> Optional[datetime]:
+    """'2025-12-23T11:20:00+07:00' (nginx $time_iso8601, '%Y-%m-%dT%H:%M:%S%z')"""
+    if (len(value) != 25 or value[10] != 'T' or value[22] != ':' or value[19] not in '+-'
+            or value[23] not in '012345' or not _digits(value[20:22] + value[23:25])):
+        return None
+    stamp = _parse_date_time(value[:10] + ' ' + value[11:19], '-')
+    if stamp is None:
+        return None
+    offset = timedelta(hours=int(value[20:22]), minutes=int(value[23:25]))
+    try:
+        return stamp.replace(tzinfo=timezone(-offset if value[19] == '-' else offset))
+    except ValueError:
+        return None  # |offset| >= 24h
+
+
+def infer_year(value: datetime, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Syslog timestamps have no year: use the current one, or last year if that
+    would put the line more than a day in the future (December logs read in January)
+    """
+    now = now or datetime.now()
+    try:
+        result = value.replace(year=now.year)
+        if result - now > ONE_DAY:
+            result = value.replace(year=now.year - 1)
+    except ValueError:
+        return None  # Feb 29 outside a leap year
+    return result
+
+
+def parse_syslog_time(value: str) -> Optional[datetime]:
+    """'Dec 23 14:30:45' / 'Dec 3 14:30:45' (syslog, '%b %d %H:%M:%S'), year inferred"""
+    if len(value) == 14:
+        value = value[:4] + '0' + value[4:]
+    if (len(value) != 15 or value[3] != ' ' or value[6] != ' '
+            or value[9] != ':' or value[12] != ':'):
+        return None
+    month = MONTHS.get(value[0:3])
+    if month is None or not _digits(value[4:6] + value[7:9] + value[10:12] + value[13:15]):
+        return None
+    now = datetime.now()
+    fields = (month, int(value[4:6]), int(value[7:9]), int(value[10:12]), int(value[13:15]))
+    try:
+        stamp = datetime(now.year, *fields)
+    except ValueError:
+        try:
+            # 2000 is a leap year, so only Feb 29 gets this far
+            return infer_year(datetime(2000, *fields), now)
+        except ValueError:
+            return None
+    if stamp - now > ONE_DAY:
+        stamp = stamp.replace(year=now.year - 1)
+    return stamp
+
+
+# strptime format -> equivalent fixed-position parser
+FIXED_PARSERS: Dict[str, Callable[[str], Optional[datetime]]] = {
+    '%d/%b/%Y:%H:%M:%S %z': parse_time_local,
+    '%Y/%m/%d %H:%M:%S': parse_error_time,
+    '%Y-%m-%d %H:%M:%S': parse_iso_time,
+    '%Y-%m-%dT%H:%M:%S%z': parse_iso8601,
+    '%b %d %H:%M:%S': parse_syslog_time,
+}
+
+
+def strptime(value: str, fmt: str) -> Optional[datetime]:
+    """datetime.strptime, None jika gagal; formats tanpa year get infer_year"""
+    try:
+        result = datetime.strptime(value, fmt)
+    except ValueError:
+        return None
+    if '%Y' not in fmt and '%y' not in fmt:
+        result = infer_year(result)
+    return result
+
+
+class TimestampDecoder:
+    """Memoized decoding untuk satu list of formats (tried in order)"""
+    
+    def __init__(self, formats: Sequence[str], cache_size: int = CACHE_SIZE):
+        self.formats = tuple(formats)
+        self.cache_size = cache_size
+        self._parsers = [(fmt, FIXED_PARSERS.get(fmt)) for fmt in self.formats]
+        self._cache = {}
+        self._year = datetime.now().year
+        self.hits = 0
+        self.misses = 0
+    
+    def __call__(self, value: str) -> Optional[datetime]:
+        try:
+            result = self._cache[value]
+            self.hits += 1
+            return result
+        except KeyError:
+            pass
+        
+        self.misses += 1
+        result = self.decode(value)
+        
+        year = datetime.now().year
+        if len(self._cache) >= self.cache_size or year != self._year:
+            # New year: cached yearless stamps may now belong to last year
+            self._cache = {}
+            self._year = year
+        if self.cache_size:
+            self._cache[value] = result
+        return result
+    
+    def decode(self, value: str) -> Optional[datetime]:
+        """Uncached: fixed parser per format, strptime jika format tidak dikenal / tidak cocok"""
+        for fmt, fixed in self._parsers:
+            result = fixed(value) if fixed is not None else None
+            if result is None:
+                result = strptime(value, fmt)
+            if result is not None:
+                return result
+        return None
+
+
+_decoders: Dict[Sequence[str], TimestampDecoder] = {}
+_decoders_lock = Lock()
+
+
+def decoder(formats: Sequence[str]) -> TimestampDecoder:
+    """Shared TimestampDecoder untuk formats (one cache per format list)"""
+    key = tuple(formats)
+    decoder_ = _decoders.get(key)
+    if decoder_ is None:
+        with _decoders_lock:
+            decoder_ = _decoders.setdefault(key, TimestampDecoder(key))
+    return decoder_
@@ -2,229 +2,183 @@
 Attack Detection Service
 Deteksi berbagai jenis serangan cyber
 """
-import re
-from typing import Dict, List, Optional
+import os
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from services.brute_force import BruteForceTracker
+from services.regex_engines import resolve_engine
+from services.rule_engine import DEFAULT_RULES_PATH, RuleSet, parse_ruleset, read_ruleset
+from services.verdict_cache import VERDICT_CACHE_SIZE, VerdictCache
+
+# Characters per field yang di-scan oleh rules yang bisa backtrack di re (.*, [^>]*):
+# crafted multi-KB URLs make them polynomial. They see the head and tail of a
+# longer field, other rules (and RE2) scan all of it; see rule_engine.PatternSet
+MAX_SCAN_LENGTH = 2048
+
+# One rule evaluation using more CPU time than this (seconds) flags the rule as expensive
+RULE_TIME_BUDGET = 0.005
+
+# Seconds between checks of the ruleset file for changes
+RULES_RELOAD_INTERVAL = 5.0
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 class AttackDetector:
     """Detector untuk berbagai jenis serangan"""
     
-    def __init__(self):
-        # SQL Injection patterns
-        self.sql_injection_patterns = [
-            r"(\bunion\b.*\bselect\b)",
-            r"(\bselect\b.*\bfrom\b.*\bwhere\b)",
-            r"('+\s*or\s*'1'\s*=\s*'1)",
-            r"(--|\#|\/\*)",
-            r"(\bexec\b|\bexecute\b)",
-            r"(\bdrop\b\s+\btable\b)",
-            r"(\binsert\b\s+\binto\b)",
-            r"(\bdelete\b\s+\bfrom\b)",
-            r"(\bupdate\b.*\bset\b)",
-            r"(\bor\b\s+\d+\s*=\s*\d+)",
-            r"(';--)",
-            r"(\bxp_cmdshell\b)",
-        ]
-        
-        # XSS patterns
-        self.xss_patterns = [
-            r"<script[^>]*>.*?</script>",
-            r"javascript:",
-            r"onerror\s*=",
-            r"onload\s*=",
-            r"onclick\s*=",
-            r"<iframe",
-            r"<object",
-            r"<embed",
-            r"eval\s*\(",
-            r"alert\s*\(",
-            r"document\.cookie",
-            r"document\.write",
-        ]
-        
-        # Path Traversal patterns
-        self.path_traversal_patterns = [
-            r"\.\./",
-            r"\.\.\\",
-            r"%2e%2e/",
-            r"%252e%252e/",
-            r"\.\.%2f",
-        ]
-        
-        # Command Injection patterns
-        self.command_injection_patterns = [
-            r";\s*(ls|cat|wget|curl|bash|sh|nc|netcat)",
-            r"\|\s*(ls|cat|wget|curl|bash|sh|nc)",
-            r"`.*`",
-            r"\$\(.*\)",
-            r"&&\s*(ls|cat|wget|curl)",
-        ]
-        
-        # Web Shell patterns
-        self.webshell_patterns = [
-            r"c99\.php",
-            r"r57\.php",
-            r"shell\.php",
-            r"cmd\.php",
-            r"backdoor\.php",
-            r"phpshell",
-            r"webshell",
-            r"\.php\?cmd=",
-        ]
-        
-        # Suspicious paths
-        self.suspicious_paths = [
-            r"/admin\.php",
-            r"/phpmyadmin",
-            r"/wp-admin",
-            r"/wp-login\.php",
-            r"/wp-config\.php",
-            r"/\.env",
-            r"/\.git",
-            r"/config\.php",
-            r"/db\.php",
-            r"/database\.php",
-            r"/backup",
-            r"/xmlrpc\.php",
-            r"/\.aws/credentials",
-        ]
+    def __init__(self, rules_path: Optional[str] = None, prefilter: Optional[str] = 'auto',
+                 regex_engine: Optional[str] = 'auto', max_scan_length: Optional[int] = MAX_SCAN_LENGTH,
+                 rule_time_budget: Optional[float] = RULE_TIME_BUDGET,
+                 verdict_cache_size: Optional[int] = VERDICT_CACHE_SIZE,
+                 reload_interval: Optional[float] = RULES_RELOAD_INTERVAL):
+        """
+        rules_path: ruleset file (JSON / YAML), default ATTACK_RULES_PATH atau config/attack_rules.json
+        prefilter: literal prefilter backend ('ahocorasick' atau 'regex'),
+        'auto' (ahocorasick jika terinstall) atau None untuk tanpa prefilter
+        regex_engine: 're2', 're' atau 'auto' (re2 jika google-re2 terinstall)
+        max_scan_length: characters per field untuk backtracking rules di re (head + tail),
+        None untuk tanpa batas; a longer field adds an 'Oversized Request' threat
+        rule_time_budget: seconds per rule evaluation sebelum rule di-flag,
+        None untuk tanpa match time accounting (combined regex per field view)
+        verdict_cache_size: requests di LRU verdict cache, None untuk tanpa cache
+        reload_interval: seconds antara checks untuk perubahan ruleset file, None untuk tanpa hot reload
+        """
+        self.rules_path = rules_path or os.getenv('ATTACK_RULES_PATH') or DEFAULT_RULES_PATH
         
         # Brute force indicators (untuk SSH)
         self.brute_force_threshold = 5  # failed attempts
         self.brute_force_window = 300  # 5 minutes
-        
+        self.brute_force = BruteForceTracker(self.brute_force_threshold, self.brute_force_window)
+        
+        self.prefilter_backend = prefilter
+        self.regex_engine = resolve_engine(regex_engine)
+        self.max_scan_length = max_scan_length
+        self.rule_time_budget = rule_time_budget
+        self.verdict_cache = VerdictCache(verdict_cache_size) if verdict_cache_size else None
+        self.reload_interval = reload_interval
+        self.ruleset: Optional[RuleSet] = None
+        self._rules_signature = None
+        self._next_reload_check = 0.0
+        self._reload_lock = Lock()
+        self.reload_rules()
+    
+    def compile_rules(self, data: Dict, source: Optional[str] = None) -> RuleSet:
+        """Ruleset dict -> RuleSet dengan options detector ini (ValueError jika invalid)"""
+        categories, rules = parse_ruleset(data)
+        return RuleSet(
+            categories, rules, self.regex_engine, self.prefilter_backend, self.rule_time_budget,
+            previous=self.ruleset, source=source, version=data.get('version'), scan_length=self.max_scan_length
+        )
+    
+    def use_ruleset(self, ruleset: RuleSet):
+        """Swap ruleset (atomic: analyses in flight finish on the old one) dan invalidate verdict cache"""
+        replaced = self.ruleset is not None
+        self.ruleset = ruleset
+        if replaced and self.verdict_cache is not None:
+            self.verdict_cache.clear()
+    
+    def reload_rules(self, force: bool = True) -> bool:
+        """
+        Load rules_path dan swap ruleset; force=False hanya jika file berubah
+        Invalid file: old rules stay active and False is returned (raises on the first load)
+        """
+        with self._reload_lock:
+            signature = _file_signature(self.rules_path)
+            if not force and signature == self._rules_signature:
+                return False
+            self._rules_signature = signature
+            try:
+                ruleset = self.compile_rules(read_ruleset(self.rules_path), self.rules_path)
+            except (OSError, ValueError, RuntimeError) as e:
+                if self.ruleset is None:
+                    raise
+                print(f"[AttackDetector] Ruleset reload failed, keeping {len(self.ruleset.rules)} rules: {e}")
+                return False
+            self.use_ruleset(ruleset)
+        print(f"[AttackDetector] Loaded {len(ruleset.rules)} rules from {self.rules_path}")
+        return True
+    
+    def _check_reload(self):
+        now = monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self.reload_interval
+        if _file_signature(self.rules_path) != self._rules_signature:
+            self.reload_rules(force=False)
+    
+    def rule_stats(self) -> List[Dict]:
+        """
+        Per-rule hits dan match time (rule_time_budget), paling mahal dulu
+        Requests answered by the verdict cache don't evaluate rules and aren't counted
+        """
+        return self.ruleset.rule_stats()
+    
+    def slow_rules(self) -> List[Dict]:
+        """Rules yang pernah melewati rule_time_budget"""
+        return [rule for rule in self.rule_stats() if rule['over_budget']]
+    
+    def match_category(self, category: str, text: str) -> Optional[Dict]:
+        """Threat dict untuk category jika text match (rules' own lowercasing), None jika tidak"""
+        return self.ruleset.match_text(category, text)
+    
     def detect_sql_injection(self, text: str) -> Dict:
         """Detect SQL Injection attempts"""
-        text_lower = text.lower()
-        
-        for pattern in self.sql_injection_patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return {
-                    'detected': True,
-                    'attack_type': 'SQL Injection',
-                    'severity': 'HIGH',
-                    'pattern': pattern,
-                    'description': 'Possible SQL injection attempt detected'
-                }
-        
-        return {'detected': False}
+        return self.match_category('sql_injection', text) or {'detected': False}
     
     def detect_xss(self, text: str) -> Dict:
         """Detect Cross-Site Scripting (XSS) attempts"""
-        text_lower = text.lower()
-        
-        for pattern in self.xss_patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return {
-                    'detected': True,
-                    'attack_type': 'XSS',
-                    'severity': 'HIGH',
-                    'pattern': pattern,
-                    'description': 'Possible XSS attack detected'
-                }
-        
-        return {'detected': False}
+        return self.match_category('xss', text) or {'detected': False}
     
     def detect_path_traversal(self, text: str) -> Dict:
         """Detect Path Traversal attempts"""
-        for pattern in self.path_traversal_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return {
-                    'detected': True,
-                    'attack_type': 'Path Traversal',
-                    'severity': 'MEDIUM',
-                    'pattern': pattern,
-                    'description': 'Directory traversal attempt detected'
-                }
-        
-        return {'detected': False}
+        return self.match_category('path_traversal', text) or {'detected': False}
     
     def detect_command_injection(self, text: str) -> Dict:
         """Detect Command Injection attempts"""
-        for pattern in self.command_injection_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return {
-                    'detected': True,
-                    'attack_type': 'Command Injection',
-                    'severity': 'CRITICAL',
-                    'pattern': pattern,
-                    'description': 'OS command injection attempt detected'
-                }
-        
-        return {'detected': False}
+        return self.match_category('command_injection', text) or {'detected': False}
     
     def detect_webshell(self, text: str) -> Dict:
         """Detect Web Shell access attempts"""
-        text_lower = text.lower()
-        
-        for pattern in self.webshell_patterns:
-            if re.search(pattern, text_lower):
-                return {
-                    'detected': True,
-                    'attack_type': 'Web Shell',
-                    'severity': 'CRITICAL',
-                    'pattern': pattern,
-                    'description': 'Web shell access attempt detected'
-                }
-        
-        return {'detected': False}
+        return self.match_category('webshell', text) or {'detected': False}
     
     def detect_suspicious_path(self, path: str) -> Dict:
         """Detect access to suspicious paths"""
-        path_lower = path.lower()
-        
-        for pattern in self.suspicious_paths:
-            if re.search(pattern, path_lower):
-                return {
-                    'detected': True,
-                    'attack_type': 'Suspicious Access',
-                    'severity': 'MEDIUM',
-                    'pattern': pattern,
-                    'description': 'Access to sensitive/suspicious path'
-                }
-        
-        return {'detected': False}
+        return self.match_category('suspicious_path', path) or {'detected': False}
     
     def analyze_http_request(self, method: str, path: str, user_agent: str = None) -> List[Dict]:
         """Analyze HTTP request for multiple attack types"""
-        threats = []
-        
-        # Gabungkan semua data untuk analisis
-        full_request = f"{method} {path}"
-        if user_agent:
-            full_request += f" {user_agent}"
-        
-        # Check SQL Injection
-        sql_result = self.detect_sql_injection(full_request)
-        if sql_result['detected']:
-            threats.append(sql_result)
-        
-        # Check XSS
-        xss_result = self.detect_xss(full_request)
-        if xss_result['detected']:
-            threats.append(xss_result)
-        
-        # Check Path Traversal
-        traversal_result = self.detect_path_traversal(path)
-        if traversal_result['detected']:
-            threats.append(traversal_result)
-        
-        # Check Command Injection
-        cmd_result = self.detect_command_injection(full_request)
-        if cmd_result['detected']:
-            threats.append(cmd_result)
-        
-        # Check Web Shell
-        shell_result = self.detect_webshell(path)
-        if shell_result['detected']:
-            threats.append(shell_result)
-        
-        # Check Suspicious Paths
-        susp_result = self.detect_suspicious_path(path)
-        if susp_result['detected']:
-            threats.append(susp_result)
-        
-        return threats
+        if self.reload_interval is not None:
+            self._check_reload()
+        user_agent = user_agent or ''
+        
+        cache = self.verdict_cache
+        oversized = self.max_scan_length is not None and \
+            len(path) + len(user_agent) > self.max_scan_length
+        if cache is None or oversized:
+            # Long requests are rarely repeated; don't let them fill the cache
+            return self.ruleset.analyze(method, path, user_agent)
+        key = (method, path, user_agent)
+        verdict = cache.get(key)
+        if verdict is None:
+            generation = cache.generation
+            verdict = tuple(self.ruleset.analyze(method, path, user_agent))
+            cache.put(key, verdict, generation)
+        # Threat dicts are shared by every hit of the signature: read-only
+        return list(verdict)
+    
+    def cache_stats(self) -> Optional[Dict]:
+        """Verdict cache counters (hits, misses, evictions, ...), None tanpa cache"""
+        return self.verdict_cache.stats() if self.verdict_cache is not None else None
     
     def detect_brute_force_ssh(self, failed_attempts: List[Dict]) -> Optional[Dict]:
         """
@@ -232,16 +186,29 @@ class AttackDetector:
         failed_attempts: list of {'ip': str, 'timestamp': datetime, 'username': str}
         """
         if len(failed_attempts) >= self.brute_force_threshold:
-            return {
-                'detected': True,
-                'attack_type': 'SSH Brute Force',
-                'severity': 'HIGH',
-                'description': f'{len(failed_attempts)} failed login attempts detected',
-                'failed_count': len(failed_attempts)
-            }
+            return self._brute_force_threat(len(failed_attempts), f'{len(failed_attempts)} failed login attempts detected')
         
         return None
     
+    def track_ssh_failure(self, ip: str, timestamp: datetime) -> Optional[Dict]:
+        """
+        Streaming brute force detection: satu failed / invalid_user event dari ip
+        Threat dict saat ip baru melewati brute_force_threshold dalam brute_force_window, sekali per episode
+        """
+        if not self.brute_force.record(ip, timestamp.timestamp()):
+            return None
+        count = self.brute_force.threshold
+        return self._brute_force_threat(count, f'{count} failed login attempts within {self.brute_force.window}s')
+    
+    def _brute_force_threat(self, count: int, description: str) -> Dict:
+        return {
+            'detected': True,
+            'attack_type': 'SSH Brute Force',
+            'severity': 'HIGH',
+            'description': description,
+            'failed_count': count
+        }
+    
     def detect_port_scan(self, connections: List[Dict]) -> Optional[Dict]:
         """
         Detect port scanning behavior
@@ -0,0 +1,253 @@
+"""
+Backfill Service
+Memory-bounded ingestion of log content that existed before the watcher started
+"""
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.database import SessionLocal
+from services.checkpoint import source_id
+from services.log_archive import open_log, is_archive, is_compressed, content_fingerprint, rotated_generations
+
+BLOCK_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Backfill modes:
+#   tail - last N lines per file (read backwards in blocks)
+#   full - rotated archives (oldest first, skipping imported ones) + whole file,
+#          streamed in bounded chunks
+#   off  - nothing, only new lines are ingested
+BACKFILL_MODES = ('tail', 'full', 'off')
+
+
+def is_final(path: str) -> bool:
+    """Rotated / compressed generation: nobody writes to it anymore, an unterminated last line is complete"""
+    return is_archive(path) or is_compressed(path)
+
+
+def tail_lines(path: str, count: int, block_size: int = BLOCK_SIZE,
+               final: Optional[bool] = None) -> List[Tuple[int, str]]:
+    """
+    Last count lines of a file, reading backwards in fixed-size blocks
+    final: include an unterminated last line (default: is_final(path)); a live
+           file's last line may still be being written
+    Returns: [(offset of the line start, decoded line)]
+    """
+    if count <= 0:
+        return []
+    
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        chunks = []
+        newlines = 0
+        
+        # count + 1 newlines guarantees the oldest wanted line is complete
+        while position > 0 and newlines <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+    
+    data = b''.join(reversed(chunks))
+    raw_lines = data.split(b'\n')
+    if raw_lines and (not raw_lines[-1] or not (is_final(path) if final is None else final)):
+        raw_lines.pop()  # nothing after the last newline, or a partial line
+    
+    offsets = []
+    offset = position
+    for line in raw_lines:
+        offsets.append(offset)
+        offset += len(line) + 1
+    
+    return [
+        (start, line.decode('utf-8', errors='ignore'))
+        for start, line in zip(offsets[-count:], raw_lines[-count:])
+    ]
+
+
+def iter_lines(path: str, start: int = 0, end: Optional[int] = None,
+               chunk_size: int = CHUNK_SIZE, final: Optional[bool] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Stream lines between byte offsets in bounded chunks
+    Compressed archives (.gz/.zst) are decompressed on the fly; offsets are
+    then positions in the decompressed stream and end=None reads to EOF
+    final: yield an unterminated last line (default: is_final(path)); otherwise
+           it is held back and the last offset stays at the last newline
+    Yields: (offset after the line, decoded line)
+    """
+    with open_log(path, chunk_size) as f:
+        if start:
+            f.seek(start)
+        position = start
+        carry = b''
+        
+        while end is None or position < end:
+            chunk = f.read(chunk_size if end is None else min(chunk_size, end - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            
+            data = carry + chunk if carry else chunk
+            last_newline = data.rfind(b'\n')
+            if last_newline < 0:
+                carry = data
+                continue
+            
+            # Only b'\n' ends a line (like the tailer), so offsets match its row keys
+            offset = position - len(data)
+            for line in data[:last_newline].split(b'\n'):
+                offset += len(line) + 1
+                yield offset, line.decode('utf-8', errors='ignore')
+            carry = data[last_newline + 1:]
+        
+        if carry and (is_final(path) if final is None else final):
+            yield position, carry.decode('utf-8', errors='ignore')
+
+
+class BackfillEngine:
+    """Feed existing log content through a parser in batches"""
+    
+    def __init__(self, mode: str = 'tail', tail_count: int = 100, max_lines: Optional[int] = None,
+                 max_seconds: Optional[float] = None, batch_size: int = 500, bulk_writer=None,
+                 progress_interval: float = 5.0, progress: Optional[Callable[[Dict], None]] = None,
+                 ledger=None):
+        """
+        mode: 'tail', 'full' or 'off' (see BACKFILL_MODES)
+        tail_count: lines per file in tail mode
+        max_lines / max_seconds: stop a full backfill early (None = no limit)
+        progress: callback(stats) every progress_interval seconds (default: print)
+        ledger: ArchiveLedger so archives are only imported once
+        """
+        if mode not in BACKFILL_MODES:
+            raise ValueError(f"Unknown backfill mode: {mode}")
+        
+        self.mode = mode
+        self.tail_count = tail_count
+        self.max_lines = max_lines
+        self.max_seconds = max_seconds
+        self.batch_size = batch_size
+        self.bulk_writer = bulk_writer
+        self.progress_interval = progress_interval
+        self.progress = progress or self.print_progress
+        self.ledger = ledger
+    
+    def run(self, name: str, path: str, parser, source: Optional[str] = None) -> Dict:
+        """
+        Backfill one file, returns stats
+        source: source name in row keys (default name), so lines the watcher
+                already saved from the same file are skipped
+        """
+        stats = {
+            'name': name,
+            'lines': 0,
+            'saved': 0,
+            'bytes': 0,
+            'total_bytes': os.path.getsize(path),
+            'elapsed': 0.0,
+            'complete': True,
+        }
+        if self.mode == 'off':
+            return stats
+        
+        started = time.monotonic()
+        last_report = started
+        
+        # First decompressed line, like the watcher (file_fingerprint) and cli.py backfill
+        fingerprint = content_fingerprint(path)
+        inode = os.stat(path).st_ino
+        key_source = source_id(source or name, fingerprint)
+        
+        if self.mode == 'tail' and not is_compressed(path):
+            lines = ((None, start, line) for start, line in tail_lines(path, self.tail_count))
+        else:
+            lines = self._with_starts(iter_lines(path))
+        
+        db = SessionLocal()
+        try:
+            batch = []
+            starts = []
+            for offset, start, line in lines:
+                batch.append(line)
+                starts.append(start)
+                stats['lines'] += 1
+                if offset is not None:
+                    stats['bytes'] = offset
+                
+                if len(batch) >= self.batch_size:
+                    stats['saved'] += parser.process_batch(
+                        batch, db, self.bulk_writer, keys=(key_source, inode, starts)
+                    )
+                    batch = []
+                    starts = []
+                    
+                    now = time.monotonic()
+                    stats['elapsed'] = now - started
+                    if now - last_report >= self.progress_interval:
+                        self.progress(stats)
+                        last_report = now
+                
+                if self._limit_reached(stats, started):
+                    stats['complete'] = False
+                    break
+            
+            if batch:
+                stats['saved'] += parser.process_batch(
+                    batch, db, self.bulk_writer, keys=(key_source, inode, starts)
+                )
+        finally:
+            db.close()
+        
+        if self.mode == 'tail' or is_compressed(path):
+            stats['bytes'] = stats['total_bytes']
+        stats['elapsed'] = time.monotonic() - started
+        return stats
+    
+    def run_archives(self, name: str, path: str, parser) -> List[Dict]:
+        """Backfill rotated generations of path in chronological order (full mode only)"""
+        results = []
+        if self.mode != 'full':
+            return results
+        
+        for archive_path in rotated_generations(path):
+            fingerprint = content_fingerprint(archive_path)
+            if self.ledger and self.ledger.is_done(fingerprint):
+                continue
+            
+            print(f"[Backfill] {name}: Importing archive {archive_path}")
+            stats = self.run(f"{name}:{os.path.basename(archive_path)}", archive_path, parser, source=name)
+            results.append(stats)
+            
+            if not stats['complete']:
+                # Limit hit - newer generations would leave a gap, stop here
+                break
+            if self.ledger:
+                self.ledger.mark_done(fingerprint, archive_path, stats['lines'])
+        
+        return results
+    
+    @staticmethod
+    def _with_starts(lines: Iterator[Tuple[int, str]]) -> Iterator[Tuple[int, int, str]]:
+        """(offset after line, line) -> (offset after line, line start, line)"""
+        start = 0
+        for offset, line in lines:
+            yield offset, start, line
+            start = offset
+    
+    def _limit_reached(self, stats: Dict, started: float) -> bool:
+        if self.max_lines is not None and stats['lines'] >= self.max_lines:
+            return True
+        if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+            return True
+        return False
+    
+    @staticmethod
+    def print_progress(stats: Dict):
+        total = stats['total_bytes'] or 1
+        rate = stats['lines'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        print(
+            f"[Backfill] {stats['name']}: {stats['lines']} lines, "
+            f"{stats['bytes'] / 1048576:.1f}/{total / 1048576:.1f} MB "
+            f"({100.0 * stats['bytes'] / total:.0f}%), {rate:.0f} lines/s"
+        )
@@ -0,0 +1,75 @@
+"""
+Streaming SSH brute force detection
+Per source IP a ring buffer keeps the timestamps of the last `threshold`
+failed attempts: the IP is over the threshold exactly when the oldest of them
+is inside the window. One update is O(1) and the state per IP is fixed; the
+IP table is an LRU with a size cap, so a botnet spray over millions of
+addresses keeps memory flat (only the least recently seen IPs are forgotten)
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict
+
+# Source IPs tracked at once; beyond this the least recently seen is evicted
+BRUTE_FORCE_MAX_IPS = 65536
+
+
+class BruteForceTracker:
+    """
+    Sliding-window failed attempt counter per source IP
+    record() is True once per episode: when an attempt brings the IP from
+    below to at least `threshold` attempts within `window` seconds
+    Events per IP are expected in time order (one log stream)
+    """
+    
+    def __init__(self, threshold: int, window: float, max_ips: int = BRUTE_FORCE_MAX_IPS):
+        if threshold < 1:
+            raise ValueError("threshold must be at least 1")
+        self.threshold = threshold
+        self.window = window
+        self.max_ips = max_ips
+        self.alerts = 0
+        self.evictions = 0
+        # ip -> [next slot, timestamp * threshold] (None = empty slot)
+        self._states: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = Lock()
+    
+    def record(self, ip: str, timestamp: float) -> bool:
+        """Catat satu failed attempt (timestamp dalam seconds); True jika threshold baru terlewati"""
+        threshold = self.threshold
+        with self._lock:
+            states = self._states
+            state = states.get(ip)
+            if state is None:
+                state = states[ip] = [1] + [None] * threshold
+                if len(states) > self.max_ips:
+                    states.popitem(last=False)
+                    self.evictions += 1
+            else:
+                states.move_to_end(ip)
+            slot = state[0]
+            # The slot being overwritten holds the oldest of the previous `threshold` attempts
+            oldest = state[slot]
+            state[slot] = timestamp
+            slot = slot + 1 if slot < threshold else 1
+            state[0] = slot
+            # Now the next slot holds the oldest of the last `threshold` attempts (this one included)
+            first = state[slot]
+            crossed = (
+                first is not None and timestamp - first <= self.window
+                and (oldest is None or timestamp - oldest > self.window)
+            )
+            if crossed:
+                self.alerts += 1
+            return crossed
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def stats(self) -> Dict:
+        return {
+            'tracked_ips': len(self._states),
+            'max_ips': self.max_ips,
+            'alerts': self.alerts,
+            'evictions': self.evictions,
+        }
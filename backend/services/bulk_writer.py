@@ -0,0 +1,322 @@
+"""
+Bulk Writer
+Stream parsed rows ke PostgreSQL via COPY ... FROM STDIN (CSV),
+dengan ORM path sebagai fallback untuk database lain
+"""
+import io
+from datetime import datetime, date, timezone
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Sequence, Set
+from sqlalchemy import DateTime, Float, Integer, String
+from models.attack_log import AttackLog
+from parsers.base_parser import SOURCE_KEY
+
+# Write modes:
+#   auto - COPY on PostgreSQL, ORM otherwise
+#   copy - always COPY (fails on non-PostgreSQL databases)
+#   orm  - original session.add() path
+WRITE_MODES = ('auto', 'copy', 'orm')
+
+COPY_NULL = '\\N'
+
+
+def _csv_value(value: Any) -> str:
+    """Encode one value untuk COPY CSV (NULL is unquoted \\N, everything else quoted)"""
+    if value is None:
+        return COPY_NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            # Match the ORM path: aware values land in timestamp columns as UTC
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value)
+    if '\x00' in text:
+        # PostgreSQL text cannot hold NUL bytes
+        text = text.replace('\x00', '')
+    return '"' + text.replace('"', '""') + '"'
+
+
+# Column-typed encoders (write_columns): one type check instead of the _csv_value chain
+
+def _csv_text(value: Any) -> str:
+    if value is None:
+        return COPY_NULL
+    text = value if type(value) is str else str(value)
+    if '\x00' in text:
+        text = text.replace('\x00', '')
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _csv_number(value: Any) -> str:
+    if value is None or type(value) is bool:
+        return _csv_value(value)
+    return repr(value)
+
+
+def _csv_datetime(value: Any) -> str:
+    if type(value) is not datetime:
+        return _csv_value(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _column_encoder(column) -> Callable[[Any], str]:
+    if isinstance(column.type, String):
+        return _csv_text
+    if isinstance(column.type, (Integer, Float)):
+        return _csv_number
+    if isinstance(column.type, DateTime):
+        return _csv_datetime
+    return _csv_value
+
+
+class BulkWriter:
+    """Write batches of parsed data for a parser in one round trip per table"""
+    
+    def __init__(self, mode: str = 'auto'):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode: {mode}")
+        self.mode = mode
+        self._columns_cache = {}
+        self._defaults_cache = {}
+        self._encoders_cache = {}
+    
+    def uses_copy(self, db_session) -> bool:
+        if self.mode == 'orm':
+            return False
+        if self.mode == 'copy':
+            return True
+        return db_session.get_bind().dialect.name == 'postgresql'
+    
+    def write(self, parser, parsed_list: List[Dict[str, Any]], db_session) -> int:
+        """
+        Write parsed data (main rows + related attack logs), tanpa commit
+        Rows dengan source key yang sudah ada di table di-skip
+        Returns: jumlah main rows baru
+        """
+        if not parsed_list:
+            return 0
+        
+        if not self.uses_copy(db_session):
+            return parser._stage(parsed_list, db_session)
+        
+        rows = [parser.build_row(parsed) for parsed in parsed_list]
+        attack_rows = []
+        
+        if any(parser.has_attacks(parsed) for parsed in parsed_list):
+            # COPY cannot return generated ids, so reserve them up front.
+            # Ids go to every row: a CSV COPY has one fixed column list
+            ids = self.reserve_ids(db_session, parser.model.__tablename__, len(rows))
+            for parsed, row, row_id in zip(parsed_list, rows, ids):
+                row['id'] = row_id
+                for attack_row in parser.build_attack_rows(parsed):
+                    attack_row['related_log_id'] = row_id
+                    attack_rows.append(attack_row)
+        
+        if rows[0].get('source_offset') is None:
+            self.copy_rows(db_session, parser.model, rows)
+            saved = len(rows)
+        else:
+            inserted_ids = self.copy_rows_ignore(db_session, parser.model, rows)
+            saved = len(inserted_ids)
+            if attack_rows and saved < len(rows):
+                attack_rows = [row for row in attack_rows if row['related_log_id'] in inserted_ids]
+        
+        if attack_rows:
+            self.copy_rows(db_session, AttackLog, attack_rows)
+        return saved
+    
+    def write_columns(self, parser, batch, db_session) -> int:
+        """
+        write() untuk ColumnBatch (parsers.columns): values are encoded one
+        column at a time, parsed dicts only for rows with attacks
+        Returns: jumlah main rows baru
+        """
+        if not len(batch):
+            return 0
+        
+        if not self.uses_copy(db_session):
+            return parser._stage(batch.to_parsed(), db_session)
+        
+        columns = batch.as_dict()
+        attack_rows = []
+        attacks = [(index, batch.row(index)) for index in sorted(batch.extras)]
+        attacks = [(index, parsed) for index, parsed in attacks if parser.has_attacks(parsed)]
+        
+        if attacks:
+            ids = self.reserve_ids(db_session, parser.model.__tablename__, len(batch))
+            columns['id'] = ids
+            for index, parsed in attacks:
+                for attack_row in parser.build_attack_rows(parsed):
+                    attack_row['related_log_id'] = ids[index]
+                    attack_rows.append(attack_row)
+        
+        if columns.get('source_offset', [None])[0] is None:
+            self.copy_columns(db_session, parser.model, columns, len(batch))
+            saved = len(batch)
+        else:
+            inserted_ids = self._copy_ignore(
+                db_session, parser.model, 'id' in columns,
+                lambda staging: self.copy_columns(db_session, parser.model, columns, len(batch), staging)
+            )
+            saved = len(inserted_ids)
+            if attack_rows and saved < len(batch):
+                attack_rows = [row for row in attack_rows if row['related_log_id'] in inserted_ids]
+        
+        if attack_rows:
+            self.copy_rows(db_session, AttackLog, attack_rows)
+        return saved
+    
+    def reserve_ids(self, db_session, table: str, count: int) -> List[int]:
+        """Take count values from the table's id sequence"""
+        cursor = db_session.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                (table, count)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    
+    def copy_rows_ignore(self, db_session, model, rows: Sequence[Dict[str, Any]]) -> Set[int]:
+        """
+        COPY rows ke temp table, lalu INSERT ... ON CONFLICT (source key) DO NOTHING
+        (COPY itself aborts on the first duplicate)
+        Returns: ids dari rows yang baru di-insert
+        """
+        return self._copy_ignore(
+            db_session, model, 'id' in rows[0],
+            lambda staging: self.copy_rows(db_session, model, rows, table_name=staging)
+        )
+    
+    def _copy_ignore(self, db_session, model, with_id: bool, copy: Callable[[str], None]) -> Set[int]:
+        """copy(staging table name) fills the staging table, lalu insert yang belum ada"""
+        table = model.__table__.name
+        staging = f"{table}_staging"
+        columns = ', '.join(self._columns(model, with_id))
+        
+        cursor = db_session.connection().connection.cursor()
+        try:
+            # No constraints or defaults: everything is filled in by the COPY
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT * FROM {table} WITH NO DATA"
+            )
+            copy(staging)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({', '.join(SOURCE_KEY)}) DO NOTHING RETURNING id"
+            )
+            inserted_ids = {row[0] for row in cursor.fetchall()}
+            cursor.execute(f"TRUNCATE {staging}")
+            return inserted_ids
+        finally:
+            cursor.close()
+    
+    def copy_rows(self, db_session, model, rows: Sequence[Dict[str, Any]], table_name: str = None):
+        """
+        COPY rows ke table dari model, dalam transaction milik db_session
+        table_name: COPY ke table lain dengan columns yang sama (staging)
+        """
+        if not rows:
+            return
+        
+        columns = self._columns(model, 'id' in rows[0])
+        defaults = self._resolved_defaults(model)
+        
+        buffer = io.StringIO()
+        write = buffer.write
+        for row in rows:
+            write(','.join([
+                _csv_value(row[column]) if column in row else defaults.get(column, COPY_NULL)
+                for column in columns
+            ]))
+            write('\n')
+        self._copy(db_session, table_name or model.__table__.name, columns, buffer)
+    
+    def copy_columns(self, db_session, model, columns: Dict[str, Sequence], length: int,
+                     table_name: str = None):
+        """
+        copy_rows untuk column lists (name -> values, semua sepanjang length)
+        Columns yang tidak ada diisi default (atau NULL)
+        """
+        if not length:
+            return
+        
+        names = self._columns(model, 'id' in columns)
+        defaults = self._resolved_defaults(model)
+        encoders = self._encoders(model)
+        fields = [
+            map(encoders[name], columns[name]) if name in columns
+            else repeat(defaults.get(name, COPY_NULL), length)
+            for name in names
+        ]
+        
+        buffer = io.StringIO()
+        buffer.write('\n'.join(map(','.join, zip(*fields))))
+        buffer.write('\n')
+        self._copy(db_session, table_name or model.__table__.name, names, buffer)
+    
+    def _copy(self, db_session, table_name: str, columns: List[str], buffer: io.StringIO):
+        buffer.seek(0)
+        sql = (
+            f"COPY {table_name} ({', '.join(columns)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        )
+        cursor = db_session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(sql, buffer)
+        finally:
+            cursor.close()
+    
+    def _columns(self, model, with_id: bool) -> List[str]:
+        """Every column except an id the database should generate"""
+        key = (model.__tablename__, with_id)
+        if key not in self._columns_cache:
+            self._columns_cache[key] = [
+                column.name for column in model.__table__.columns
+                if with_id or column.name != 'id'
+            ]
+        return self._columns_cache[key]
+    
+    def _defaults(self, model) -> Dict[str, Any]:
+        """Python-side column defaults (COPY bypasses SQLAlchemy)"""
+        table_name = model.__tablename__
+        if table_name not in self._defaults_cache:
+            defaults = {}
+            for column in model.__table__.columns:
+                default = column.default
+                if default is None or not default.is_scalar and not default.is_callable:
+                    continue
+                if default.is_callable:
+                    # SQLAlchemy wraps callables to take an execution context
+                    defaults[column.name] = lambda fn=default.arg: fn(None)
+                else:
+                    defaults[column.name] = default.arg
+            self._defaults_cache[table_name] = defaults
+        return self._defaults_cache[table_name]
+    
+    def _resolved_defaults(self, model) -> Dict[str, str]:
+        """Encoded defaults, resolved once per batch (e.g. one utcnow() for the whole COPY)"""
+        return {
+            name: _csv_value(default() if callable(default) else default)
+            for name, default in self._defaults(model).items()
+        }
+    
+    def _encoders(self, model) -> Dict[str, Callable[[Any], str]]:
+        """Column name -> CSV encoder untuk column type"""
+        table_name = model.__tablename__
+        if table_name not in self._encoders_cache:
+            self._encoders_cache[table_name] = {
+                column.name: _column_encoder(column) for column in model.__table__.columns
+            }
+        return self._encoders_cache[table_name]
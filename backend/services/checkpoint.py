@@ -0,0 +1,85 @@
+"""
+Checkpoint Store
+Persistent per-source read positions: (device, inode, offset, first-line fingerprint)
+"""
+import os
+import json
+import hashlib
+from threading import Lock
+from typing import Dict, Any, Optional
+
+# Enough bytes to cover the first line of any sane log line
+FINGERPRINT_BYTES = 1024
+
+
+def file_fingerprint(fd: int) -> Optional[str]:
+    """
+    Hash of the first line of an open file
+    Returns None while the first line is still incomplete
+    """
+    head = os.pread(fd, FINGERPRINT_BYTES, 0)
+    newline = head.find(b'\n')
+    if newline >= 0:
+        head = head[:newline + 1]
+    elif len(head) < FINGERPRINT_BYTES:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+
+def source_id(name: str, fingerprint: Optional[str]) -> str:
+    """
+    source_id untuk row keys (source_id, inode, offset): source name + first-line
+    fingerprint, so a file truncated in place (same inode, offsets start over)
+    doesn't collide with the rows it had before
+    """
+    return f"{name}:{fingerprint[:16]}" if fingerprint else name
+
+
+class CheckpointStore:
+    """JSON file mapping source name -> checkpoint dict, written atomically"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._checkpoints = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[Checkpoint] Error loading {self.path}: {e}, starting fresh")
+            return {}
+    
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            checkpoint = self._checkpoints.get(source)
+            return dict(checkpoint) if checkpoint else None
+    
+    def update(self, source: str, path: str, device: int, inode: int, offset: int,
+               fingerprint: Optional[str]):
+        """Record position and persist"""
+        with self._lock:
+            self._checkpoints[source] = {
+                'path': path,
+                'device': device,
+                'inode': inode,
+                'offset': offset,
+                'fingerprint': fingerprint,
+            }
+            self._save()
+    
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._checkpoints, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[Checkpoint] Error saving {self.path}: {e}")
@@ -0,0 +1,248 @@
+"""
+Historical Import
+Parallel parse + attack detection of archived logs using a process pool
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.database import SessionLocal
+from parsers import PARSER_TYPES, create_parser
+from parsers.columns import ColumnBatch
+from services.backfill import iter_lines
+from services.checkpoint import source_id
+from services.log_archive import content_fingerprint, is_compressed
+
+RANGE_SIZE = 8 * 1024 * 1024
+
+# Parser instance per worker process (built on first use)
+_worker_parsers = {}
+
+
+def split_ranges(path: str, range_size: int = RANGE_SIZE) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a file into byte ranges that start and end on line boundaries
+    Compressed archives can't be seeked into, use compressed_chunks instead
+    """
+    if is_compressed(path):
+        raise ValueError(f"{path} is compressed, it can only be read as a stream (compressed_chunks)")
+    
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + range_size
+            if end >= size:
+                end = size
+            else:
+                # Extend to just past the next newline
+                f.seek(end)
+                while True:
+                    block = f.read(64 * 1024)
+                    if not block:
+                        end = size
+                        break
+                    newline = block.find(b'\n')
+                    if newline >= 0:
+                        end += newline + 1
+                        break
+                    end += len(block)
+            ranges.append((start, end))
+            start = end
+    
+    return ranges
+
+
+def compressed_chunks(path: str, chunk_size: int = RANGE_SIZE) -> Iterator[Tuple[List[str], List[int]]]:
+    """
+    Stream-decompress an archive into (lines, line start offsets) chunks of
+    about chunk_size decompressed bytes, so memory doesn't grow with the archive
+    """
+    lines = []
+    offsets = []
+    offset = 0
+    chunk_start = 0
+    for line_end, line in iter_lines(path):
+        lines.append(line)
+        offsets.append(offset)
+        offset = line_end
+        if offset - chunk_start >= chunk_size:
+            yield lines, offsets
+            lines = []
+            offsets = []
+            chunk_start = offset
+    if lines:
+        yield lines, offsets
+
+
+def file_key(source: str, path: str) -> Tuple[str, int]:
+    """
+    (source_id, inode) untuk row keys of a file, derived like the watcher and
+    backfill do: source name + first (decompressed) line fingerprint
+    """
+    # Keyed by file identity, not path: re-importing a renamed archive adds nothing
+    return source_id(source, content_fingerprint(path)), os.stat(path).st_ino
+
+
+def _worker_parser(log_type: str, log_format: Optional[str]):
+    parser = _worker_parsers.get((log_type, log_format))
+    if parser is None:
+        parser = _worker_parsers[(log_type, log_format)] = create_parser(log_type, log_format)
+    return parser
+
+
+def parse_range(log_type: str, path: str, start: int, end: int,
+                log_format: Optional[str] = None,
+                key: Optional[Tuple[str, int]] = None) -> Tuple[ColumnBatch, int, int]:
+    """
+    Worker: parse (and attack-detect) one byte range of a plain file
+    key: (source_id, inode) untuk row keys (default: file_key with source import:<log_type>)
+    Returns: (ColumnBatch, line_count, byte_count on disk)
+    Columns pickle much smaller than a dict per row on the way back
+    """
+    lines = []
+    offsets = []
+    offset = start
+    for line_end, line in iter_lines(path, start, end):
+        lines.append(line)
+        offsets.append(offset)
+        offset = line_end
+    
+    batch, line_count = parse_chunk(log_type, lines, offsets, key or file_key(f"import:{log_type}", path), log_format)
+    return batch, line_count, end - start
+
+
+def parse_chunk(log_type: str, lines: List[str], offsets: List[int], key: Tuple[str, int],
+                log_format: Optional[str] = None) -> Tuple[ColumnBatch, int]:
+    """
+    Worker: parse (and attack-detect) lines read by the parent (compressed archives)
+    Returns: (ColumnBatch, line_count)
+    """
+    parser = _worker_parser(log_type, log_format)
+    source, inode = key
+    return parser.parse_batch(lines, keys=(source, inode, offsets)), len(lines)
+
+
+class ParallelImporter:
+    """Fan byte ranges out to worker processes, funnel results into a bulk writer"""
+    
+    def __init__(self, log_type: str, workers: int = None, range_size: int = RANGE_SIZE,
+                 batch_size: int = 5000, bulk_writer=None, progress_interval: float = 2.0,
+                 log_format: Optional[str] = None):
+        if log_type not in PARSER_TYPES:
+            raise ValueError(f"Unknown log type: {log_type}")
+        
+        self.log_type = log_type
+        self.log_format = log_format
+        self.workers = workers or os.cpu_count() or 1
+        self.range_size = range_size
+        self.batch_size = batch_size
+        self.bulk_writer = bulk_writer
+        self.progress_interval = progress_interval
+        # Writes happen in this process; the parser is only used for row building
+        # (also compiles log_format here, so a bad format fails before any work)
+        self.parser = create_parser(log_type, log_format)
+    
+    def tasks(self, paths: List[str],
+              sources: Optional[Dict[str, str]] = None) -> Iterator[Tuple[Callable, tuple, int]]:
+        """
+        Work items (worker function, args, byte_count on disk), generated lazily
+        Plain files are split into byte ranges the workers read themselves;
+        archives are stream-decompressed here and sent as line chunks
+        sources: path -> source name untuk row keys (lihat run)
+        """
+        sources = sources or {}
+        for path in paths:
+            key = file_key(sources.get(path) or f"import:{self.log_type}", path)
+            if not is_compressed(path):
+                for start, end in split_ranges(path, self.range_size):
+                    yield parse_range, (self.log_type, path, start, end, self.log_format, key), end - start
+                continue
+            
+            # The archive's on-disk size is counted with its last chunk
+            chunks = compressed_chunks(path, self.range_size)
+            chunk = next(chunks, None)
+            while chunk is not None:
+                following = next(chunks, None)
+                byte_count = os.path.getsize(path) if following is None else 0
+                yield parse_chunk, (self.log_type, *chunk, key, self.log_format), byte_count
+                chunk = following
+    
+    def run(self, paths: List[str], sources: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Import files, returns stats
+        sources: path -> source name in row keys; the watcher's source name for a
+                 watched file (or its rotated generations) makes rows it already
+                 saved duplicates. Default: import:<log_type>
+        """
+        stats = {
+            'files': len(paths),
+            'ranges': 0,
+            'lines': 0,
+            'saved': 0,
+            'bytes': 0,
+            'total_bytes': sum(os.path.getsize(path) for path in paths),
+            'elapsed': 0.0,
+        }
+        
+        print(f"[Import] {self.log_type}: {stats['files']} file(s), "
+              f"{stats['total_bytes'] / 1048576:.1f} MB, {self.workers} workers")
+        
+        started = time.monotonic()
+        last_report = started
+        db = SessionLocal()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # future -> byte_count
+                pending = {}
+                task_iter = self.tasks(paths, sources)
+                
+                # Keep a bounded number of ranges / chunks in flight so results
+                # (and decompressed archive chunks) don't pile up
+                def submit_next():
+                    task = next(task_iter, None)
+                    if task is not None:
+                        func, args, byte_count = task
+                        pending[executor.submit(func, *args)] = byte_count
+                        stats['ranges'] += 1
+                
+                for _ in range(self.workers * 2):
+                    submit_next()
+                
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        byte_count = pending.pop(future)
+                        submit_next()
+                        
+                        columns, line_count = future.result()[:2]
+                        for i in range(0, len(columns), self.batch_size):
+                            stats['saved'] += self.parser.save_columns(
+                                columns.slice(i, i + self.batch_size), db, self.bulk_writer, report=False
+                            )
+                        stats['lines'] += line_count
+                        stats['bytes'] += byte_count
+                    
+                    now = time.monotonic()
+                    stats['elapsed'] = now - started
+                    if now - last_report >= self.progress_interval:
+                        self.print_progress(stats)
+                        last_report = now
+        finally:
+            db.close()
+        
+        stats['elapsed'] = time.monotonic() - started
+        return stats
+    
+    @staticmethod
+    def print_progress(stats: Dict):
+        elapsed = stats['elapsed'] or 1e-9
+        rate = stats['bytes'] / elapsed
+        remaining = stats['total_bytes'] - stats['bytes']
+        eta = remaining / rate if rate else 0.0
+        print(
+            f"[Import] {stats['bytes'] / 1048576:.1f}/{stats['total_bytes'] / 1048576:.1f} MB, "
+            f"{stats['lines'] / elapsed:.0f} lines/s, {rate / 1048576:.1f} MB/s, ETA {eta:.0f}s"
+        )
@@ -0,0 +1,133 @@
+"""
+Inotify Binding
+Minimal ctypes wrapper around Linux inotify for event-driven log tailing
+"""
+import os
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import List, Optional, Tuple
+
+# Event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Only wake up for writes and for the watched file going away
+TAIL_MASK = IN_MODIFY | IN_MOVE_SELF | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        # Raises AttributeError on platforms without inotify
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+
+def inotify_available() -> bool:
+    """Check if inotify can be used on this platform"""
+    try:
+        inotify = Inotify()
+    except (OSError, AttributeError):
+        return False
+    inotify.close()
+    return True
+
+
+class Inotify:
+    """Single inotify instance (one fd, many watches)"""
+
+    def __init__(self):
+        self._libc = _load_libc()
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        # Self-pipe so another thread can interrupt a blocking wait
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._poller = select.poll()
+        self._poller.register(self.fd, select.POLLIN)
+        self._poller.register(self._wake_r, select.POLLIN)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: str, mask: int = TAIL_MASK) -> int:
+        """Watch path, returns watch descriptor"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed for {path}: {os.strerror(errno)}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        """Remove watch (ignored if kernel already dropped it)"""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: Optional[float] = None) -> List[Tuple[int, int, int, str]]:
+        """
+        Wait up to timeout seconds for events
+        Returns: list of (wd, mask, cookie, name), empty on timeout
+        """
+        timeout_ms = None if timeout is None else max(0, int(timeout * 1000))
+        ready = self._poller.poll(timeout_ms)
+        if not ready:
+            return []
+
+        if any(fd == self._wake_r for fd, _ in ready):
+            try:
+                os.read(self._wake_r, 512)
+            except BlockingIOError:
+                pass
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', errors='ignore')
+            offset += name_len
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def interrupt(self):
+        """Wake up a thread blocked in read_events"""
+        if self.fd >= 0:
+            try:
+                os.write(self._wake_w, b'x')
+            except OSError:
+                pass
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,140 @@
+"""
+Literal prefilter untuk attack detection rules
+Every rule regex needs at least one of a few literal fragments ('union',
+'<script', '../', '.php', ...) to match. All fragments go into one
+Aho-Corasick automaton (pyahocorasick), so a request is scanned once and
+only the rules whose fragments occur are evaluated as regexes
+"""
+import re
+from typing import Dict, FrozenSet, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    import ahocorasick
+except ImportError:  # optional dependency, regex scan fallback
+    ahocorasick = None
+
+PREFILTER_BACKENDS = ('ahocorasick', 'regex')
+
+
+def available_backend() -> str:
+    return 'ahocorasick' if ahocorasick is not None else 'regex'
+
+
+def _best(options: List[Set[str]]) -> Optional[Set[str]]:
+    """Option dengan shortest literal paling panjang (fewest false hits)"""
+    if not options:
+        return None
+    return max(options, key=lambda option: (min(map(len, option)), -len(option)))
+
+
+def _required(items) -> List[Set[str]]:
+    """
+    Literal sets dari satu parsed sequence: every match contains at least
+    one literal of each set
+    """
+    options = []
+    run = []
+    
+    def end_run():
+        if run:
+            options.append({''.join(run)})
+            run.clear()
+    
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is sre_parse.AT:
+            continue  # zero-width, the run stays contiguous
+        end_run()
+        if op is sre_parse.SUBPATTERN:
+            options.extend(_required(av[-1]))
+        elif op is sre_parse.BRANCH:
+            alternatives = set()
+            for branch in av[1]:
+                best = _best(_required(branch))
+                if best is None:
+                    break
+                alternatives |= best
+            else:
+                options.append(alternatives)
+        elif (op is sre_parse.MAX_REPEAT or op is sre_parse.MIN_REPEAT) and av[0] >= 1:
+            options.extend(_required(av[2]))
+        # Classes, '.', optional parts: nothing required
+    end_run()
+    return options
+
+
+def required_literals(pattern: str, flags: int = 0) -> Optional[FrozenSet[str]]:
+    """
+    Literals yang salah satunya pasti ada di setiap match dari pattern
+    (lowercase untuk re.IGNORECASE), None jika tidak ada
+    """
+    options = _required(sre_parse.parse(pattern, flags))
+    if flags & re.IGNORECASE:
+        # Only ASCII folds to plain lower(); other literals can't be prefiltered
+        options = [
+            {literal.lower() for literal in option}
+            for option in options
+            if all(literal.isascii() for literal in option)
+        ]
+    best = _best(options)
+    return frozenset(best) if best else None
+
+
+class LiteralPrefilter:
+    """One pass over a text -> literal occurrences, tagged with the rule keys that need them"""
+    
+    def __init__(self, literals: Dict[Hashable, Iterable[str]], backend: Optional[str] = None):
+        """
+        literals: rule key -> required literals (lihat required_literals)
+        backend: 'ahocorasick' atau 'regex' (default: ahocorasick jika terinstall)
+        """
+        self.backend = backend or available_backend()
+        if self.backend not in PREFILTER_BACKENDS:
+            raise ValueError(f"Unknown prefilter backend {self.backend!r}, expected one of {PREFILTER_BACKENDS}")
+        
+        keys_by_literal: Dict[str, List[Hashable]] = {}
+        for key, rule_literals in literals.items():
+            for literal in rule_literals:
+                keys_by_literal.setdefault(literal, []).append(key)
+        self.literals = {literal: tuple(keys) for literal, keys in keys_by_literal.items()}
+        
+        if self.backend == 'ahocorasick':
+            if ahocorasick is None:
+                raise RuntimeError("pyahocorasick package required for the ahocorasick prefilter")
+            self._automaton = ahocorasick.Automaton()
+            for literal, keys in self.literals.items():
+                self._automaton.add_word(literal, (len(literal), keys))
+            if self.literals:
+                self._automaton.make_automaton()
+        else:
+            # Every position via a lookahead; longest literal first, so the literal
+            # reported at a position stands for itself and every literal that is its prefix
+            ordered = sorted(self.literals, key=len, reverse=True)
+            self._prefixes = {
+                literal: tuple((len(other), self.literals[other]) for other in ordered if literal.startswith(other))
+                for literal in ordered
+            }
+            self._scanner = re.compile(
+                '(?=(' + '|'.join(map(re.escape, ordered)) + '))'
+            ) if ordered else None
+    
+    def scan(self, text: str) -> Iterator[Tuple[int, int, Tuple[Hashable, ...]]]:
+        """(start, end, rule keys) untuk setiap literal occurrence (overlapping included)"""
+        if self.backend == 'ahocorasick':
+            if not self.literals:
+                return
+            for last, (length, keys) in self._automaton.iter(text):
+                yield last + 1 - length, last + 1, keys
+        elif self._scanner is not None:
+            prefixes = self._prefixes
+            for match in self._scanner.finditer(text):
+                start = match.start()
+                for length, keys in prefixes[match.group(1)]:
+                    yield start, start + length, keys
@@ -0,0 +1,134 @@
+"""
+Log Archives
+Stream-decompress rotated generations (access.log.2.gz, auth.log.3.zst, ...)
+and remember which ones have already been imported
+"""
+import io
+import os
+import re
+import gzip
+import json
+import hashlib
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, only needed for .zst archives
+    zstandard = None
+
+READ_BUFFER = 1024 * 1024
+FINGERPRINT_BYTES = 1024
+
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+ARCHIVE_PATTERN = re.compile(r'\.(\d+)(\.gz|\.zst)?$')
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def is_archive(path: str) -> bool:
+    """Rotated generation (access.log.1, auth.log.2.gz) - content won't change anymore"""
+    return ARCHIVE_PATTERN.search(path) is not None
+
+
+def open_log(path: str, buffer_size: int = READ_BUFFER):
+    """Open plain, gzip or zstd log for binary reading with a large buffer"""
+    if path.endswith('.gz'):
+        return io.BufferedReader(gzip.GzipFile(path, 'rb'), buffer_size)
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard package required to read {path}")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_size=buffer_size, closefd=True)
+        return io.BufferedReader(reader, buffer_size)
+    return open(path, 'rb', buffering=buffer_size)
+
+
+def content_fingerprint(path: str) -> Optional[str]:
+    """
+    Hash of the first (decompressed) line - stays the same when logrotate
+    renames access.log.1 to access.log.2.gz
+    """
+    with open_log(path, FINGERPRINT_BYTES) as f:
+        head = f.read(FINGERPRINT_BYTES)
+    newline = head.find(b'\n')
+    if newline >= 0:
+        head = head[:newline + 1]
+    elif len(head) < FINGERPRINT_BYTES:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+
+def rotated_generations(path: str) -> List[str]:
+    """
+    Rotated files for path, oldest first:
+    access.log.3.gz, access.log.2.gz, access.log.1 (access.log itself excluded)
+    """
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    pattern = re.compile(re.escape(base) + r'\.(\d+)(\.gz|\.zst)?$')
+    
+    generations = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            generations.append((int(match.group(1)), os.path.join(directory, name)))
+    
+    return [full_path for _, full_path in sorted(generations, reverse=True)]
+
+
+class ArchiveLedger:
+    """JSON record of imported archives, keyed by content fingerprint"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._entries = self._load()
+    
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ArchiveLedger] Error loading {self.path}: {e}, starting fresh")
+            return {}
+    
+    def is_done(self, fingerprint: Optional[str]) -> bool:
+        if fingerprint is None:
+            return False
+        with self._lock:
+            return fingerprint in self._entries
+    
+    def mark_done(self, fingerprint: Optional[str], path: str, lines: int = 0):
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._entries[fingerprint] = {
+                'path': path,
+                'lines': lines,
+                'imported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            self._save()
+    
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[ArchiveLedger] Error saving {self.path}: {e}")
@@ -0,0 +1,193 @@
+"""
+Log Multiplexer
+One thread tails every watched file: a single inotify fd (or a polling sweep)
+feeds a round-robin run queue, and each turn reads at most read_quantum bytes
+from one file so a noisy vhost cannot starve the others
+"""
+import os
+import time
+from collections import deque
+from threading import Thread, Event
+from typing import List
+from services.inotify import Inotify, TAIL_MASK, IN_MOVE_SELF, IN_DELETE_SELF, IN_IGNORED
+
+READ_QUANTUM = 64 * 1024
+
+
+class LogMultiplexer:
+    """Event loop over many LogFilePollers"""
+    
+    def __init__(self, pollers: List, watch_mode: str = 'auto', interval: float = 2,
+                 safety_interval: float = 30, read_quantum: int = READ_QUANTUM):
+        """
+        watch_mode: 'auto', 'inotify' or 'poll' (see log_watcher.WATCH_MODES)
+        interval: polling sweep for files without a watch (missing, fallback)
+        safety_interval: re-check watched files for writes inotify didn't report
+        read_quantum: max bytes read from one file per turn
+        """
+        self.pollers = pollers
+        self.watch_mode = watch_mode
+        self.interval = interval
+        self.safety_interval = safety_interval
+        self.read_quantum = read_quantum
+        
+        self._inotify = None
+        self._watches = {}  # wd -> poller
+        self._wd_of = {}  # poller -> wd
+        # auto mode: inotify missed writes for these, they stay on polling
+        self._fallback = set()
+        
+        # Round-robin run queue; a poller is queued at most once
+        self._ready = deque()
+        self._queued = set()
+        # Pollers with lines waiting for their batch deadline
+        self._pending = set()
+        
+        self.running = False
+        self._stop_event = Event()
+        self.thread = None
+    
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self.run, name='log-multiplexer', daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 5):
+        self.running = False
+        self._stop_event.set()
+        if self._inotify:
+            self._inotify.interrupt()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+    
+    def run(self):
+        """Main loop"""
+        if self.watch_mode != 'poll':
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"[LogMux] inotify unavailable ({e}), using polling")
+        
+        mode = 'inotify' if self._inotify else 'poll'
+        print(f"[LogMux] Tailing {len(self.pollers)} files in one thread ({mode})")
+        
+        try:
+            now = time.monotonic()
+            next_poll = now  # first sweep opens every file and catches up
+            next_safety = now + self.safety_interval
+            
+            while self.running:
+                now = time.monotonic()
+                if now >= next_poll:
+                    self._poll_sweep()
+                    next_poll = now + self.interval
+                if self._inotify and now >= next_safety:
+                    self._safety_sweep()
+                    next_safety = now + self.safety_interval
+                
+                self._run_round()
+                self._flush_due()
+                
+                if self._ready:
+                    timeout = 0.0
+                else:
+                    wake_at = min(next_poll, next_safety) if self._inotify else next_poll
+                    timeout = min(wake_at - time.monotonic(), self._batch_deadline())
+                self._wait(max(0.0, timeout))
+        finally:
+            # Don't drop lines still waiting for their batch deadline
+            for poller in self.pollers:
+                poller.flush_batch()
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+    
+    def _schedule(self, poller):
+        if poller not in self._queued:
+            self._queued.add(poller)
+            self._ready.append(poller)
+    
+    def _run_round(self):
+        """One quantum for every poller queued now; those with more data go to the back"""
+        for _ in range(len(self._ready)):
+            poller = self._ready.popleft()
+            self._queued.discard(poller)
+            poller.check_and_process(self.read_quantum)
+            self._after_check(poller)
+    
+    def _after_check(self, poller):
+        if poller.backlog:
+            self._schedule(poller)
+        if poller.batch.lines:
+            self._pending.add(poller)
+    
+    def _flush_due(self):
+        for poller in list(self._pending):
+            if poller.batch.due():
+                poller.flush_batch()
+            if not poller.batch.lines:
+                self._pending.discard(poller)
+    
+    def _batch_deadline(self) -> float:
+        """Seconds until the earliest pending batch must be flushed"""
+        time_left = [poller.batch.time_left() for poller in self._pending if poller.batch.lines]
+        return min(time_left) if time_left else float('inf')
+    
+    def _wait(self, timeout: float):
+        """Block for inotify events (or just the timeout when polling)"""
+        if not self._inotify:
+            self._stop_event.wait(timeout)
+            return
+        
+        for wd, mask, _, _ in self._inotify.read_events(timeout):
+            poller = self._watches.get(wd)
+            if poller is None:
+                continue
+            if mask & (IN_MOVE_SELF | IN_DELETE_SELF | IN_IGNORED):
+                # Rotated away or deleted - the poll sweep re-watches the path
+                self._unwatch(poller, removed=bool(mask & IN_IGNORED))
+            self._schedule(poller)
+    
+    def _watch(self, poller) -> bool:
+        if not os.path.exists(poller.file_path):
+            return False
+        try:
+            wd = self._inotify.add_watch(poller.file_path, TAIL_MASK)
+        except OSError as e:
+            print(f"[LogMux] {poller.name}: Cannot watch {poller.file_path}: {e}")
+            return False
+        self._watches[wd] = poller
+        self._wd_of[poller] = wd
+        return True
+    
+    def _unwatch(self, poller, removed: bool = False):
+        wd = self._wd_of.pop(poller, None)
+        if wd is None:
+            return
+        self._watches.pop(wd, None)
+        if not removed:
+            self._inotify.rm_watch(wd)
+    
+    def _poll_sweep(self):
+        """Check files without a watch; (re-)watch paths that exist again"""
+        for poller in self.pollers:
+            if poller in self._wd_of:
+                continue
+            if self._inotify and poller not in self._fallback:
+                self._watch(poller)
+            # Newly watched: catch up on anything written before the watch existed
+            self._schedule(poller)
+    
+    def _safety_sweep(self):
+        """Bind mounts may not deliver events: look at every watched file once"""
+        # Take events that already arrived first, otherwise they look missed
+        self._wait(0)
+        for poller in list(self._wd_of):
+            if poller in self._queued:
+                continue
+            changed = poller.check_and_process(self.read_quantum)
+            self._after_check(poller)
+            if changed and self.watch_mode == 'auto':
+                print(f"[LogMux] {poller.name}: inotify missed changes, switching to polling")
+                self._unwatch(poller)
+                self._fallback.add(poller)
@@ -1,95 +1,420 @@
 import os
+import re
+import glob
 import time
-from typing import Dict
-from threading import Thread
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+from threading import Lock
 from config.database import SessionLocal
-from parsers.ssh_parser import SSHParser
-from parsers.nginx_parser import NginxAccessParser, NginxErrorParser
+from parsers import create_parser
+from services.backfill import BackfillEngine
+from services.bulk_writer import BulkWriter
+from services.checkpoint import CheckpointStore, file_fingerprint, source_id
+from services.log_archive import ArchiveLedger
+from services.log_multiplexer import LogMultiplexer, READ_QUANTUM
+from services.pipeline import IngestPipeline
+from services.spool import Spool
+
+# Watch modes:
+#   auto    - inotify, permanently falls back to polling if a safety check finds missed writes
+#   inotify - inotify only (still runs the periodic safety check)
+#   poll    - original fixed-interval polling
+WATCH_MODES = ('auto', 'inotify', 'poll')
+
+# Bytes per read() when catching up
+READ_SIZE = 1024 * 1024
+
+
+class LineBatch:
+    """
+    Pending raw lines (bytes, newline stripped) + their byte offsets in the file,
+    closed on size limit or time deadline
+    """
+    
+    def __init__(self, max_size=500, max_delay=0.2):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.lines = []
+        self.offsets = []
+        self.started = None
+    
+    def add(self, line: bytes, offset: int):
+        if not self.lines:
+            self.started = time.monotonic()
+        self.lines.append(line)
+        self.offsets.append(offset)
+    
+    def extend(self, lines: List[bytes], offsets: List[int]):
+        if lines and not self.lines:
+            self.started = time.monotonic()
+        self.lines.extend(lines)
+        self.offsets.extend(offsets)
+    
+    def full(self) -> bool:
+        return len(self.lines) >= self.max_size
+    
+    def time_left(self) -> Optional[float]:
+        """Seconds until deadline, None if batch is empty"""
+        if not self.lines:
+            return None
+        return max(0.0, self.max_delay - (time.monotonic() - self.started))
+    
+    def due(self) -> bool:
+        return bool(self.lines) and (self.full() or self.time_left() == 0.0)
+    
+    def drain(self) -> Tuple[List[bytes], List[int]]:
+        lines, offsets = self.lines, self.offsets
+        self.lines = []
+        self.offsets = []
+        self.started = None
+        return lines, offsets
+
 
 class LogFilePoller:
-    """Poller for log files - works with Docker mounted files"""
+    """
+    Poller for one log file - works with Docker mounted files
+    LogMultiplexer decides when to call check_and_process (inotify or polling)
+    """
     
-    def __init__(self, parser, file_path, name):
+    def __init__(self, parser, file_path, name,
+                 batch_size=500, batch_delay=0.2, bulk_writer=None, checkpoint_store=None,
+                 archive_ledger=None, pipeline=None):
         self.parser = parser
         self.file_path = file_path
         self.name = name
         self.file_position = 0
-        self.running = False
+        # True when check_and_process stopped at max_bytes with data left
+        self.backlog = False
+        # Lines are written N per transaction
+        self.batch = LineBatch(batch_size, batch_delay)
+        self.bulk_writer = bulk_writer
+        self.checkpoint_store = checkpoint_store
+        # Rotated files drained here are recorded so an archive import skips them
+        self.archive_ledger = archive_ledger
+        # IngestPipeline: batches are parsed/detected/written by its stages,
+        # None = write inline from this thread
+        self.pipeline = pipeline
+        # Checkpoints of submitted batches, saved in order as writes complete
+        self._ack_lock = Lock()
+        self._next_seq = 0
+        self._acked_seq = 0
+        self._written = {}
+        # First batch that was dropped: the checkpoint never moves past it,
+        # so a restart re-reads those lines (already written rows are skipped)
+        self._failed_seq = None
         
-        # Initialize position to end of file
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    f.seek(0, 2)
-                    self.file_position = f.tell()
-                    print(f"[LogPoller] Initialized {name}: {file_path} at position {self.file_position}")
-            except Exception as e:
-                print(f"[LogPoller] Error initializing {name}: {e}")
-        else:
+        # File stays open so a rotated (renamed) file can still be drained
+        self._file = None
+        self._file_id = None  # (device, inode)
+        self._fingerprint = None
+        
+        # A file that exists at startup resumes from its checkpoint (or EOF);
+        # one that shows up later is new and is read from the start
+        self._resume = os.path.exists(file_path)
+        if not self._resume:
             print(f"[LogPoller] File not found: {file_path}")
     
-    def check_and_process(self):
-        """Check file for new content and process"""
-        if not os.path.exists(self.file_path):
-            return
+    def check_and_process(self, max_bytes: Optional[int] = None) -> bool:
+        """
+        Check file for new content and process
+        max_bytes: read at most this much now, self.backlog tells if more is waiting
+        Returns: True jika file berubah (grew, truncated or rotated)
+        """
+        changed = False
+        self.backlog = False
         
         try:
-            with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Get current size
-                f.seek(0, 2)
-                current_size = f.tell()
-                
-                # Check if file grew
-                if current_size > self.file_position:
-                    # Read new content
-                    f.seek(self.file_position)
-                    new_lines = f.readlines()
-                    
-                    if new_lines:
-                        print(f"[LogPoller] {self.name}: Found {len(new_lines)} new lines")
-                        
-                        db = SessionLocal()
-                        try:
-                            success_count = 0
-                            for line in new_lines:
-                                if line.strip():
-                                    if self.parser.process_log_line(line, db):
-                                        success_count += 1
-                            
-                            if success_count > 0:
-                                print(f"[LogPoller] {self.name}: Processed {success_count}/{len(new_lines)} lines")
-                        finally:
-                            db.close()
-                    
-                    # Update position
-                    self.file_position = current_size
-                
-                elif current_size < self.file_position:
-                    # File was truncated/rotated
-                    print(f"[LogPoller] {self.name}: File truncated, resetting position")
-                    self.file_position = 0
-                    
+            if self._file is None:
+                self._open_file()
+            if self._file is not None:
+                changed = self._read_new_lines(max_bytes)
         except Exception as e:
             print(f"[LogPoller] Error processing {self.file_path}: {e}")
+        
+        if self.batch.due():
+            self.flush_batch()
+        
+        return changed
     
-    def poll_loop(self, interval=2):
-        """Main polling loop"""
-        print(f"[LogPoller] Starting poll loop for {self.name} (interval: {interval}s)")
-        self.running = True
+    def _open_file(self):
+        """Open file_path, starting from the checkpoint / EOF (startup) or offset 0"""
+        try:
+            f = open(self.file_path, 'rb')
+        except FileNotFoundError:
+            return
         
-        while self.running:
-            self.check_and_process()
-            time.sleep(interval)
+        st = os.fstat(f.fileno())
+        self._file = f
+        self._file_id = (st.st_dev, st.st_ino)
+        self._fingerprint = file_fingerprint(f.fileno())
+        self.file_position = 0
+        
+        if not self._resume:
+            return
+        self._resume = False
+        
+        checkpoint = self.checkpoint_store.get(self.name) if self.checkpoint_store else None
+        if checkpoint is None:
+            # No history: only follow new lines (process_existing_logs covers the backlog)
+            self.file_position = st.st_size
+            print(f"[LogPoller] Initialized {self.name}: {self.file_path} at position {self.file_position}")
+            self.save_checkpoint()
+            return
+        
+        if (checkpoint['device'], checkpoint['inode']) == self._file_id:
+            same_content = checkpoint['fingerprint'] in (None, self._fingerprint)
+            if same_content and checkpoint['offset'] <= st.st_size:
+                self.file_position = checkpoint['offset']
+                print(f"[LogPoller] {self.name}: Resuming from checkpoint at position {self.file_position}")
+            else:
+                print(f"[LogPoller] {self.name}: File replaced since checkpoint, reading from start")
+            return
+        
+        # Rotated while we were down: finish the old generation first
+        rotated_path = self._find_rotated(checkpoint)
+        if rotated_path:
+            print(f"[LogPoller] {self.name}: Draining rotated file {rotated_path} from {checkpoint['offset']}")
+            self._drain_rotated(rotated_path, checkpoint['offset'])
+        else:
+            print(f"[LogPoller] {self.name}: Rotated since checkpoint (old file gone), reading from start")
     
-    def stop(self):
-        """Stop polling"""
-        self.running = False
+    def _find_rotated(self, checkpoint) -> Optional[str]:
+        """Find the renamed file (e.g. access.log.1) still holding the checkpointed inode"""
+        directory = os.path.dirname(self.file_path) or '.'
+        base = os.path.basename(self.file_path)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return None
+        
+        for entry in entries:
+            if not entry.name.startswith(base) or entry.name == base:
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) == (checkpoint['device'], checkpoint['inode']):
+                return entry.path
+        return None
+    
+    def _drain_rotated(self, rotated_path: str, offset: int):
+        """Ingest the tail of a rotated file, then continue with the current one"""
+        current = (self._file, self._file_id, self._fingerprint)
+        try:
+            with open(rotated_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                # Checkpoints taken while draining point at the rotated inode
+                self._file = f
+                self._file_id = (st.st_dev, st.st_ino)
+                self._fingerprint = file_fingerprint(f.fileno())
+                self.file_position = offset
+                self._read_lines(final=True)
+                self.flush_batch()
+                self._mark_archived(rotated_path)
+        finally:
+            self._file, self._file_id, self._fingerprint = current
+            self.file_position = 0
+    
+    def _mark_archived(self, path: str):
+        """Remember the fully drained generation (matched later by content fingerprint)"""
+        if self.archive_ledger is not None:
+            self.archive_ledger.mark_done(self._fingerprint, path)
+    
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._file_id = None
+        self._fingerprint = None
+    
+    def _read_new_lines(self, max_bytes: Optional[int] = None) -> bool:
+        changed = False
+        fd = self._file.fileno()
+        size = os.fstat(fd).st_size
+        
+        if self._fingerprint is None:
+            self._fingerprint = file_fingerprint(fd)
+        
+        if size < self.file_position or (
+            self.file_position and self._fingerprint != file_fingerprint(fd)
+        ):
+            # Truncated in place (copytruncate), possibly already refilled
+            print(f"[LogPoller] {self.name}: File truncated, resetting position")
+            self.file_position = 0
+            self._fingerprint = file_fingerprint(fd)
+            changed = True
+        
+        if size > self.file_position:
+            self._read_lines(max_bytes)
+            changed = True
+            if self.backlog:
+                # Rotation is handled once the current file is caught up
+                return changed
+        
+        try:
+            st = os.stat(self.file_path)
+            path_id = (st.st_dev, st.st_ino)
+        except FileNotFoundError:
+            # Renamed away and not recreated yet - keep draining the old file
+            path_id = self._file_id
+        
+        if path_id != self._file_id:
+            # Rotated: drain the old file (including an unterminated last line)
+            # and commit it before switching
+            print(f"[LogPoller] {self.name}: File rotated, switching to new file")
+            self._read_lines(final=True)
+            self.flush_batch()
+            self._mark_archived(f"{self.file_path} (rotated)")
+            self._close_file()
+            self._open_file()
+            if self._file is not None:
+                self._read_lines(max_bytes)
+            changed = True
+        
+        return changed
+    
+    def _read_lines(self, max_bytes: Optional[int] = None, final: bool = False):
+        """
+        Read complete lines after file_position into the batch (raw bytes, large reads)
+        A partial last line stays unread until its newline arrives, unless final
+        (the writer moved on to a new file)
+        max_bytes: stop after about this much, sets self.backlog
+        """
+        fd = self._file.fileno()
+        start = self.file_position
+        read_size = READ_SIZE if max_bytes is None else min(READ_SIZE, max_bytes)
+        new_lines = 0
+        carry = b''
+        
+        while True:
+            chunk = os.pread(fd, read_size, self.file_position + len(carry))
+            if not chunk:
+                if final and carry:
+                    self.batch.add(carry, self.file_position)
+                    self.file_position += len(carry)
+                    new_lines += 1
+                break
+            
+            data = carry + chunk if carry else chunk
+            end = data.rfind(b'\n') + 1
+            if not end:
+                # Line longer than one read
+                carry = data
+                continue
+            
+            carry = data[end:]
+            new_lines += self._add_lines(data[:end - 1].split(b'\n'))
+            if max_bytes is not None and self.file_position - start >= max_bytes:
+                self.backlog = True
+                break
+        
+        if new_lines:
+            print(f"[LogPoller] {self.name}: Found {new_lines} new lines")
+    
+    def _add_lines(self, raw_lines: List[bytes]) -> int:
+        """Add newline-terminated lines to the batch; file_position stays exact at every flush"""
+        added = 0
+        while added < len(raw_lines):
+            take = raw_lines[added:added + self.batch.max_size - len(self.batch.lines)]
+            # + 1 per line for the newline split() removed
+            offsets = list(accumulate([len(line) + 1 for line in take], initial=self.file_position))
+            self.batch.extend(take, offsets[:-1])
+            self.file_position = offsets[-1]
+            added += len(take)
+            if self.batch.full():
+                self.flush_batch()
+        return added
+    
+    def flush_batch(self) -> int:
+        """Write pending lines in a single transaction, then checkpoint"""
+        raw_lines, offsets = self.batch.drain()
+        if not raw_lines:
+            return 0
+        # One decode per batch instead of one per line
+        lines = b'\n'.join(raw_lines).decode('utf-8', errors='ignore').split('\n')
+        # Where each line was read from: lines already saved are skipped on re-read
+        if self._fingerprint is None:
+            self._fingerprint = file_fingerprint(self._file.fileno())
+        keys = (source_id(self.name, self._fingerprint), self._file_id[1], offsets)
+        
+        if self.pipeline is not None:
+            self._submit(lines, keys)
+            return 0
+        
+        db = SessionLocal()
+        try:
+            success_count = self.parser.process_batch(lines, db, self.bulk_writer, keys=keys)
+        except Exception as e:
+            print(f"[LogPoller] {self.name}: Error writing batch: {e}")
+            success_count = 0
+        finally:
+            db.close()
+        
+        if success_count > 0:
+            print(f"[LogPoller] {self.name}: Processed {success_count}/{len(lines)} lines")
+        
+        # Everything read so far has now been handed to the database
+        self.save_checkpoint()
+        return success_count
+    
+    def _submit(self, lines: List[str], keys: Tuple[str, int, List[int]]):
+        """Hand lines to the pipeline (blocks while it is full - backpressure)"""
+        with self._ack_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        position = (self._file_id, self.file_position, self._fingerprint)
+        self.pipeline.submit(
+            self.name, self.parser, lines, keys=keys,
+            on_done=lambda batch: self._on_written(seq, position, batch)
+        )
+    
+    def _on_written(self, seq: int, position, batch):
+        """
+        Called from a write worker. Batches may finish out of order (several
+        workers), the checkpoint only advances past contiguously written batches
+        and stops before a failed one
+        """
+        if batch.saved > 0:
+            print(f"[LogPoller] {self.name}: Processed {batch.saved}/{len(batch.lines)} lines")
+        
+        with self._ack_lock:
+            if batch.failed and (self._failed_seq is None or seq < self._failed_seq):
+                self._failed_seq = seq
+                print(f"[LogPoller] {self.name}: Batch of {len(batch.lines)} lines failed, "
+                      f"checkpoint held until restart")
+            self._written[seq] = position
+            latest = None
+            while self._acked_seq in self._written:
+                written = self._written.pop(self._acked_seq)
+                if self._failed_seq is None or self._acked_seq < self._failed_seq:
+                    latest = written
+                self._acked_seq += 1
+            if latest is not None:
+                self.save_checkpoint(*latest)
+    
+    def save_checkpoint(self, file_id=None, offset=None, fingerprint=None):
+        """Persist a position (default: what has been read so far)"""
+        if file_id is None:
+            file_id, offset, fingerprint = self._file_id, self.file_position, self._fingerprint
+        if self.checkpoint_store is None or file_id is None:
+            return
+        self.checkpoint_store.update(
+            self.name,
+            path=self.file_path,
+            device=file_id[0],
+            inode=file_id[1],
+            offset=offset,
+            fingerprint=fingerprint
+        )
 
 
 class LogWatcherService:
     """Service to poll multiple log files"""
     
-    def __init__(self, log_configs: Dict[str, Dict], poll_interval=2):
+    def __init__(self, log_configs: Dict[str, Dict], poll_interval=2, watch_mode='auto',
+                 batch_size=500, batch_delay=0.2, write_mode='auto', checkpoint_path=None,
+                 backfill=None, archive_ledger=None, pipeline=None, read_quantum=READ_QUANTUM):
         """
         log_configs format:
         {
@@ -97,17 +422,46 @@ class LogWatcherService:
             'nginx_access': {'path': '/logs/nginx/access.log', 'parser': NginxAccessParser()},
         }
         poll_interval: seconds between checks (default 2)
+        watch_mode: 'auto', 'inotify' or 'poll' (see WATCH_MODES)
+        batch_size / batch_delay: lines per transaction and max seconds a line waits for its batch
+        write_mode: 'auto', 'copy' or 'orm' (see services.bulk_writer)
+        checkpoint_path: JSON file untuk per-source checkpoints (None = always start at EOF)
+        backfill: BackfillEngine untuk process_existing_logs (default: last 100 lines)
+        archive_ledger: ArchiveLedger shared by backfill and pollers (rotated files)
+        pipeline: IngestPipeline for parse/detect/write stages (default: 1 worker each)
+        read_quantum: max bytes read from one file before the next file gets a turn
         """
+        if watch_mode not in WATCH_MODES:
+            raise ValueError(f"Unknown watch mode: {watch_mode}")
+        
         self.log_configs = log_configs
         self.poll_interval = poll_interval
+        self.watch_mode = watch_mode
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.bulk_writer = BulkWriter(write_mode)
+        self.checkpoint_store = CheckpointStore(checkpoint_path) if checkpoint_path else None
+        self.backfill = backfill or BackfillEngine('tail', tail_count=100, batch_size=batch_size)
+        self.backfill.bulk_writer = self.bulk_writer
+        self.archive_ledger = archive_ledger
+        self.pipeline = pipeline or IngestPipeline()
+        self.pipeline.bulk_writer = self.bulk_writer
+        if self.pipeline.spool is not None:
+            # Spooled rows are replayed through the parser of their source
+            self.pipeline.spool.parsers.update(
+                {name: config['parser'] for name, config in log_configs.items()}
+            )
+        self.read_quantum = read_quantum
         self.pollers = []
-        self.threads = []
+        self.multiplexer = None
     
     def start(self):
         """Start polling all log files"""
-        print("[LogWatcher] Starting log monitoring (POLLING MODE)...")
+        print(f"[LogWatcher] Starting log monitoring (mode: {self.watch_mode})...")
         print(f"[LogWatcher] Poll interval: {self.poll_interval}s")
         
+        self.pipeline.start()
+        
         for name, config in self.log_configs.items():
             log_path = config['path']
             parser = config['parser']
@@ -116,36 +470,48 @@ class LogWatcherService:
                 print(f"[LogWatcher] Warning: {log_path} not found, will retry...")
             
             # Create poller
-            poller = LogFilePoller(parser, log_path, name)
-            self.pollers.append(poller)
-            
-            # Start polling thread
-            thread = Thread(
-                target=poller.poll_loop,
-                args=(self.poll_interval,),
-                daemon=True
+            poller = LogFilePoller(
+                parser, log_path, name,
+                batch_size=self.batch_size,
+                batch_delay=self.batch_delay,
+                bulk_writer=self.bulk_writer,
+                checkpoint_store=self.checkpoint_store,
+                archive_ledger=self.archive_ledger,
+                pipeline=self.pipeline
             )
-            thread.start()
-            self.threads.append(thread)
+            self.pollers.append(poller)
             
-            print(f"[LogWatcher] ✓ Polling {name}: {log_path}")
+            print(f"[LogWatcher] ✓ Watching {name}: {log_path}")
+        
+        # One thread multiplexes all files (no thread per file)
+        self.multiplexer = LogMultiplexer(
+            self.pollers,
+            watch_mode=self.watch_mode,
+            interval=self.poll_interval,
+            read_quantum=self.read_quantum
+        )
+        self.multiplexer.start()
         
         print(f"[LogWatcher] Monitoring {len(self.pollers)} log files")
     
     def stop(self):
         """Stop all pollers"""
         print("[LogWatcher] Stopping log monitoring...")
-        for poller in self.pollers:
-            poller.stop()
+        if self.multiplexer:
+            self.multiplexer.stop()
         
-        # Wait for threads to finish
-        for thread in self.threads:
-            thread.join(timeout=5)
+        # Pollers flushed their last batches, write out everything still queued
+        self.pipeline.stop()
+        self.pipeline.print_metrics()
         
         print("[LogWatcher] Stopped")
     
     def process_existing_logs(self):
         """Process existing logs on startup"""
+        if self.backfill.mode == 'off':
+            print("[LogWatcher] Backfill disabled, skipping existing logs")
+            return
+        
         print("[LogWatcher] Processing existing logs...")
         
         for name, config in self.log_configs.items():
@@ -155,55 +521,155 @@ class LogWatcherService:
             if not os.path.exists(log_path):
                 continue
             
-            print(f"[LogWatcher] Processing existing: {name}")
+            if self.checkpoint_store and self.checkpoint_store.get(name):
+                # The poller resumes from its checkpoint, re-reading would duplicate rows
+                print(f"[LogWatcher] Skipping existing: {name} (checkpoint found)")
+                continue
+            
+            print(f"[LogWatcher] Processing existing: {name} ({self.backfill.mode} mode)")
             
-            db = SessionLocal()
             try:
-                with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    # Read last 100 lines for initial data
-                    lines = f.readlines()
-                    recent_lines = lines[-100:] if len(lines) > 100 else lines
-                    
-                    success_count = 0
-                    for line in recent_lines:
-                        if line.strip():
-                            if parser.process_log_line(line, db):
-                                success_count += 1
-                    
-                    print(f"[LogWatcher] ✓ Processed {success_count} existing lines from {name}")
+                for stats in self.backfill.run_archives(name, log_path, parser):
+                    print(f"[LogWatcher] ✓ Processed {stats['saved']} archived lines from {stats['name']}")
                 
+                st = os.stat(log_path)
+                stats = self.backfill.run(name, log_path, parser)
+                suffix = "" if stats['complete'] else " (stopped at limit)"
+                print(f"[LogWatcher] ✓ Processed {stats['saved']} existing lines from {name}{suffix}")
+                
+                if self.checkpoint_store and self.backfill.mode == 'full' and stats['complete']:
+                    # Hand over to the poller exactly where the backfill stopped: after the
+                    # last newline, a line still being written is left to the poller
+                    with open(log_path, 'rb') as f:
+                        fingerprint = file_fingerprint(f.fileno())
+                    self.checkpoint_store.update(
+                        name, path=log_path, device=st.st_dev, inode=st.st_ino,
+                        offset=stats['bytes'], fingerprint=fingerprint
+                    )
             except Exception as e:
                 print(f"[LogWatcher] Error processing existing logs: {e}")
-            finally:
-                db.close()
 
 
-def create_log_watcher():
-    """Factory function to create log watcher with polling"""
+def source_log_format(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    nginx log_format untuk satu source dari <SOURCE>_LOG_FORMAT, e.g.
+    NGINX_TEST_ACCESS_LOG_FORMAT or NGINX_VHOST_SHOP_ACCESS_LOG_LOG_FORMAT
+    for nginx_vhost:shop.access.log (non-alphanumerics -> '_'), atau default
+    """
+    return os.getenv(re.sub(r'[^A-Z0-9]+', '_', name.upper()) + '_LOG_FORMAT') or default
+
+
+def log_sources() -> Dict[str, Dict]:
+    """
+    Watched log files dari environment: source name -> {'path', 'type', 'log_format'}
+    The source name is part of every row key, cli.py backfill uses the same
+    names so importing a watched file adds nothing the watcher already saved
+    """
     log_base = os.getenv('LOG_PATH', '/logs')
     
-    log_configs = {
+    # nginx log_format per source (named format or format string, None = combined;
+    # escape=json formats are read as JSON lines): <SOURCE>_LOG_FORMAT, else the
+    # shared default (NGINX_ACCESS_LOG_FORMAT, vhosts: NGINX_VHOST_LOG_FORMAT)
+    access_format = os.getenv('NGINX_ACCESS_LOG_FORMAT') or None
+    vhost_format = os.getenv('NGINX_VHOST_LOG_FORMAT') or access_format
+    
+    sources = {
         'ssh': {
             'path': os.path.join(log_base, 'ssh', 'auth.log'),
-            'parser': SSHParser()
+            'type': 'ssh',
+            'log_format': None
         },
         'nginx_access': {
             'path': os.path.join(log_base, 'nginx', 'access.log'),
-            'parser': NginxAccessParser()
+            'type': 'nginx_access',
+            'log_format': access_format
         },
         'nginx_test_access': {
             'path': os.path.join(log_base, 'nginx', 'test-access.log'),
-            'parser': NginxAccessParser()
+            'type': 'nginx_access',
+            'log_format': source_log_format('nginx_test_access', access_format)
         },
         'nginx_error': {
             'path': os.path.join(log_base, 'nginx', 'error.log'),
-            'parser': NginxErrorParser()
+            'type': 'nginx_error',
+            'log_format': None
         },
         'nginx_test_error': {
             'path': os.path.join(log_base, 'nginx', 'test-error.log'),
-            'parser': NginxErrorParser()
+            'type': 'nginx_error',
+            'log_format': None
         }
     }
     
-    # Use 2 second polling interval (good balance between latency and CPU usage)
-    return LogWatcherService(log_configs, poll_interval=2)
\ No newline at end of file
+    # Per-vhost access logs, e.g. /logs/nginx/vhosts/*.access.log
+    vhost_glob = os.getenv('NGINX_VHOST_LOGS')
+    if vhost_glob:
+        for path in sorted(glob.glob(vhost_glob)):
+            name = f"nginx_vhost:{os.path.basename(path)}"
+            sources[name] = {
+                'path': path,
+                'type': 'nginx_access',
+                'log_format': source_log_format(name, vhost_format)
+            }
+    
+    return sources
+
+
+def create_log_watcher():
+    """Factory function to create log watcher"""
+    watch_mode = os.getenv('LOG_WATCH_MODE', 'auto')
+    batch_size = int(os.getenv('LOG_BATCH_SIZE', '500'))
+    batch_delay = float(os.getenv('LOG_BATCH_DELAY', '0.2'))
+    write_mode = os.getenv('LOG_WRITE_MODE', 'auto')
+    state_dir = os.getenv('STATE_DIR', 'state')
+    
+    archive_ledger = ArchiveLedger(os.path.join(state_dir, 'archives.json'))
+    
+    max_lines = os.getenv('BACKFILL_MAX_LINES')
+    max_seconds = os.getenv('BACKFILL_MAX_SECONDS')
+    backfill = BackfillEngine(
+        mode=os.getenv('BACKFILL_MODE', 'tail'),
+        tail_count=int(os.getenv('BACKFILL_LINES', '100')),
+        max_lines=int(max_lines) if max_lines else None,
+        max_seconds=float(max_seconds) if max_seconds else None,
+        batch_size=batch_size,
+        ledger=archive_ledger
+    )
+    
+    spool_max_mb = int(os.getenv('SPOOL_MAX_MB', '1024'))
+    spool = Spool(os.path.join(state_dir, 'spool'), max_bytes=spool_max_mb * 1024 * 1024) if spool_max_mb else None
+    
+    pipeline = IngestPipeline(
+        parse_workers=int(os.getenv('PIPELINE_PARSE_WORKERS', '1')),
+        detect_workers=int(os.getenv('PIPELINE_DETECT_WORKERS', '1')),
+        write_workers=int(os.getenv('PIPELINE_WRITE_WORKERS', '1')),
+        queue_size=int(os.getenv('PIPELINE_QUEUE_SIZE', '8')),
+        stats_interval=float(os.getenv('PIPELINE_STATS_INTERVAL', '60')),
+        spool=spool
+    )
+    
+    # Parsers keep no per-file state, one instance per (type, log_format) serves
+    # every source (e.g. hundreds of vhosts)
+    parsers = {}
+    log_configs = {}
+    for name, source in log_sources().items():
+        key = (source['type'], source['log_format'])
+        if key not in parsers:
+            parsers[key] = create_parser(*key)
+        log_configs[name] = {'path': source['path'], 'parser': parsers[key]}
+    
+    # inotify when available; 2 second polling is the fallback (and the interval
+    # used to retry files that don't exist yet)
+    return LogWatcherService(
+        log_configs,
+        poll_interval=2,
+        watch_mode=watch_mode,
+        batch_size=batch_size,
+        batch_delay=batch_delay,
+        write_mode=write_mode,
+        checkpoint_path=os.path.join(state_dir, 'checkpoints.json'),
+        backfill=backfill,
+        archive_ledger=archive_ledger,
+        pipeline=pipeline,
+        read_quantum=int(os.getenv('LOG_READ_QUANTUM', str(READ_QUANTUM)))
+    )
\ No newline at end of file
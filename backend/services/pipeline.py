@@ -0,0 +1,280 @@
+"""
+Ingestion Pipeline
+read -> parse -> detect -> write stages connected by bounded queues,
+so a slow database stalls the readers instead of growing memory
+"""
+import time
+from queue import Queue
+from threading import Thread, Lock
+from typing import Callable, Dict, List, Optional, Tuple
+from config.database import SessionLocal, DB_UNAVAILABLE_ERRORS
+
+STAGES = ('parse', 'detect', 'write')
+
+# Worker shutdown marker
+_STOP = object()
+
+
+class PipelineBatch:
+    """Lines of one source moving through the stages"""
+    
+    __slots__ = ('source', 'parser', 'lines', 'keys', 'columns', 'saved', 'failed', 'on_done', 'enqueued')
+    
+    def __init__(self, source: str, parser, lines: List[str], on_done: Optional[Callable] = None,
+                 keys: Optional[Tuple] = None):
+        self.source = source
+        self.parser = parser
+        self.lines = lines
+        # (source_id, inode, offsets) - see BaseParser.parse_lines
+        self.keys = keys
+        # parsers.columns.ColumnBatch, set by the parse stage
+        self.columns = None
+        self.saved = 0
+        # A stage raised: the lines were dropped, not written
+        self.failed = False
+        # Called with the batch once it is written (or dropped on error)
+        self.on_done = on_done
+        self.enqueued = 0.0
+    
+    def done(self):
+        if self.on_done is not None:
+            self.on_done(self)
+
+
+class StageMetrics:
+    """Counters untuk satu stage: queue depth, wait (in queue) dan service time"""
+    
+    def __init__(self, name: str, queue: Queue, workers: int):
+        self.name = name
+        self.queue = queue
+        self.workers = workers
+        self._lock = Lock()
+        self.batches = 0
+        self.lines = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_total = 0.0
+        self.service_max = 0.0
+    
+    def enqueued(self):
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+    
+    def record(self, lines: int, wait: float, service: float, error: bool = False):
+        with self._lock:
+            self.batches += 1
+            self.lines += lines
+            self.errors += error
+            self.wait_total += wait
+            self.service_total += service
+            self.wait_max = max(self.wait_max, wait)
+            self.service_max = max(self.service_max, service)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            batches = self.batches or 1
+            return {
+                'workers': self.workers,
+                'depth': self.queue.qsize(),
+                'capacity': self.queue.maxsize,
+                'max_depth': self.max_depth,
+                'batches': self.batches,
+                'lines': self.lines,
+                'errors': self.errors,
+                'avg_wait_ms': 1000.0 * self.wait_total / batches,
+                'max_wait_ms': 1000.0 * self.wait_max,
+                'avg_service_ms': 1000.0 * self.service_total / batches,
+                'max_service_ms': 1000.0 * self.service_max,
+            }
+
+
+class Stage:
+    """Bounded input queue + N worker threads running handler(batch)"""
+    
+    def __init__(self, name: str, handler: Callable[[PipelineBatch], None], workers: int = 1,
+                 queue_size: int = 8, next_stage: Optional['Stage'] = None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = Queue(maxsize=queue_size)
+        self.next_stage = next_stage
+        self.metrics = StageMetrics(name, self.queue, self.workers)
+        self.threads = []
+    
+    def start(self):
+        for i in range(self.workers):
+            thread = Thread(target=self._work, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def put(self, batch: PipelineBatch, timeout: Optional[float] = None):
+        """Blocks while the queue is full - this is the backpressure"""
+        batch.enqueued = time.monotonic()
+        self.queue.put(batch, timeout=timeout)
+        self.metrics.enqueued()
+    
+    def _work(self):
+        while True:
+            batch = self.queue.get()
+            if batch is _STOP:
+                break
+            
+            started = time.monotonic()
+            error = False
+            try:
+                self.handler(batch)
+            except Exception as e:
+                print(f"[Pipeline] {self.name}: Error processing batch from {batch.source}: {e}")
+                error = True
+                batch.failed = True
+            self.metrics.record(len(batch.lines), started - batch.enqueued,
+                                time.monotonic() - started, error)
+            
+            if error or self.next_stage is None:
+                batch.done()
+            else:
+                self.next_stage.put(batch)
+    
+    def stop(self):
+        """Let workers finish what is queued, then exit"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+class IngestPipeline:
+    """
+    Readers submit line batches; parse, detect and write run in their own
+    worker threads. Memory is bounded by (queue_size + workers) batches per stage
+    """
+    
+    def __init__(self, parse_workers: int = 1, detect_workers: int = 1, write_workers: int = 1,
+                 queue_size: int = 8, bulk_writer=None, stats_interval: float = 0, spool=None):
+        """
+        *_workers: threads per stage
+        queue_size: batches waiting in front of each stage
+        stats_interval: print metrics every N seconds (0 = off)
+        spool: Spool untuk batches yang tidak bisa ditulis (database down)
+        """
+        self.bulk_writer = bulk_writer
+        self.stats_interval = stats_interval
+        self.spool = spool
+        
+        self.write_stage = Stage('write', self._write, write_workers, queue_size)
+        self.detect_stage = Stage('detect', self._detect, detect_workers, queue_size, self.write_stage)
+        self.parse_stage = Stage('parse', self._parse, parse_workers, queue_size, self.detect_stage)
+        self.stages = [self.parse_stage, self.detect_stage, self.write_stage]
+        
+        # Read side: how long readers were held back by a full parse queue
+        self._read_lock = Lock()
+        self.read_batches = 0
+        self.read_lines = 0
+        self.read_blocked = 0.0
+        
+        self.running = False
+        self._reporter = None
+    
+    def start(self):
+        self.running = True
+        if self.spool is not None:
+            self.spool.bulk_writer = self.bulk_writer
+            self.spool.start()
+        # Downstream first so nothing is queued without a consumer
+        for stage in reversed(self.stages):
+            stage.start()
+        if self.stats_interval > 0:
+            self._reporter = Thread(target=self._report_loop, daemon=True)
+            self._reporter.start()
+    
+    def submit(self, source: str, parser, lines: List[str],
+               on_done: Optional[Callable[[PipelineBatch], None]] = None,
+               keys: Optional[Tuple] = None) -> PipelineBatch:
+        """Queue lines for parse -> detect -> write (blocks while the pipeline is full)"""
+        batch = PipelineBatch(source, parser, lines, on_done, keys)
+        
+        started = time.monotonic()
+        self.parse_stage.put(batch)
+        blocked = time.monotonic() - started
+        
+        with self._read_lock:
+            self.read_batches += 1
+            self.read_lines += len(lines)
+            self.read_blocked += blocked
+        return batch
+    
+    def stop(self):
+        """Drain every stage in order, then stop the workers"""
+        self.running = False
+        for stage in self.stages:
+            stage.stop()
+        if self.spool is not None:
+            self.spool.stop()
+    
+    def _parse(self, batch: PipelineBatch):
+        batch.columns = batch.parser.parse_batch(batch.lines, detect=False, keys=batch.keys)
+    
+    def _detect(self, batch: PipelineBatch):
+        batch.columns = batch.parser.detect_batch(batch.columns)
+    
+    def _write(self, batch: PipelineBatch):
+        if not batch.columns:
+            return
+        if self.spool is not None and self.spool.has_backlog():
+            # Stay behind rows already spooled; the replay thread writes them in order
+            self.spool.append(batch.source, batch.parser, batch.columns.to_parsed())
+            return
+        
+        db = SessionLocal()
+        try:
+            batch.saved = batch.parser.save_columns(batch.columns, db, self.bulk_writer)
+        except DB_UNAVAILABLE_ERRORS as e:
+            if self.spool is None:
+                raise
+            print(f"[Pipeline] write: Database unavailable ({e.__class__.__name__}), "
+                  f"spooling {len(batch.columns)} rows from {batch.source}")
+            self.spool.append(batch.source, batch.parser, batch.columns.to_parsed())
+        finally:
+            db.close()
+    
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-stage queue depth, throughput dan latency"""
+        with self._read_lock:
+            metrics = {
+                'read': {
+                    'batches': self.read_batches,
+                    'lines': self.read_lines,
+                    'blocked_ms': 1000.0 * self.read_blocked,
+                }
+            }
+        for stage in self.stages:
+            metrics[stage.name] = stage.metrics.snapshot()
+        if self.spool is not None:
+            metrics['spool'] = self.spool.stats()
+        return metrics
+    
+    def print_metrics(self):
+        metrics = self.metrics()
+        read = metrics['read']
+        print(f"[Pipeline] read: {read['lines']} lines, blocked {read['blocked_ms']:.0f}ms")
+        for name in STAGES:
+            stage = metrics[name]
+            print(
+                f"[Pipeline] {name}: depth {stage['depth']}/{stage['capacity']} "
+                f"(max {stage['max_depth']}), {stage['lines']} lines, "
+                f"wait {stage['avg_wait_ms']:.1f}ms avg, service {stage['avg_service_ms']:.1f}ms avg"
+            )
+        if 'spool' in metrics:
+            spool = metrics['spool']
+            print(f"[Pipeline] spool: {spool['backlog_rows']} rows / {spool['backlog_bytes'] / 1048576:.1f} MB "
+                  f"backlog, {spool['disk_bytes'] / 1048576:.1f}/{spool['max_bytes'] / 1048576:.0f} MB on disk")
+    
+    def _report_loop(self):
+        while self.running:
+            time.sleep(self.stats_interval)
+            if self.running:
+                self.print_metrics()
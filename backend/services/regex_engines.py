@@ -0,0 +1,54 @@
+"""
+Regex engines untuk attack detection rules
+Python's re backtracks: rules like (\\bselect\\b.*\\bfrom\\b.*\\bwhere\\b) go
+polynomial on crafted input (seconds for an 8KB URL). RE2 (google-re2) matches
+in linear time; patterns it doesn't support (lookarounds, backreferences) stay on re.
+Note: RE2's \\b, \\d and \\s are ASCII-only, so non-ASCII text can match differently
+"""
+import re
+from typing import Optional
+
+try:
+    import re2
+except ImportError:  # optional dependency (google-re2), re fallback
+    re2 = None
+
+REGEX_ENGINES = ('re2', 're')
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+
+def available_engine() -> str:
+    return 're2' if re2 is not None else 're'
+
+
+def resolve_engine(engine: Optional[str]) -> str:
+    """'auto' / None -> engine yang tersedia; validasi nama engine"""
+    if engine in (None, 'auto'):
+        return available_engine()
+    if engine not in REGEX_ENGINES:
+        raise ValueError(f"Unknown regex engine {engine!r}, expected one of {REGEX_ENGINES}")
+    if engine == 're2' and re2 is None:
+        raise RuntimeError("google-re2 package required for the re2 regex engine")
+    return engine
+
+
+def compile_pattern(pattern: str, flags: int = 0, engine: str = 're'):
+    """
+    Compiled pattern (dengan .search) untuk engine
+    Falls back to re when RE2 rejects the pattern; lihat engine_of()
+    """
+    if engine == 're2':
+        inline = ''.join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+        options = re2.Options()
+        options.log_errors = False
+        try:
+            return re2.compile(f"(?{inline}){pattern}" if inline else pattern, options)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
+
+
+def engine_of(compiled) -> str:
+    """Engine yang benar-benar dipakai oleh compiled pattern"""
+    return 're' if isinstance(compiled, re.Pattern) else 're2'
@@ -0,0 +1,589 @@
+"""
+Data-driven attack detection rules
+A ruleset file (JSON, atau YAML jika PyYAML terinstall) lists categories and
+rules: id, category, severity, fields to scan, pattern. parse_ruleset()
+validates it; RuleSet compiles it into an immutable object (PatternSets per
+field view, literal prefilter, per-rule stats) that AttackDetector swaps as a whole
+"""
+import json
+import os
+import re
+from time import thread_time, time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    import yaml
+except ImportError:  # optional dependency, JSON rulesets only
+    yaml = None
+
+from services.literal_prefilter import LiteralPrefilter, required_literals
+from services.regex_engines import compile_pattern, engine_of
+
+# With a time budget, one in this many full scans is timed per pattern (rule stats)
+RULE_STATS_SAMPLE = 256
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'attack_rules.json'
+)
+
+# Fields a rule can scan; request = "method path user_agent"
+FIELDS = ('request', 'method', 'path', 'user_agent')
+
+SEVERITIES = ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+
+# Threat for a field some rules only scanned the head and tail of (scan_length)
+OVERSIZED_RULE_ID = 'oversized-request'
+OVERSIZED_ATTACK_TYPE = 'Oversized Request'
+
+
+def _first_chars(items) -> Tuple[Optional[Set[str]], bool]:
+    """
+    (chars a match can start with, can match empty) untuk parsed regex items
+    None jika tidak bisa ditentukan (., \\s, lookarounds, ...)
+    """
+    chars = set()
+    for op, av in items:
+        if op is sre_parse.AT:
+            continue  # \b, ^, $: zero-width
+        if op is sre_parse.LITERAL:
+            chars.add(chr(av))
+            return chars, False
+        if op is sre_parse.IN:
+            for item_op, item in av:
+                if item_op is sre_parse.LITERAL:
+                    chars.add(chr(item))
+                elif item_op is sre_parse.RANGE and item[1] - item[0] < 256:
+                    chars.update(map(chr, range(item[0], item[1] + 1)))
+                else:
+                    return None, False
+            return chars, False
+        if op is sre_parse.SUBPATTERN or op is sre_parse.BRANCH:
+            branches = [av[-1]] if op is sre_parse.SUBPATTERN else av[1]
+            nullable = False
+            for branch in branches:
+                branch_chars, branch_nullable = _first_chars(branch)
+                if branch_chars is None:
+                    return None, False
+                chars |= branch_chars
+                nullable = nullable or branch_nullable
+            if not nullable:
+                return chars, False
+            continue
+        if op is sre_parse.MAX_REPEAT or op is sre_parse.MIN_REPEAT:
+            low, _, item = av
+            item_chars, item_nullable = _first_chars(item)
+            if item_chars is None:
+                return None, False
+            chars |= item_chars
+            if low and not item_nullable:
+                return chars, False
+            continue
+        return None, False
+    return chars, True
+
+
+def first_char_class(patterns: List[str], flags: int = 0) -> Optional[str]:
+    """
+    '[...]' dengan semua characters yang bisa memulai match dari patterns,
+    None jika ada pattern yang bisa mulai dengan apa saja (atau match empty)
+    """
+    chars = set()
+    for pattern in patterns:
+        pattern_chars, nullable = _first_chars(sre_parse.parse(pattern, flags))
+        if pattern_chars is None or nullable:
+            return None
+        chars |= pattern_chars
+    return '[' + ''.join(re.escape(char) for char in sorted(chars)) + ']'
+
+
+def _wide(items) -> bool:
+    """True jika item bisa match hampir semua character (., [^...], negated literal)"""
+    for op, av in items:
+        if op is sre_parse.ANY or op is sre_parse.NOT_LITERAL:
+            return True
+        if op is sre_parse.IN and av and av[0][0] is sre_parse.NEGATE:
+            return True
+    return False
+
+
+def can_backtrack(pattern: str, flags: int = 0) -> bool:
+    """
+    True jika pattern punya unbounded repeat dari wide item (.*, [^>]*) atau
+    nested unbounded repeats: under re such a rule goes quadratic (or worse)
+    on a long field that repeats its prefix
+    """
+    return _backtracks(sre_parse.parse(pattern, flags))
+
+
+def _backtracks(items, repeated: bool = False) -> bool:
+    for op, av in items:
+        if op is sre_parse.MAX_REPEAT or op is sre_parse.MIN_REPEAT:
+            _, high, item = av
+            unbounded = high == sre_parse.MAXREPEAT
+            if unbounded and (repeated or _wide(item)):
+                return True
+            if _backtracks(item, repeated or unbounded):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            if _backtracks(av[-1], repeated):
+                return True
+        elif op is sre_parse.BRANCH:
+            if any(_backtracks(branch, repeated) for branch in av[1]):
+                return True
+        elif op is sre_parse.ASSERT or op is sre_parse.ASSERT_NOT:
+            if _backtracks(av[1], repeated):
+                return True
+    return False
+
+
+def clip(text: str, length: int) -> str:
+    """
+    Head dan tail dari text (length characters total); the newline between
+    them keeps . from matching across the cut
+    """
+    half = length // 2
+    return text[:half] + '\n' + text[len(text) - (length - half):]
+
+
+
+class Category:
+    """Attack category: threat order, attack_type, default description dan case handling"""
+    
+    __slots__ = ('name', 'attack_type', 'description', 'lowercase', 'ignore_case')
+    
+    def __init__(self, name: str, attack_type: str, description: str = '',
+                 lowercase: bool = False, ignore_case: bool = False):
+        self.name = name
+        self.attack_type = attack_type
+        self.description = description
+        self.lowercase = lowercase
+        self.ignore_case = ignore_case
+
+
+class Rule:
+    """
+    Satu detection rule
+    lowercase: fields di-lowercase sebelum matching; ignore_case: re.IGNORECASE
+    """
+    
+    __slots__ = ('id', 'category', 'severity', 'fields', 'pattern', 'lowercase', 'ignore_case', 'description')
+    
+    def __init__(self, id: str, category: str, severity: str, fields: Iterable[str], pattern: str,
+                 lowercase: bool = False, ignore_case: bool = False, description: str = ''):
+        self.id = id
+        self.category = category
+        self.severity = severity
+        self.fields = tuple(fields)
+        self.pattern = pattern
+        self.lowercase = lowercase
+        self.ignore_case = ignore_case
+        self.description = description
+    
+    @property
+    def flags(self) -> int:
+        return re.IGNORECASE if self.ignore_case else 0
+    
+    def same_match(self, other: 'Rule') -> bool:
+        """True jika other match persis sama (stats boleh dipakai ulang)"""
+        return (self.pattern, self.fields, self.lowercase, self.ignore_case) == \
+               (other.pattern, other.fields, other.lowercase, other.ignore_case)
+    
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def read_ruleset(path: str) -> Dict:
+    """Ruleset file -> dict (.yaml / .yml butuh PyYAML, lainnya JSON)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError("PyYAML package required for YAML rulesets")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def parse_ruleset(data: Dict) -> Tuple[List[Category], List[Rule]]:
+    """
+    Validasi ruleset dict -> (categories, rules), ValueError dengan rule id jika invalid
+    Rules inherit lowercase / ignore_case / description dari category-nya
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Ruleset must be a mapping with 'categories' and 'rules'")
+    categories = []
+    for entry in data.get('categories') or []:
+        try:
+            category = Category(
+                entry['name'], entry['attack_type'], entry.get('description', ''),
+                bool(entry.get('lowercase', False)), bool(entry.get('ignore_case', False))
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid category {entry!r}: missing {e}") from None
+        categories.append(category)
+    by_name = {category.name: category for category in categories}
+    if len(by_name) != len(categories):
+        raise ValueError("Duplicate category names")
+    
+    rules = []
+    seen = set()
+    for entry in data.get('rules') or []:
+        rule_id = entry.get('id') if isinstance(entry, dict) else None
+        if not rule_id:
+            raise ValueError(f"Rule without id: {entry!r}")
+        if rule_id in seen:
+            raise ValueError(f"Duplicate rule id {rule_id!r}")
+        seen.add(rule_id)
+        category = by_name.get(entry.get('category'))
+        if category is None:
+            raise ValueError(f"Rule {rule_id!r}: unknown category {entry.get('category')!r}")
+        severity = entry.get('severity')
+        if severity not in SEVERITIES:
+            raise ValueError(f"Rule {rule_id!r}: severity must be one of {SEVERITIES}")
+        fields = entry.get('fields')
+        if isinstance(fields, str):
+            fields = [fields]
+        if not fields or any(field not in FIELDS for field in fields):
+            raise ValueError(f"Rule {rule_id!r}: fields must be a non-empty subset of {FIELDS}")
+        pattern = entry.get('pattern')
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError(f"Rule {rule_id!r}: pattern required")
+        rule = Rule(
+            rule_id, category.name, severity, fields, pattern,
+            bool(entry.get('lowercase', category.lowercase)),
+            bool(entry.get('ignore_case', category.ignore_case)),
+            entry.get('description') or category.description
+        )
+        try:
+            re.compile(pattern, rule.flags)
+        except re.error as e:
+            raise ValueError(f"Rule {rule_id!r}: invalid pattern: {e}") from None
+        rules.append(rule)
+    return categories, rules
+
+
+class RuleStats:
+    """
+    Per-rule accounting: threats (hits), timed evaluations, cumulative / max match time
+    Full scans are only timed per rule when over budget or sampled (RULE_STATS_SAMPLE)
+    Times are CPU time of the scanning thread: a preempted or GC-paused scan isn't flagged
+    """
+    
+    __slots__ = ('hits', 'evaluations', 'total_time', 'max_time', 'over_budget')
+    
+    def __init__(self):
+        self.hits = 0
+        self.evaluations = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.over_budget = 0
+    
+    def record(self, elapsed: float, budget: float) -> bool:
+        """Catat satu evaluation; True jika rule baru pertama kali melewati budget"""
+        self.evaluations += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if elapsed > budget:
+            self.over_budget += 1
+            return self.over_budget == 1
+        return False
+    
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PatternSet:
+    """
+    Patterns dengan flags yang sama, di-compile menjadi satu alternation
+    dengan named groups: one scan tells whether (and which) pattern matches
+    With a time_budget the combined scan is timed; only a scan over budget (and
+    a sample of RULE_STATS_SAMPLE) is re-run per pattern to find the slow rule
+    With a scan_length, patterns that can backtrack under re only see the head
+    and tail of a longer text (clip); the others always scan all of it
+    """
+    
+    def __init__(self, patterns: List[str], flags: int = 0, engine: str = 're',
+                 time_budget: Optional[float] = None, names: Optional[List[str]] = None,
+                 stats: Optional[List[RuleStats]] = None, scan_length: Optional[int] = None):
+        self.patterns = list(patterns)
+        self.names = list(names) if names is not None else [str(index) for index in range(len(self.patterns))]
+        self.compiled = [compile_pattern(pattern, flags, engine) for pattern in self.patterns]
+        self.time_budget = time_budget
+        self.stats = list(stats) if stats is not None else [RuleStats() for _ in self.patterns]
+        self.scan_length = scan_length
+        self.capped = frozenset(
+            index for index, pattern in enumerate(self.patterns)
+            if engine_of(self.compiled[index]) == 're' and can_backtrack(pattern, flags)
+        ) if scan_length is not None else frozenset()
+        self._scans = 0
+        self.combined = None
+        if self.patterns:
+            alternation = '|'.join(f"(?P<p{index}>{pattern})" for index, pattern in enumerate(self.patterns))
+            # One pattern RE2 rejects keeps the whole alternation on re
+            self.combined = compile_pattern(alternation, flags, engine)
+            first = first_char_class(self.patterns, flags) if engine_of(self.combined) == 're' else None
+            if first is not None:
+                # re tries every branch at every position; a lookahead on the possible
+                # first characters rejects most positions with one class test
+                self.combined = re.compile(f"(?={first})(?:{alternation})", flags)
+    
+    def clips(self, text: str, indexes: Optional[Iterable[int]] = None) -> bool:
+        """True jika salah satu pattern (indexes, default semua) hanya scan clip(text)"""
+        if not self.capped or len(text) <= self.scan_length:
+            return False
+        return indexes is None or not self.capped.isdisjoint(indexes)
+    
+    def search(self, text: str) -> Optional[int]:
+        """
+        Index of the first pattern (list order) yang match di text, atau None
+        Same answer as re.search per pattern in order
+        """
+        if self.combined is None:
+            return None
+        if self.clips(text):
+            # Capped and uncapped patterns see different text: one by one
+            return self._search_each(text, range(len(self.patterns)))
+        if self.time_budget is None:
+            return self._search_combined(text)
+        
+        started = thread_time()
+        index = self._search_combined(text)
+        elapsed = thread_time() - started
+        self._scans += 1
+        if elapsed > self.time_budget or self._scans % RULE_STATS_SAMPLE == 0:
+            # Attribute the time: every pattern on its own (same answer)
+            return self._search_each(text, range(len(self.patterns)))
+        return index
+    
+    def _search_combined(self, text: str) -> Optional[int]:
+        match = self.combined.search(text)
+        if match is None:
+            return None
+        index = int(match.lastgroup[1:])
+        # The leftmost hit may come from a later pattern; an earlier one can still match further on
+        for earlier in range(index):
+            if self.compiled[earlier].search(text):
+                return earlier
+        return index
+    
+    def search_candidates(self, text: str, indexes: Iterable[int]) -> Optional[int]:
+        """search() restricted to the given pattern indexes (prefilter candidates)"""
+        return self._search_each(text, sorted(indexes))
+    
+    def _search_each(self, text: str, indexes: Iterable[int]) -> Optional[int]:
+        """Patterns one by one in indexes order, timed jika ada time_budget"""
+        budget = self.time_budget
+        clipped = clip(text, self.scan_length) if self.clips(text) else None
+        for index in indexes:
+            compiled = self.compiled[index]
+            scanned = clipped if clipped is not None and index in self.capped else text
+            if budget is None:
+                if compiled.search(scanned):
+                    return index
+                continue
+            started = thread_time()
+            matched = compiled.search(scanned) is not None
+            elapsed = thread_time() - started
+            if self.stats[index].record(elapsed, budget):
+                print(f"[AttackDetector] Rule {self.names[index]} {self.patterns[index]!r} took "
+                      f"{elapsed * 1000:.1f} ms on {len(scanned)} chars (budget {budget * 1000:.1f} ms)")
+            if matched:
+                return index
+        return None
+
+
+class FieldView:
+    """Rules dari satu category yang scan field yang sama dengan normalisasi dan flags yang sama"""
+    
+    __slots__ = ('field', 'lowercase', 'rules', 'order', 'pattern_set')
+    
+    def __init__(self, field: str, lowercase: bool, rules: List[Rule], order: List[int], pattern_set: PatternSet):
+        self.field = field
+        self.lowercase = lowercase
+        self.rules = rules
+        self.order = order  # position of each rule within its category
+        self.pattern_set = pattern_set
+
+
+class RuleSet:
+    """
+    Compiled, immutable ruleset: never modified after construction, a rule
+    change builds a new RuleSet (only the RuleStats counters move)
+    """
+    
+    def __init__(self, categories: List[Category], rules: List[Rule], engine: str = 're',
+                 prefilter: Optional[str] = 'auto', time_budget: Optional[float] = None,
+                 previous: Optional['RuleSet'] = None, source: Optional[str] = None, version=None,
+                 scan_length: Optional[int] = None):
+        """
+        engine: regex engine (lihat services.regex_engines)
+        prefilter: literal prefilter backend, 'auto' atau None
+        previous: RuleSet yang diganti; unchanged rules keep their stats
+        scan_length: characters per field untuk rules yang bisa backtrack di re (lihat PatternSet)
+        """
+        self.categories = tuple(categories)
+        self.rules = tuple(rules)
+        self.source = source
+        self.version = version
+        self.loaded_at = time()
+        self.scan_length = scan_length
+        self.rules_by_id = {rule.id: rule for rule in self.rules}
+        self.categories_by_name = {category.name: category for category in self.categories}
+        self.category_rules = {
+            category.name: tuple(rule for rule in self.rules if rule.category == category.name)
+            for category in self.categories
+        }
+        self.stats = {}
+        for rule in self.rules:
+            old = previous.rules_by_id.get(rule.id) if previous is not None else None
+            self.stats[rule.id] = previous.stats[rule.id] if old is not None and old.same_match(rule) else RuleStats()
+        
+        # Rules with the same field, normalization and flags share one PatternSet
+        self.views: Dict[str, Tuple[FieldView, ...]] = {}
+        for category in self.categories:
+            grouped: Dict[Tuple[str, bool, int], Tuple[List[Rule], List[int]]] = {}
+            for position, rule in enumerate(self.category_rules[category.name]):
+                for field in rule.fields:
+                    members, order = grouped.setdefault((field, rule.lowercase, rule.flags), ([], []))
+                    members.append(rule)
+                    order.append(position)
+            self.views[category.name] = tuple(
+                FieldView(field, lowercase, members, order, PatternSet(
+                    [rule.pattern for rule in members], flags, engine, time_budget,
+                    [rule.id for rule in members], [self.stats[rule.id] for rule in members], scan_length
+                ))
+                for (field, lowercase, flags), (members, order) in grouped.items()
+            )
+        self.lowercase_fields = frozenset(
+            view.field for views in self.views.values() for view in views if view.lowercase
+        )
+        
+        # Literal prefilter: one scan of the lowercased request picks the candidate rules
+        self.prefilter = None
+        self.unfiltered: Dict[FieldView, Set[int]] = {}
+        if prefilter is None:
+            return
+        literals = {}
+        for views in self.views.values():
+            for view in views:
+                for index, rule in enumerate(view.rules):
+                    # Literals are looked up in lowercased text: exact only if the rule ignores case or sees lowercased text
+                    required = required_literals(rule.pattern, rule.flags) if rule.ignore_case or view.lowercase else None
+                    if required:
+                        literals[view, index] = required
+                    else:
+                        self.unfiltered.setdefault(view, set()).add(index)
+        self.prefilter = LiteralPrefilter(literals, None if prefilter == 'auto' else prefilter)
+    
+    def threat(self, rule: Rule) -> Dict:
+        category = self.categories_by_name[rule.category]
+        return {
+            'detected': True,
+            'attack_type': category.attack_type,
+            'severity': rule.severity,
+            'pattern': rule.pattern,
+            'description': rule.description,
+            'rule_id': rule.id
+        }
+    
+    def oversized_threat(self, fields: List[str]) -> Dict:
+        """Threat untuk request yang fields-nya hanya sebagian di-scan oleh backtracking rules"""
+        return {
+            'detected': True,
+            'attack_type': OVERSIZED_ATTACK_TYPE,
+            'severity': 'MEDIUM',
+            'pattern': None,
+            'description': f"{', '.join(fields)} longer than {self.scan_length} chars, "
+                           f"backtracking rules only scanned head and tail",
+            'rule_id': OVERSIZED_RULE_ID
+        }
+    
+    def analyze(self, method: str, path: str, user_agent: str = '') -> List[Dict]:
+        """Threats (satu per category, category order) untuk normalized request"""
+        full_request = f"{method} {path}"
+        if user_agent:
+            full_request += f" {user_agent}"
+        texts = {'request': full_request, 'method': method, 'path': path, 'user_agent': user_agent or ''}
+        lowered = {field: texts[field].lower() for field in self.lowercase_fields}
+        
+        # Non-ASCII text may match through unicode case folds (e.g. 'ſ' for 's') the
+        # lowercased literal scan can't see: full regex path
+        candidates = None
+        if self.prefilter is not None and full_request.isascii():
+            path_start = len(method) + 1
+            agent_start = path_start + len(path) + 1
+            spans = {
+                'request': (0, len(full_request)),
+                'method': (0, len(method)),
+                'path': (path_start, agent_start - 1),
+                'user_agent': (agent_start, len(full_request)),
+            }
+            candidates = self._candidates(lowered.get('request') or full_request.lower(), spans)
+        
+        threats = []
+        clipped = []
+        for category in self.categories:
+            best = None
+            for view in self.views[category.name]:
+                text = lowered[view.field] if view.lowercase else texts[view.field]
+                if candidates is None:
+                    indexes = None
+                    index = view.pattern_set.search(text)
+                else:
+                    indexes = candidates.get(view) or ()
+                    index = view.pattern_set.search_candidates(text, indexes) if indexes else None
+                if view.field not in clipped and view.pattern_set.clips(text, indexes):
+                    clipped.append(view.field)
+                if index is not None and (best is None or view.order[index] < best):
+                    best = view.order[index]
+            if best is not None:
+                rule = self.category_rules[category.name][best]
+                self.stats[rule.id].hits += 1
+                threats.append(self.threat(rule))
+        if clipped:
+            threats.append(self.oversized_threat(clipped))
+        return threats
+    
+    def _candidates(self, request_lower: str, spans: Dict[str, Tuple[int, int]]) -> Dict[FieldView, Set[int]]:
+        """
+        FieldView -> rule indexes yang perlu dievaluasi untuk request ini
+        Literals only count inside the span of the view's field
+        """
+        found = {view: set(indexes) for view, indexes in self.unfiltered.items()}
+        for start, end, keys in self.prefilter.scan(request_lower):
+            for view, index in keys:
+                field_start, field_end = spans[view.field]
+                if start >= field_start and end <= field_end:
+                    found.setdefault(view, set()).add(index)
+        return found
+    
+    def match_text(self, category: str, text: str) -> Optional[Dict]:
+        """Threat untuk category jika text (any field) match, None jika tidak"""
+        best = None
+        for view in self.views.get(category, ()):
+            index = view.pattern_set.search(text.lower() if view.lowercase else text)
+            if index is not None and (best is None or view.order[index] < best):
+                best = view.order[index]
+        if best is None:
+            return None
+        rule = self.category_rules[category][best]
+        self.stats[rule.id].hits += 1
+        return self.threat(rule)
+    
+    def rule_stats(self) -> List[Dict]:
+        """Per-rule hits dan match time, paling mahal dulu"""
+        compiled = {}
+        for views in self.views.values():
+            for view in views:
+                for index, rule in enumerate(view.rules):
+                    compiled[rule.id] = view.pattern_set.compiled[index]
+        rules = [
+            {'id': rule.id, 'category': rule.category, 'severity': rule.severity, 'fields': list(rule.fields),
+             'pattern': rule.pattern, 'engine': engine_of(compiled[rule.id]), **self.stats[rule.id].as_dict()}
+            for rule in self.rules
+        ]
+        return sorted(rules, key=lambda rule: rule['total_time'], reverse=True)
@@ -0,0 +1,347 @@
+"""
+Spool
+Local append-only buffer of parsed batches for when the database is down.
+Records go to numbered segment files (fsync'd with group commit) and are
+replayed in order, in bulk batches, once the database is back
+"""
+import os
+import json
+from collections import deque
+from datetime import datetime
+from threading import Thread, Lock, Condition, Event
+from typing import Any, Dict, List, Optional
+from config.database import SessionLocal, DB_UNAVAILABLE_ERRORS
+from parsers import PARSER_TYPES
+
+SEGMENT_BYTES = 16 * 1024 * 1024
+MAX_BYTES = 1024 * 1024 * 1024
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl'
+
+
+def _encode(value: Any):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    raise TypeError(f"Cannot spool {type(value).__name__}")
+
+
+def _decode(obj: Dict):
+    if len(obj) == 1 and '$dt' in obj:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+class Segment:
+    """One spool file: seq number, size on disk, rows not yet replayed"""
+    
+    __slots__ = ('seq', 'path', 'size', 'rows')
+    
+    def __init__(self, seq: int, path: str, size: int = 0, rows: int = 0):
+        self.seq = seq
+        self.path = path
+        self.size = size
+        self.rows = rows
+
+
+class Spool:
+    """
+    Append-only segment files + a replay thread
+    Record format: "<row count>\\t<json>\\n", one record per pipeline batch
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES, segment_bytes: int = SEGMENT_BYTES,
+                 replay_batch_size: int = 5000, retry_interval: float = 5.0, bulk_writer=None,
+                 parsers: Optional[Dict[str, Any]] = None):
+        """
+        directory: segment files + replay position
+        max_bytes: disk cap; append blocks while it is reached (backpressure)
+        replay_batch_size: rows per transaction when replaying
+        retry_interval: seconds between attempts while the database is down
+        parsers: source name -> parser, untuk replay (falls back to PARSER_TYPES)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.replay_batch_size = replay_batch_size
+        self.retry_interval = retry_interval
+        self.bulk_writer = bulk_writer
+        self.parsers = dict(parsers or {})
+        
+        self._lock = Lock()
+        self._changed = Condition(self._lock)
+        self._segments = deque()
+        self._active = None  # file object of the newest segment
+        # Group commit: bytes written vs bytes known to be on disk
+        self._written = 0
+        self._synced = 0
+        self._sync_lock = Lock()
+        
+        # Replay position inside the oldest segment
+        self._replay_offset = 0
+        
+        self.spooled_rows = 0
+        self.replayed_rows = 0
+        self.running = False
+        self._stop_event = Event()
+        self.thread = None
+        
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+    
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+    
+    def _position_path(self) -> str:
+        return os.path.join(self.directory, 'replay.json')
+    
+    def _load(self):
+        """Pick up segments left by a previous run (a torn last record is cut off)"""
+        seqs = sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        
+        position = {}
+        try:
+            with open(self._position_path(), 'r', encoding='utf-8') as f:
+                position = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        for seq in seqs:
+            segment = Segment(seq, self._segment_path(seq))
+            start = position.get('offset', 0) if seq == position.get('seq') else 0
+            with open(segment.path, 'rb+') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    if segment.size >= start:
+                        segment.rows += int(line.split(b'\t', 1)[0])
+                    segment.size += len(line)
+                f.truncate(segment.size)
+            self._segments.append(segment)
+        
+        if self._segments and self._segments[0].seq == position.get('seq'):
+            self._replay_offset = position.get('offset', 0)
+        
+        if self._segments:
+            print(f"[Spool] Found {self.backlog_rows()} spooled rows in {len(self._segments)} segments")
+    
+    def backlog_rows(self) -> int:
+        return sum(segment.rows for segment in self._segments)
+    
+    def backlog_bytes(self) -> int:
+        return self.disk_bytes() - self._replay_offset
+    
+    def disk_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+    
+    def has_backlog(self) -> bool:
+        with self._lock:
+            return bool(self._segments)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'backlog_rows': self.backlog_rows(),
+                'backlog_bytes': self.backlog_bytes(),
+                'disk_bytes': self.disk_bytes(),
+                'max_bytes': self.max_bytes,
+                'spooled_rows': self.spooled_rows,
+                'replayed_rows': self.replayed_rows,
+            }
+    
+    def append(self, source: str, parser, parsed_list: List[Dict[str, Any]]):
+        """
+        Persist a batch; returns once it is fsync'd
+        Blocks while the spool is at max_bytes
+        """
+        if not parsed_list:
+            return
+        record = json.dumps(
+            {'source': source, 'parser': parser.__class__.__name__, 'rows': parsed_list},
+            default=_encode, separators=(',', ':')
+        )
+        data = f"{len(parsed_list)}\t{record}\n".encode('utf-8')
+        
+        with self._lock:
+            self.parsers.setdefault(source, parser)
+            while self.running and self._segments and self.disk_bytes() + len(data) > self.max_bytes:
+                # Disk cap: stall the writer (and through the queues, the readers)
+                self._changed.wait(1.0)
+            
+            segment = self._segments[-1] if self._segments else None
+            if segment is None or self._active is None or segment.size >= self.segment_bytes:
+                segment = self._open_segment()
+            self._active.write(data)
+            self._active.flush()
+            segment.size += len(data)
+            segment.rows += len(parsed_list)
+            self.spooled_rows += len(parsed_list)
+            self._written += len(data)
+            written = self._written
+            self._changed.notify_all()
+        
+        self._sync(written)
+    
+    def _open_segment(self) -> Segment:
+        """Start a new segment (caller holds the lock)"""
+        if self._active is not None:
+            self._sync(self._written)
+            self._active.close()
+        seq = self._segments[-1].seq + 1 if self._segments else 0
+        segment = Segment(seq, self._segment_path(seq))
+        self._active = open(segment.path, 'ab')
+        self._segments.append(segment)
+        return segment
+    
+    def _sync(self, upto: int):
+        """Group commit: one fsync covers every append written before it started"""
+        with self._sync_lock:
+            if self._synced >= upto or self._active is None:
+                return
+            target = self._written
+            os.fsync(self._active.fileno())
+            self._synced = target
+    
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._replay_loop, name='spool-replay', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            self.running = False
+            self._changed.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+        with self._lock:
+            if self._active is not None:
+                self._sync(self._written)
+                self._active.close()
+                self._active = None
+    
+    def _replay_loop(self):
+        while self.running:
+            with self._lock:
+                if not self._segments:
+                    self._changed.wait(1.0)
+                    continue
+                segment = self._segments[0]
+                offset = self._replay_offset
+            
+            try:
+                replayed = self._replay_segment(segment, offset)
+            except DB_UNAVAILABLE_ERRORS as e:
+                print(f"[Spool] Database still unavailable ({e.__class__.__name__}), "
+                      f"{self.stats()['backlog_rows']} rows waiting")
+                self._stop_event.wait(self.retry_interval)
+                continue
+            except Exception as e:
+                print(f"[Spool] Error replaying {segment.path}: {e}")
+                self._stop_event.wait(self.retry_interval)
+                continue
+            
+            if not replayed:
+                # Caught up with the active segment, wake up on the next append
+                with self._lock:
+                    if self.running:
+                        self._changed.wait(0.5)
+    
+    def _replay_segment(self, segment: Segment, offset: int) -> bool:
+        """
+        Write records from offset, committing in replay_batch_size chunks;
+        delete the segment once it is fully replayed
+        Returns: True jika ada progress
+        """
+        progress = False
+        group = []
+        group_source = group_parser = None
+        position = offset
+        
+        with open(segment.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # record still being written
+                try:
+                    record = json.loads(line.split(b'\t', 1)[1], object_hook=_decode)
+                except (IndexError, ValueError) as e:
+                    print(f"[Spool] Skipping corrupt record in {segment.path}: {e}")
+                    record = {'source': group_source, 'parser': group_parser, 'rows': []}
+                
+                if group and (record['source'] != group_source or len(group) >= self.replay_batch_size):
+                    self._write_group(segment, group_source, group_parser, group, position)
+                    progress = True
+                    group = []
+                
+                position += len(line)
+                group_source = record['source']
+                group_parser = record['parser']
+                group.extend(record['rows'])
+        
+        if position > offset:
+            self._write_group(segment, group_source, group_parser, group, position)
+            progress = True
+        
+        with self._lock:
+            if self._replay_offset < segment.size:
+                return progress
+            # Fully replayed. Closing the active file makes the next append start a new segment
+            self._segments.popleft()
+            if not self._segments and self._active is not None:
+                with self._sync_lock:
+                    self._active.close()
+                    self._active = None
+            os.remove(segment.path)
+            self._replay_offset = 0
+            self._save_position(self._segments[0].seq if self._segments else None, 0)
+            self._changed.notify_all()
+        return True
+    
+    def _write_group(self, segment: Segment, source: str, parser_name: str,
+                     rows: List[Dict[str, Any]], end: int):
+        """Write rows of one source, then move the replay position to end"""
+        saved = 0
+        if rows:
+            parser = self._parser(source, parser_name)
+            db = SessionLocal()
+            try:
+                saved = parser.save_batch(rows, db, self.bulk_writer, report=False)
+            finally:
+                db.close()
+        
+        with self._lock:
+            segment.rows -= len(rows)
+            self.replayed_rows += len(rows)
+            self._replay_offset = end
+            self._save_position(segment.seq, end)
+            self._changed.notify_all()
+        if rows:
+            print(f"[Spool] Replayed {saved}/{len(rows)} rows for {source}")
+    
+    def _parser(self, source: str, parser_name: str):
+        parser = self.parsers.get(source)
+        if parser is None:
+            # Source no longer configured: any parser of the same class can write its rows
+            for parser_class in PARSER_TYPES.values():
+                if parser_class.__name__ == parser_name:
+                    parser = self.parsers[source] = parser_class()
+                    break
+            else:
+                raise ValueError(f"No parser for spooled source {source} ({parser_name})")
+        return parser
+    
+    def _save_position(self, seq: Optional[int], offset: int):
+        """Persist replay position (caller holds the lock)"""
+        tmp_path = f"{self._position_path()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'seq': seq, 'offset': offset}, f)
+            os.replace(tmp_path, self._position_path())
+        except OSError as e:
+            print(f"[Spool] Error saving replay position: {e}")
@@ -0,0 +1,76 @@
+"""
+Verdict cache untuk AttackDetector
+Crawlers, health checks and asset requests repeat the same (method, path,
+user_agent) thousands of times an hour; a bounded LRU keeps their threat
+lists so a repeat costs one dict lookup instead of a scan
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple
+
+# Requests (distinct normalized signatures) kept by the cache
+VERDICT_CACHE_SIZE = 4096
+
+
+class VerdictCache:
+    """
+    Bounded LRU: normalized request -> threats (tuple), dengan hit / miss /
+    eviction counters untuk tuning max_size
+    clear() bumps the generation, so a verdict computed against the old rules
+    while the cache was cleared is not stored
+    """
+    
+    def __init__(self, max_size: int = VERDICT_CACHE_SIZE):
+        self.max_size = max_size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Dict, ...]]' = OrderedDict()
+        self._lock = Lock()
+    
+    def get(self, key: Hashable) -> Optional[Tuple[Dict, ...]]:
+        """Cached threats, atau None (miss)"""
+        with self._lock:
+            try:
+                verdict = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return verdict
+    
+    def put(self, key: Hashable, verdict: Tuple[Dict, ...], generation: int):
+        """Simpan verdict yang dihitung saat generation (lihat clear)"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Invalidate semua verdicts (rules berubah)"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }